@@ -1,34 +1,25 @@
-from typing import Any, Generator, Type, TypeVar
+from typing import Any, Type, TypeVar
 from datetime import date, datetime
 
 from pocpoc.api.codec.types import (
-    ParseProcessResult,
-    ParseProcessYield,
-    TypeDecoder,
+    LeafTypeDecoder,
     ValidationError,
 )
 
 T = TypeVar("T")
 
 
-class DateTypeDecoder(TypeDecoder[date]):
-    def parse(
-        self, value: Any, *types: Type[Any]
-    ) -> Generator[
-        ParseProcessYield[Any], ParseProcessResult[Any], ParseProcessResult[date]
-    ]:
+class DateTypeDecoder(LeafTypeDecoder[date]):
+    def decode_value(self, value: Any, *types: Type[Any]) -> date:
         if not isinstance(value, str):
-            return self._failure(ValidationError(f"Expected string, got {value}"))
+            raise ValidationError(f"Expected string, got {value}")
 
         try:
-            return self._success(datetime.strptime(value, "%Y-%m-%d").date())
+            return datetime.strptime(value, "%Y-%m-%d").date()
         except ValueError:
-            return self._failure(
-                ValidationError(
-                    f"Expected date in format YYYY-MM-DD, but {value} is not a valid value"
-                )
+            raise ValidationError(
+                f"Expected date in format YYYY-MM-DD, but {value} is not a valid value"
             )
-        yield
 
 
 def serialize_date(value: date) -> Any:
@@ -1,36 +1,91 @@
-from typing import Any, Generator, Type, TypeVar
-from datetime import datetime, timezone
+import re
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Any, Type, TypeVar
 
 from pocpoc.api.codec.types import (
-    ParseProcessResult,
-    ParseProcessYield,
-    TypeDecoder,
+    LeafTypeDecoder,
     ValidationError,
 )
 
 T = TypeVar("T")
 
+DATETIME_FORMAT = "%Y-%m-%dT%H:%M:%S%z"
 
-class DateTimeTypeDecoder(TypeDecoder[datetime]):
-    def parse(
-        self, value: Any, *types: Type[Any]
-    ) -> Generator[
-        ParseProcessYield[Any], ParseProcessResult[Any], ParseProcessResult[datetime]
-    ]:
+ISO_DATETIME_PATTERN = re.compile(
+    r"(\d{4})-(\d{2})-(\d{2})T(\d{2}):(\d{2}):(\d{2})(?:\.(\d{1,6}))?"
+    r"(?:(Z)|([+-])(\d{2}):?(\d{2}))\Z",
+    re.ASCII,
+)
+
+
+@lru_cache(maxsize=256)
+def parse_datetime(value: str) -> datetime:
+    """
+    Parses 2020-01-01T00:00:00+00:00, with optional fractional seconds and
+    `Z` or `+0000` offsets. Other strings go through `strptime`, so anything
+    accepted before is still accepted. Raises ValueError.
+    """
+    match = ISO_DATETIME_PATTERN.match(value)
+    if match is None:
+        return datetime.strptime(value, DATETIME_FORMAT)
+
+    (
+        year,
+        month,
+        day,
+        hour,
+        minute,
+        second,
+        fraction,
+        z,
+        sign,
+        tz_h,
+        tz_m,
+    ) = match.groups()
+
+    tz = timezone.utc
+    if z is None and (tz_h != "00" or tz_m != "00"):
+        offset = timedelta(hours=int(tz_h), minutes=int(tz_m))
+        tz = timezone(-offset if sign == "-" else offset)
+
+    return datetime(
+        int(year),
+        int(month),
+        int(day),
+        int(hour),
+        int(minute),
+        int(second),
+        int(fraction.ljust(6, "0")) if fraction else 0,
+        tzinfo=tz,
+    )
+
+
+class DateTimeTypeDecoder(LeafTypeDecoder[datetime]):
+    def decode_value(self, value: Any, *types: Type[Any]) -> datetime:
+        if isinstance(value, datetime):
+            return value
         if not isinstance(value, str):
-            return self._failure(ValidationError(f"Expected string, got {value}"))
+            raise ValidationError(f"Expected string, got {value}")
 
         try:
             # parse with iso format: 2020-01-01T00:00:00+00:00
-            return self._success(datetime.strptime(value, "%Y-%m-%dT%H:%M:%S%z"))
+            return parse_datetime(value)
         except ValueError:
-            return self._failure(
-                ValidationError(
-                    f"Expected datetime in iso format, got {value} (expected format: 2020-01-01T00:00:00+00:00)"
-                )
+            raise ValidationError(
+                f"Expected datetime in iso format, got {value} (expected format: 2020-01-01T00:00:00+00:00)"
             )
-        yield
 
 
 def serialize_datetime(value: datetime) -> Any:
-    return value.astimezone(tz=timezone.utc).strftime("%Y-%m-%dT%H:%M:%S%z")
+    # same output as strftime(DATETIME_FORMAT) in UTC, without microseconds
+    if value.tzinfo is not timezone.utc:
+        value = value.astimezone(tz=timezone.utc)
+    return "%04d-%02d-%02dT%02d:%02d:%02d+0000" % (
+        value.year,
+        value.month,
+        value.day,
+        value.hour,
+        value.minute,
+        value.second,
+    )
@@ -1,10 +1,10 @@
-from typing import Any, Generator, List, Type, TypeVar, cast
+from typing import Any, Callable, Generator, List, Type, TypeVar, cast
 
 from pocpoc.api.codec.types import (
+    HomogeneousTypeDecoder,
     ParseProcessResult,
     ParseProcessYield,
     TypeArgsLengthMismatch,
-    TypeDecoder,
     ValidationError,
 )
 
@@ -13,7 +13,7 @@ T = TypeVar("T")
 from typing_extensions import Type
 
 
-class ListTypeDecoder(TypeDecoder[List[T]]):
+class ListTypeDecoder(HomogeneousTypeDecoder[List[T]]):
     def parse(
         self, value: Any, *types: Type[Any]
     ) -> Generator[
@@ -40,3 +40,9 @@ class ListTypeDecoder(TypeDecoder[List[T]]):
             parsed_list.append(parsed_item.result)
 
         return self._success(parsed_list)
+
+    def decode_items(self, value: Any, decode_item: Callable[[Any], T]) -> List[T]:
+        if not isinstance(value, list):
+            raise ValidationError(f"Expected list, got {value}")
+
+        return [decode_item(item) for item in value]
@@ -1,34 +1,27 @@
-from typing import Any, Callable, Generator, Type, TypeVar
+from typing import Any, Callable, Type, TypeVar, cast
 
 from pocpoc.api.codec.types import (
-    ParseProcessResult,
-    ParseProcessYield,
-    TypeDecoder,
+    LeafTypeDecoder,
     ValidationError,
 )
 
 T = TypeVar("T")
 
 
-class PrimitiveTypeDecoder(TypeDecoder[T]):
+class PrimitiveTypeDecoder(LeafTypeDecoder[T]):
     def __init__(self, type_: Callable[..., T], type_name: str) -> None:
         self.type_ = type_
         self.type_name = type_name
 
-    def parse(
-        self, value: Any, *types: Type[Any]
-    ) -> Generator[
-        ParseProcessYield[Any], ParseProcessResult[Any], ParseProcessResult[T]
-    ]:
+    def decode_value(self, value: Any, *types: Type[Any]) -> T:
+        if type(value) is self.type_:
+            return cast(T, value)
         try:
-            return self._success(self.type_(value))
+            return self.type_(value)
         except ValueError:
-            return self._failure(
-                ValidationError(
-                    f"Expected type {self.type_name}, but '{value}' is not a valid value"
-                )
+            raise ValidationError(
+                f"Expected type {self.type_name}, but '{value}' is not a valid value"
             )
-        yield
 
 
 def serialize_primitive(value: Any) -> Any:
@@ -1,17 +1,17 @@
-from typing import Any, Generator, Set, Type, TypeVar
+from typing import Any, Callable, Generator, Set, Type, TypeVar
 
 from pocpoc.api.codec.types import (
+    HomogeneousTypeDecoder,
     ParseProcessResult,
     ParseProcessYield,
     TypeArgsLengthMismatch,
-    TypeDecoder,
     ValidationError,
 )
 
 T = TypeVar("T")
 
 
-class SetTypeDecoder(TypeDecoder[Set[T]]):
+class SetTypeDecoder(HomogeneousTypeDecoder[Set[T]]):
     def parse(
         self, value: Any, *types: Type[Any]
     ) -> Generator[
@@ -32,7 +32,7 @@ class SetTypeDecoder(TypeDecoder[Set[T]]):
 
         for index, item in enumerate(value):
             parsed_item = yield ParseProcessYield(
-                item_type, item, json_path=f"[{index}]"
+                type_=item_type, value=item, json_path=f"[{index}]"
             )
             if isinstance(parsed_item.result, Exception):
                 raise parsed_item.result
@@ -40,3 +40,9 @@ class SetTypeDecoder(TypeDecoder[Set[T]]):
             initial_set.add(parsed_item.result)
 
         return self._success(initial_set)
+
+    def decode_items(self, value: Any, decode_item: Callable[[Any], T]) -> Set[T]:
+        if not isinstance(value, list):
+            raise ValidationError(f"Expected list, got {value}")
+
+        return {decode_item(item) for item in value}
@@ -1,34 +1,25 @@
-from typing import Any, Generator, Type, TypeVar
+from typing import Any, Type, TypeVar
 from datetime import datetime, time
 
 from pocpoc.api.codec.types import (
-    ParseProcessResult,
-    ParseProcessYield,
-    TypeDecoder,
+    LeafTypeDecoder,
     ValidationError,
 )
 
 T = TypeVar("T")
 
 
-class TimeTypeDecoder(TypeDecoder[time]):
-    def parse(
-        self, value: Any, *types: Type[Any]
-    ) -> Generator[
-        ParseProcessYield[Any], ParseProcessResult[Any], ParseProcessResult[time]
-    ]:
+class TimeTypeDecoder(LeafTypeDecoder[time]):
+    def decode_value(self, value: Any, *types: Type[Any]) -> time:
         if not isinstance(value, str):
-            return self._failure(ValidationError(f"Expected string, got {value}"))
+            raise ValidationError(f"Expected string, got {value}")
 
         try:
-            return self._success(datetime.strptime(value, "%H:%M:%S").time())
+            return datetime.strptime(value, "%H:%M:%S").time()
         except ValueError:
-            return self._failure(
-                ValidationError(
-                    f"Expected date in format YYYY-MM-DD, but {value} is not a valid value"
-                )
+            raise ValidationError(
+                f"Expected date in format YYYY-MM-DD, but {value} is not a valid value"
             )
-        yield
 
 
 def serialize_time(value: time) -> Any:
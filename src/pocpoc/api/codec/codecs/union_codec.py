@@ -1,4 +1,6 @@
-from typing import Any, Generator, Type, TypeVar
+from dataclasses import MISSING
+from enum import Enum
+from typing import Any, Dict, Generator, Optional, Tuple, Type, TypeVar
 
 from pocpoc.api.codec.types import (
     ParseProcessResult,
@@ -9,13 +11,100 @@ from pocpoc.api.codec.types import (
 
 T = TypeVar("T")
 
+UnionDiscriminator = Tuple[str, Dict[Any, Type[Any]]]
+
+
+def get_discriminator_tag(type_: Type[Any]) -> Optional[Tuple[str, Any]]:
+    """
+    Returns the (field name, tag) pair identifying `type_` inside a union.
+
+    The field name comes from a `__discriminator__` class attribute. The tag is
+    the default value of the dataclass field with that name or, when there is
+    no such field, the result of the class' `message_type()`.
+    """
+    field_name = getattr(type_, "__discriminator__", None)
+    if not isinstance(field_name, str):
+        return None
+
+    field = getattr(type_, "__dataclass_fields__", {}).get(field_name)
+    if field is not None:
+        if field.default is MISSING:
+            return None
+        tag = field.default
+    elif callable(getattr(type_, "message_type", None)):
+        tag = type_.message_type()
+    else:
+        return None
+
+    return field_name, tag.value if isinstance(tag, Enum) else tag
+
+
+def get_union_discriminator(
+    types: Tuple[Type[Any], ...]
+) -> Optional[UnionDiscriminator]:
+    field_names = set()
+    members: Dict[Any, Type[Any]] = {}
+    for type_ in types:
+        if type_ is type(None):
+            continue
+
+        tag = get_discriminator_tag(type_)
+        if tag is None or tag[1] in members:
+            return None
+
+        field_names.add(tag[0])
+        members[tag[1]] = type_
+
+    if len(field_names) != 1:
+        return None
+
+    return field_names.pop(), members
+
+
+def get_discriminated_type(
+    discriminator: UnionDiscriminator, value: Any
+) -> Optional[Type[Any]]:
+    if not isinstance(value, dict):
+        return None
+
+    field_name, members = discriminator
+    try:
+        return members.get(value.get(field_name))
+    except TypeError:
+        # unhashable tag value
+        return None
+
 
 class UnionTypeDecoder(TypeDecoder[Any]):
+    def __init__(self) -> None:
+        self.discriminators: Dict[
+            Tuple[Type[Any], ...], Optional[UnionDiscriminator]
+        ] = {}
+
+    def get_discriminator(
+        self, types: Tuple[Type[Any], ...]
+    ) -> Optional[UnionDiscriminator]:
+        if types not in self.discriminators:
+            self.discriminators[types] = get_union_discriminator(types)
+        return self.discriminators[types]
+
     def parse(
         self, value: Any, *types: Type[Any]
     ) -> Generator[
         ParseProcessYield[Any], ParseProcessResult[Any], ParseProcessResult[Any]
     ]:
+        discriminator = self.get_discriminator(types)
+        if discriminator is not None:
+            discriminated_type = get_discriminated_type(discriminator, value)
+            if discriminated_type is not None:
+                result = yield ParseProcessYield(
+                    type_=discriminated_type,
+                    value=value,
+                    json_path="",
+                    skip_raise=True,
+                )
+                return result
+
         if type(value) in types:
             result = yield ParseProcessYield(
                 type_=type(value),
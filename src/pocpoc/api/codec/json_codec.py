@@ -1,4 +1,5 @@
-from dataclasses import MISSING, asdict, dataclass, is_dataclass
+from abc import ABC, abstractmethod
+from dataclasses import MISSING, Field, dataclass, fields, is_dataclass
 from datetime import date, datetime, time
 from decimal import Decimal
 from enum import Enum
@@ -6,6 +7,7 @@ from typing import (
     Any,
     Callable,
     Dict,
+    Generic,
     List,
     Optional,
     Tuple,
@@ -42,36 +44,107 @@ from pocpoc.api.codec.codecs.tuple_codec import (
 from pocpoc.api.codec.codecs.union_codec import (
     UnionTypeDecoder as UnionTypeParser,
 )
+from pocpoc.api.codec.codecs.union_codec import (
+    get_discriminated_type,
+    get_discriminator_tag,
+)
 from pocpoc.api.codec.types import (
     AssumeDataclass,
     AssumeGeneric,
     AssumeNewType,
+    HomogeneousTypeDecoder,
+    LeafTypeDecoder,
     ParseProcessResult,
     TypeDecoder,
     ValidationError,
+    ValidationErrorBase,
 )
 from pocpoc.api.codec.utils import is_generic
 
 T = TypeVar("T")
 
-typers_parsers: Dict[Any, TypeDecoder[Any]] = {
-    Decimal: PrimitiveTypeDecoder(Decimal, "Decimal"),
-    str: PrimitiveTypeDecoder(str, "string"),
-    int: PrimitiveTypeDecoder(int, "int"),
-    float: PrimitiveTypeDecoder(float, "float"),
-    bool: PrimitiveTypeDecoder(bool, "bool"),
-    dict: DictTypeDecoder(),
-    list: ListTypeParser(),
-    tuple: TupleTypeParser(),
-    set: SetTypeParser(),
-    UUID: PrimitiveTypeDecoder(UUID, "UUID"),
-    Union: UnionTypeParser(),
-    Any: PrimitiveTypeDecoder(lambda x: x, "Any"),
-    date: DateTypeDecoder(),
-    datetime: DateTimeTypeDecoder(),
-    time: TimeTypeParser(),
-    type(None): PrimitiveTypeDecoder(lambda x: None, "null"),
-}
+
+class TypeDecoderRegistry(Dict[Any, TypeDecoder[Any]]):
+    """
+    Maps types to their `TypeDecoder`. Any change to the mapping calls the
+    registered listeners, so caches derived from it are dropped.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.listeners: List[Callable[[], None]] = []
+
+    def on_change(self, listener: Callable[[], None]) -> None:
+        self.listeners.append(listener)
+
+    def _changed(self) -> None:
+        for listener in self.listeners:
+            listener()
+
+    def __setitem__(self, key: Any, value: TypeDecoder[Any]) -> None:
+        super().__setitem__(key, value)
+        self._changed()
+
+    def __delitem__(self, key: Any) -> None:
+        super().__delitem__(key)
+        self._changed()
+
+    def __ior__(self, other: Any) -> "TypeDecoderRegistry":  # type: ignore
+        self.update(other)
+        return self
+
+    def update(self, *args: Any, **kwargs: Any) -> None:
+        super().update(*args, **kwargs)
+        self._changed()
+
+    def setdefault(self, key: Any, default: Any = None) -> TypeDecoder[Any]:
+        value = super().setdefault(key, default)
+        self._changed()
+        return value
+
+    def pop(self, key: Any, *args: Any) -> Any:
+        value = super().pop(key, *args)
+        self._changed()
+        return value
+
+    def popitem(self) -> Tuple[Any, TypeDecoder[Any]]:
+        item = super().popitem()
+        self._changed()
+        return item
+
+    def clear(self) -> None:
+        super().clear()
+        self._changed()
+
+
+typers_parsers = TypeDecoderRegistry(
+    {
+        Decimal: PrimitiveTypeDecoder(Decimal, "Decimal"),
+        str: PrimitiveTypeDecoder(str, "string"),
+        int: PrimitiveTypeDecoder(int, "int"),
+        float: PrimitiveTypeDecoder(float, "float"),
+        bool: PrimitiveTypeDecoder(bool, "bool"),
+        dict: DictTypeDecoder(),
+        list: ListTypeParser(),
+        tuple: TupleTypeParser(),
+        set: SetTypeParser(),
+        UUID: PrimitiveTypeDecoder(UUID, "UUID"),
+        Union: UnionTypeParser(),
+        Any: PrimitiveTypeDecoder(lambda x: x, "Any"),
+        date: DateTypeDecoder(),
+        datetime: DateTimeTypeDecoder(),
+        time: TimeTypeParser(),
+        type(None): PrimitiveTypeDecoder(lambda x: None, "null"),
+    }
+)
+
+
+def register_type_decoder(type_: Type[T], decoder: TypeDecoder[T]) -> None:
+    """
+    Decodes `type_`, and subclasses without a decoder of their own, with
+    `decoder`. Compiled decoder plans are rebuilt on their next use.
+    """
+    typers_parsers[type_] = decoder
 
 
 @dataclass
@@ -89,15 +162,41 @@ class LocatedValidationErrorCollection(Exception):
         return "\n".join(["{}: {}".format(e.json_path, str(e)) for e in self.errors])
 
 
-def __get_recursive_mapped_type(cls_type: Type[Any]) -> Type[Any]:
-    if not hasattr(cls_type, "__bases__") or len(cls_type.__bases__) == 0:
-        return cls_type
+# A json path is kept as a (parent, segment) chain while decoding and only
+# rendered to a string when a LocatedValidationError is recorded.
+JsonPath = Tuple[Any, str]
+
+ROOT_JSON_PATH: JsonPath = (None, "$")
+
+
+def format_json_path(json_path: JsonPath) -> str:
+    segments: List[str] = []
+    node: Optional[JsonPath] = json_path
+    while node is not None:
+        node, segment = node
+        segments.append(segment)
+    return "".join(reversed(segments))
+
 
-    while cls_type not in typers_parsers:
-        cls_type = cls_type.__bases__[0]
-        if cls_type not in typers_parsers:
-            return __get_recursive_mapped_type(cls_type)
-    return cls_type
+__mapped_types: Dict[Any, Type[Any]] = {}
+
+
+def get_mapped_type(cls_type: Type[Any]) -> Type[Any]:
+    """
+    Returns the first class in the MRO of `cls_type` with a registered decoder,
+    or `cls_type` itself when there is none.
+    """
+    try:
+        return __mapped_types[cls_type]
+    except KeyError:
+        pass
+
+    mapped_type = next(
+        (base for base in getattr(cls_type, "__mro__", ()) if base in typers_parsers),
+        cls_type,
+    )
+    __mapped_types[cls_type] = mapped_type
+    return mapped_type
 
 
 def is_new_type(type_: Type[Any]) -> bool:
@@ -112,75 +211,291 @@ def is_typing_unmappable(type_: Type[Any]) -> bool:
     return type_ is Any or type_ is type(None)
 
 
-def __parse_value(
-    value: Any,
-    type_: Type[T],
-    json_path: str = "$",
-    located_errors: List[LocatedValidationError] = [],
-    skip_raise: bool = False,
-) -> ParseProcessResult[T]:
-    real_type = type_
-    target_type = type_
-    type_args: Tuple[Type[Any], ...] = ()
-    if is_typing_unmappable(type_):
-        ...
-    elif is_generic(type_):
-        real_type = cast(AssumeGeneric, type_).__origin__
-        target_type = real_type
-        type_args = cast(AssumeGeneric, type_).__args__
-    elif is_new_type(type_):
-        target_type = get_new_type_supertype(type_)
-    elif not is_dataclass(type_) and not issubclass(real_type, Enum):
-        target_type = __get_recursive_mapped_type(type_)
-
-    if target_type in typers_parsers:
-        parser = typers_parsers[target_type]
-        parser_generator = parser.parse(value, *type_args)
+class DecoderPlan(ABC, Generic[T]):
+    """
+    Decoding steps for a single type, resolved once by `compile_decoder` and
+    reused for every value decoded as that type.
+    """
+
+    @abstractmethod
+    def parse(
+        self,
+        value: Any,
+        json_path: JsonPath,
+        located_errors: List[LocatedValidationError],
+        skip_raise: bool = False,
+    ) -> Any:
+        """
+        Returns the decoded value, or the `Exception` describing why it could
+        not be decoded.
+        """
+        raise NotImplementedError()
+
+    def decode(self, value: Any) -> T:
+        errors: List[LocatedValidationError] = []
+        result = self.parse(value, ROOT_JSON_PATH, errors)
+        if len(errors):
+            raise LocatedValidationErrorCollection(errors)
+
+        if isinstance(result, Exception):
+            raise result
+
+        return cast(T, result)
+
+
+class _TypeDecoderPlan(DecoderPlan[T]):
+    def __init__(
+        self,
+        parser: TypeDecoder[Any],
+        type_args: Tuple[Type[Any], ...],
+        convert: Optional[Callable[[Any], T]],
+    ) -> None:
+        self.parser = parser
+        self.type_args = type_args
+        self.convert = convert
+
+    def parse(
+        self,
+        value: Any,
+        json_path: JsonPath,
+        located_errors: List[LocatedValidationError],
+        skip_raise: bool = False,
+    ) -> Any:
+        parser_generator = self.parser.parse(value, *self.type_args)
         try:
             parsed_yield = parser_generator.send(cast(Any, None))
             while True:
-                parsed_value = __parse_value(
+                parsed_value = compile_decoder(parsed_yield.type_).parse(
                     parsed_yield.value,
-                    parsed_yield.type_,
-                    "{}{}".format(json_path, parsed_yield.json_path),
+                    (json_path, parsed_yield.json_path),
                     located_errors,
                     parsed_yield.skip_raise,
                 )
-                parsed_yield = parser_generator.send(parsed_value)
+                parsed_yield = parser_generator.send(ParseProcessResult(parsed_value))
         except StopIteration as e:
             final = e.value
             if not isinstance(final, ParseProcessResult):
-                raise ValueError(f"Parser {parser} did not return a ParseProcessResult")
-            if isinstance(final.result, Exception) and not skip_raise:
+                raise ValueError(
+                    f"Parser {self.parser} did not return a ParseProcessResult"
+                )
+
+        result = final.result
+        if isinstance(result, Exception) and not skip_raise:
+            located_errors.append(
+                LocatedValidationError(
+                    message=str(result),
+                    json_path=format_json_path(json_path),
+                )
+            )
+
+        if self.convert is not None:
+            if isinstance(result, Exception):
+                return None
+            return self.convert(result)
+
+        return result
+
+
+class _LeafDecoderPlan(DecoderPlan[T]):
+    def __init__(
+        self,
+        parser: LeafTypeDecoder[Any],
+        type_args: Tuple[Type[Any], ...],
+        convert: Optional[Callable[[Any], T]],
+    ) -> None:
+        self.decode_value = parser.decode_value
+        self.type_args = type_args
+        self.convert = convert
+
+    def parse(
+        self,
+        value: Any,
+        json_path: JsonPath,
+        located_errors: List[LocatedValidationError],
+        skip_raise: bool = False,
+    ) -> Any:
+        try:
+            result = self.decode_value(value, *self.type_args)
+        except ValidationErrorBase as e:
+            if not skip_raise:
                 located_errors.append(
                     LocatedValidationError(
-                        message=str(final.result),
-                        json_path=json_path,
+                        message=str(e),
+                        json_path=format_json_path(json_path),
                     )
                 )
+            return None if self.convert is not None else e
+
+        if self.convert is not None:
+            return self.convert(result)
+
+        return result
+
+    def decode_item(self, value: Any) -> Any:
+        result = self.decode_value(value, *self.type_args)
+        if self.convert is not None:
+            return self.convert(result)
+        return result
+
+
+class _HomogeneousLeafPlan(DecoderPlan[T]):
+    def __init__(
+        self,
+        parser: HomogeneousTypeDecoder[Any],
+        item_plan: _LeafDecoderPlan[Any],
+        fallback: DecoderPlan[T],
+    ) -> None:
+        self.decode_items = parser.decode_items
+        self.decode_item: Callable[[Any], Any] = (
+            item_plan.decode_value
+            if item_plan.convert is None and not item_plan.type_args
+            else item_plan.decode_item
+        )
+        self.fallback = fallback
+
+    def parse(
+        self,
+        value: Any,
+        json_path: JsonPath,
+        located_errors: List[LocatedValidationError],
+        skip_raise: bool = False,
+    ) -> Any:
+        try:
+            return self.decode_items(value, self.decode_item)
+        except ValidationErrorBase:
+            # decode again item by item to locate and report the errors
+            return self.fallback.parse(value, json_path, located_errors, skip_raise)
+
+
+class _UnionPlan(DecoderPlan[T]):
+    """
+    Native equivalent of `UnionTypeDecoder.parse`, with shortcuts for tagged
+    unions and `Optional[X]`.
+    """
+
+    def __init__(
+        self,
+        parser: UnionTypeParser,
+        types: Tuple[Type[Any], ...],
+    ) -> None:
+        self.types = types
+        self.discriminator = parser.get_discriminator(types)
+        self.optional_type: Optional[Type[Any]] = (
+            types[0] if len(types) == 2 and types[1] is type(None) else None
+        )
 
-            if target_type != real_type:
-                if not isinstance(final.result, Exception):
-                    final = ParseProcessResult(
-                        result=cast(Type[Any], real_type)(final.result),
-                    )
-                else:
-                    final = ParseProcessResult(
-                        result=None,
-                    )
+    def parse(
+        self,
+        value: Any,
+        json_path: JsonPath,
+        located_errors: List[LocatedValidationError],
+        skip_raise: bool = False,
+    ) -> Any:
+        if self.optional_type is not None:
+            if value is None:
+                return None
+            if type(value) is not self.optional_type:
+                result = compile_decoder(self.optional_type).parse(
+                    value, json_path, located_errors, True
+                )
+                # like the generic path, falls back to the always matching None
+                return None if isinstance(result, Exception) else result
+
+        if self.discriminator is not None:
+            discriminated_type = get_discriminated_type(self.discriminator, value)
+            if discriminated_type is not None:
+                return compile_decoder(discriminated_type).parse(
+                    value, json_path, located_errors, skip_raise
+                )
 
-            return cast(ParseProcessResult[T], final)
+        if type(value) in self.types:
+            result = compile_decoder(type(value)).parse(
+                value, json_path, located_errors
+            )
+        else:
+            for type_ in self.types:
+                result = compile_decoder(type_).parse(
+                    value, json_path, located_errors, True
+                )
+                if not isinstance(result, Exception):
+                    return result
+
+            result = ValidationError(
+                f"Value {value} does not match any of the union types"
+            )
 
-    elif is_dataclass(real_type):
+        if isinstance(result, Exception) and not skip_raise:
+            located_errors.append(
+                LocatedValidationError(
+                    message=str(result),
+                    json_path=format_json_path(json_path),
+                )
+            )
+        return result
+
+
+class _DataclassPlan(DecoderPlan[T]):
+    def __init__(self, type_: Type[T]) -> None:
+        self.type_ = type_
+        # compiled on first use, so self-referencing dataclasses can resolve
+        # their own plan from the cache
+        self.fields: Optional[
+            List[Tuple[str, "Field[Any]", str, DecoderPlan[Any]]]
+        ] = None
+
+    def __compile_fields(
+        self,
+    ) -> List[Tuple[str, "Field[Any]", str, DecoderPlan[Any]]]:
+        dataclass_fields = cast(AssumeDataclass, self.type_).__dataclass_fields__
+        self.fields = [
+            (
+                field_name,
+                field,
+                ".{}".format(field_name),
+                compile_decoder(cast(Type[Any], field.type)),
+            )
+            for field_name, field in dataclass_fields.items()
+        ]
+        return self.fields
+
+    def parse(
+        self,
+        value: Any,
+        json_path: JsonPath,
+        located_errors: List[LocatedValidationError],
+        skip_raise: bool = False,
+    ) -> Any:
         try:
-            return ParseProcessResult(
-                __parse_dataclass(
-                    value,
-                    real_type,
-                    json_path,
+            assert isinstance(value, dict), "Value must be a dict"
+
+            fields = self.fields
+            if fields is None:
+                fields = self.__compile_fields()
+
+            kwargs: Dict[str, Any] = {}
+            for field_name, field, field_segment, plan in fields:
+                if field_name not in value:
+                    if field.default is not MISSING:
+                        kwargs[field_name] = field.default
+                    elif field.default_factory is not MISSING:  # type: ignore
+                        kwargs[field_name] = field.default_factory()  # type: ignore
+                    else:
+                        kwargs[field_name] = None
+                        located_errors.append(
+                            LocatedValidationError(
+                                message="Missing required field: {}".format(field_name),
+                                json_path=format_json_path(json_path),
+                            )
+                        )
+                    continue
+
+                kwargs[field_name] = plan.parse(
+                    value[field_name],
+                    (json_path, field_segment),
                     located_errors,
                 )
-            )
+
+            return cast(Callable[..., T], self.type_)(**kwargs)
         except AssertionError as e:
             error = ValidationError(
                 str(e),
@@ -189,120 +504,224 @@ def __parse_value(
                 located_errors.append(
                     LocatedValidationError(
                         message=str(error),
-                        json_path=json_path,
+                        json_path=format_json_path(json_path),
                     )
                 )
-            return ParseProcessResult(error)
-    elif issubclass(real_type, Enum):
+            return error
+
+
+class _EnumPlan(DecoderPlan[T]):
+    def __init__(self, type_: Type[T]) -> None:
+        self.type_ = type_
+
+    def parse(
+        self,
+        value: Any,
+        json_path: JsonPath,
+        located_errors: List[LocatedValidationError],
+        skip_raise: bool = False,
+    ) -> Any:
         try:
-            value = real_type(value)
-            return ParseProcessResult(value)
+            return cast(Callable[[Any], T], self.type_)(value)
         except ValueError:
             error = ValidationError(
                 "Invalid enum value for {}: {} | valid types: {}".format(
-                    real_type,
+                    self.type_,
                     value,
-                    ", ".join(k for k, v in real_type.__members__.items()),
+                    ", ".join(k for k, v in cast(Any, self.type_).__members__.items()),
                 )
             )
             if not skip_raise:
                 located_errors.append(
                     LocatedValidationError(
                         message=str(error),
-                        json_path=json_path,
+                        json_path=format_json_path(json_path),
                     )
                 )
-            return ParseProcessResult(error)
-
-    else:
-        raise ValueError(f"Unsupported type: {type_}")
+            return error
 
 
-def __parse_dataclass(
-    value: Any,
-    type_: Type[T],
-    json_path: str = "$",
-    located_errors: List[LocatedValidationError] = [],
-) -> T:
-    assert isinstance(value, dict), "Value must be a dict"
+class _UnsupportedTypePlan(DecoderPlan[T]):
+    def __init__(self, type_: Type[T]) -> None:
+        self.type_ = type_
 
-    assert is_dataclass(type_), "Type must be a dataclass"
+    def parse(
+        self,
+        value: Any,
+        json_path: JsonPath,
+        located_errors: List[LocatedValidationError],
+        skip_raise: bool = False,
+    ) -> Any:
+        raise ValueError(f"Unsupported type: {self.type_}")
 
-    fields = cast(AssumeDataclass, type_).__dataclass_fields__
 
-    kwargs: Dict[str, Any] = {}
+def is_enum_type(type_: Type[Any]) -> bool:
+    return isinstance(type_, type) and issubclass(type_, Enum)
 
-    for field_name, field in fields.items():
-        field_json_path = "{}.{}".format(json_path, field_name)
 
-        if field_name not in value:
-            if field.default is not None and field.default is not MISSING:
-                kwargs[field_name] = field.default
-            elif field.default_factory is not None and field.default_factory is not MISSING:  # type: ignore
-                kwargs[field_name] = field.default_factory()  # type: ignore
-            else:
-                kwargs[field_name] = None
-                located_errors.append(
-                    LocatedValidationError(
-                        message="Missing required field: {}".format(field_name),
-                        json_path=json_path,
-                    )
-                )
-            continue
+def __build_decoder_plan(type_: Type[T]) -> DecoderPlan[T]:
+    real_type = type_
+    target_type = type_
+    type_args: Tuple[Type[Any], ...] = ()
+    if is_typing_unmappable(type_):
+        ...
+    elif is_generic(type_):
+        real_type = cast(AssumeGeneric, type_).__origin__
+        target_type = real_type
+        type_args = cast(AssumeGeneric, type_).__args__
+    elif is_new_type(type_):
+        target_type = get_new_type_supertype(type_)
+    elif not is_dataclass(type_) and not is_enum_type(type_):
+        target_type = get_mapped_type(type_)
 
-        parsed_value = __parse_value(
-            value[field_name],
-            field.type,
-            field_json_path,
-            located_errors,
+    if target_type in typers_parsers:
+        parser = typers_parsers[target_type]
+        convert = (
+            cast(Callable[[Any], T], real_type) if target_type != real_type else None
         )
+        # subclasses overriding parse() keep going through the generator protocol
+        if (
+            isinstance(parser, LeafTypeDecoder)
+            and type(parser).parse is LeafTypeDecoder.parse
+        ):
+            return _LeafDecoderPlan(parser, type_args, convert)
 
-        kwargs[field_name] = parsed_value.result
+        if type(parser) is UnionTypeParser:
+            return _UnionPlan(parser, type_args)
 
-    return cast(Callable[..., T], type_)(**kwargs)
+        plan = _TypeDecoderPlan(parser, type_args, convert)
+        if isinstance(parser, HomogeneousTypeDecoder) and len(type_args) == 1:
+            item_plan = compile_decoder(type_args[0])
+            if isinstance(item_plan, _LeafDecoderPlan):
+                return _HomogeneousLeafPlan(parser, item_plan, plan)
 
+        return plan
 
-def decode(value: Any, type_: Type[T]) -> T:
-    errors: List[LocatedValidationError] = []
-    parsed_value = __parse_value(value, type_, located_errors=errors)
-    if len(errors):
-        raise LocatedValidationErrorCollection(errors)
+    if is_dataclass(real_type):
+        return _DataclassPlan(real_type)
+
+    if is_enum_type(real_type):
+        return _EnumPlan(real_type)
 
-    if isinstance(parsed_value.result, Exception):
-        raise parsed_value.result
+    return _UnsupportedTypePlan(type_)
 
-    return parsed_value.result
+
+__decoder_plans: Dict[Any, DecoderPlan[Any]] = {}
+
+
+def compile_decoder(type_: Type[T]) -> DecoderPlan[T]:
+    """
+    Returns the cached decoder plan for `type_`, compiling it on first use.
+    """
+    try:
+        return __decoder_plans[type_]
+    except KeyError:
+        plan = __decoder_plans[type_] = __build_decoder_plan(type_)
+        return plan
+    except TypeError:
+        # unhashable annotations can't be cached
+        return __build_decoder_plan(type_)
+
+
+def __clear_type_caches() -> None:
+    __mapped_types.clear()
+    __decoder_plans.clear()
+
+
+typers_parsers.on_change(__clear_type_caches)
+
+
+def decode(value: Any, type_: Type[T]) -> T:
+    return compile_decoder(type_).decode(value)
 
 
 def optional(T: Type[T]) -> Type[T]:
     return Optional[T]  # type: ignore
 
 
-def __encode(value: Any) -> Any:
-    if isinstance(value, Enum):
-        return value.value
-    if isinstance(value, datetime):
-        return serialize_datetime(value)
-    if isinstance(value, date):
-        return serialize_date(value)
-    if isinstance(value, time):
-        return serialize_time(value)
-    if isinstance(value, Enum):
-        return value.value
-    if isinstance(value, (Decimal, UUID, str)):
-        return str(value)
-    if isinstance(value, (int, float, bool)):
-        return value
-    if isinstance(value, (list, tuple)):
-        return [__encode(v) for v in value]
-    if isinstance(value, dict):
-        return {__encode(k): __encode(v) for k, v in value.items()}
-    if is_dataclass(value):
-        return __encode(asdict(value))
-    if value is None:
-        return None
-    raise ValueError(f"Unsupported type: {type(value)}")
+def _encode_identity(value: Any) -> Any:
+    return value
+
+
+def _encode_enum(value: Enum) -> Any:
+    return value.value
+
+
+class ValueEncoder:
+    """
+    Encodes values into JSON compatible primitives. Instances of
+    `native_types` are returned as they are, for formats that can represent
+    them natively.
+    """
+
+    def __init__(self, native_types: Tuple[Type[Any], ...] = ()) -> None:
+        self.native_types = native_types
+        # encoders are resolved by exact type, so subclasses get their own entry
+        self.encoders: Dict[Type[Any], Callable[[Any], Any]] = {}
+
+    def encode(self, value: Any) -> Any:
+        encoder = self.encoders.get(type(value))
+        if encoder is None:
+            encoder = self.encoders[type(value)] = self.build_encoder(type(value))
+        return encoder(value)
+
+    def encode_sequence(self, value: Any) -> Any:
+        return [self.encode(v) for v in value]
+
+    def encode_dict(self, value: Dict[Any, Any]) -> Any:
+        return {self.encode(k): self.encode(v) for k, v in value.items()}
+
+    def build_dataclass_encoder(self, cls: Type[Any]) -> Callable[[Any], Any]:
+        field_names = tuple(f.name for f in fields(cls))
+        encode = self.encode
+
+        def encode_dataclass(value: Any) -> Any:
+            return {name: encode(getattr(value, name)) for name in field_names}
+
+        tag = get_discriminator_tag(cls)
+        if tag is None or tag[0] in field_names:
+            return encode_dataclass
+
+        # tags that aren't a field (message_type()) are written next to the fields
+        tag_name, tag_value = tag
+
+        def encode_tagged_dataclass(value: Any) -> Any:
+            encoded = encode_dataclass(value)
+            encoded[tag_name] = tag_value
+            return encoded
+
+        return encode_tagged_dataclass
+
+    def build_encoder(self, cls: Type[Any]) -> Callable[[Any], Any]:
+        if issubclass(cls, Enum):
+            return _encode_enum
+        if self.native_types and issubclass(cls, self.native_types):
+            return _encode_identity
+        if issubclass(cls, datetime):
+            return serialize_datetime
+        if issubclass(cls, date):
+            return serialize_date
+        if issubclass(cls, time):
+            return serialize_time
+        if cls is str:
+            return _encode_identity
+        if issubclass(cls, (Decimal, UUID, str)):
+            return str
+        if issubclass(cls, (int, float, bool)):
+            return _encode_identity
+        if issubclass(cls, (list, tuple)):
+            return self.encode_sequence
+        if issubclass(cls, dict):
+            return self.encode_dict
+        if is_dataclass(cls):
+            return self.build_dataclass_encoder(cls)
+        if cls is type(None):
+            return _encode_identity
+        raise ValueError(f"Unsupported type: {cls}")
+
+
+json_value_encoder = ValueEncoder()
 
 
 def encode(value: Any) -> Any:
-    return __encode(value)
+    return json_value_encoder.encode(value)
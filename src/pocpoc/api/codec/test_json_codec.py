@@ -1,16 +1,44 @@
 import json
 from dataclasses import dataclass
-from datetime import date, datetime, time, timezone
+from datetime import date, datetime, time, timedelta, timezone
 from decimal import Decimal
 from enum import Enum
-from typing import Dict, List, NewType, Optional, Union
+from uuid import UUID
+from typing import (
+    Any,
+    ClassVar,
+    Dict,
+    Generator,
+    List,
+    NewType,
+    Optional,
+    Set,
+    Tuple,
+    Type,
+    Union,
+    cast,
+)
 
 import pytest
 
+from pocpoc.api.codec.codecs.primitive_codec import PrimitiveTypeDecoder
 from pocpoc.api.codec.json_codec import (
+    ROOT_JSON_PATH,
     LocatedValidationErrorCollection,
+    compile_decoder,
     decode,
+    encode,
+    format_json_path,
+    get_mapped_type,
     optional,
+    register_type_decoder,
+    typers_parsers,
+)
+from pocpoc.api.codec.types import (
+    ParseProcessResult,
+    ParseProcessYield,
+    TypeDecoder,
+    ValidationError,
 )
 from pocpoc.api.codec.utils import get_class_or_type_name
 
@@ -293,6 +321,41 @@ class TestJsonDeserializerCodec:
 
             decode(dummy_json, Dummy)
 
+    def test_datetime_formats(self) -> None:
+        utc = datetime(2020, 1, 1, 12, 30, 15, tzinfo=timezone.utc)
+
+        assert decode("2020-01-01T12:30:15+0000", datetime) == utc
+        assert decode("2020-01-01T12:30:15+00:00", datetime) == utc
+        assert decode("2020-01-01T12:30:15Z", datetime) == utc
+        assert decode("2020-01-01T12:30:15.25Z", datetime) == utc.replace(
+            microsecond=250000
+        )
+
+        offset = decode("2020-01-01T09:30:15-03:00", datetime)
+        assert offset == utc
+        assert offset.utcoffset() == timedelta(hours=-3)
+
+        with pytest.raises(LocatedValidationErrorCollection):
+            decode("2020-02-30T00:00:00+0000", datetime)
+
+    def test_datetime_round_trip(self) -> None:
+        value = datetime(2020, 1, 1, 9, 30, tzinfo=timezone(timedelta(hours=-3)))
+
+        assert encode(value) == "2020-01-01T12:30:00+0000"
+        assert decode(encode(value), datetime) == value
+
+    def test_missing_fields_use_defaults(self) -> None:
+        @dataclass
+        class Dummy:
+            required: int
+            optional: Optional[int] = None
+            number: int = 3
+
+        assert decode({"required": 1}, Dummy) == Dummy(1, None, 3)
+
+        with pytest.raises(LocatedValidationErrorCollection):
+            decode({}, Dummy)
+
     def test_primitive_class_inheritance(self) -> None:
         class MyInt(int):
             pass
@@ -341,3 +404,278 @@ class TestJsonDeserializerCodec:
 
         assert decode(json.loads("1"), UserId) == UserId(1)
         assert isinstance(decode(json.loads("1"), UserId), int)
+
+    def test_compile_decoder_is_cached(self) -> None:
+        @dataclass
+        class Dummy:
+            values: List[int]
+
+        plan = compile_decoder(Dummy)
+
+        assert compile_decoder(Dummy) is plan
+        assert compile_decoder(List[int]) is compile_decoder(List[int])
+        assert plan.decode({"values": ["1", 2]}) == Dummy(values=[1, 2])
+        assert plan.decode({"values": []}) == Dummy(values=[])
+
+    def test_dataclass_without_fields_is_compiled_once(self) -> None:
+        @dataclass
+        class Empty:
+            pass
+
+        plan: Any = compile_decoder(Empty)
+
+        assert plan.decode({}) == Empty()
+        fields = plan.fields
+        assert fields == []
+        assert plan.decode({"ignored": 1}) == Empty()
+        assert plan.fields is fields
+
+    def test_compiled_decoder_error_paths(self) -> None:
+        @dataclass
+        class Item:
+            amount: int
+
+        @dataclass
+        class Dummy:
+            items: List[Item]
+            extra: Dict[str, int]
+
+        with pytest.raises(LocatedValidationErrorCollection) as e:
+            decode(
+                {"items": [{"amount": 1}, {"amount": "x"}, {}], "extra": {"a": "b"}},
+                Dummy,
+            )
+
+        assert [(error.json_path, error.message) for error in e.value.errors] == [
+            ("$.items[1].amount", "Expected type int, but 'x' is not a valid value"),
+            ("$.items[2]", "Missing required field: amount"),
+            ("$.extra['a'] (value)", "Expected type int, but 'b' is not a valid value"),
+        ]
+
+    def test_format_json_path(self) -> None:
+        assert format_json_path(ROOT_JSON_PATH) == "$"
+        assert (
+            format_json_path(
+                ((((ROOT_JSON_PATH, ".items"), "[1]"), ".tags"), "['a'] (key)")
+            )
+            == "$.items[1].tags['a'] (key)"
+        )
+
+    def test_unmapped_type_raises_only_when_reached(self) -> None:
+        class NonMappedDummy:
+            pass
+
+        @dataclass
+        class Dummy:
+            non_mapped: NonMappedDummy
+
+        with pytest.raises(LocatedValidationErrorCollection):
+            decode({}, Dummy)
+
+        with pytest.raises(ValueError):
+            decode({"non_mapped": {}}, Dummy)
+
+    def test_leaf_decoder_generator_protocol(self) -> None:
+        generator = PrimitiveTypeDecoder(int, "int").parse("1")
+
+        with pytest.raises(StopIteration) as e:
+            next(generator)
+
+        assert e.value.value == ParseProcessResult(1)
+
+    def test_custom_generator_type_decoder(self) -> None:
+        class Wrapper:
+            def __init__(self, values: List[int]) -> None:
+                self.values = values
+
+        class WrapperTypeDecoder(TypeDecoder[Wrapper]):
+            def parse(
+                self, value: Any, *types: Type[Any]
+            ) -> Generator[
+                ParseProcessYield[Any],
+                ParseProcessResult[Any],
+                ParseProcessResult[Wrapper],
+            ]:
+                if not isinstance(value, list):
+                    return self._failure(ValidationError("Expected list"))
+
+                parsed = yield ParseProcessYield(value, List[int], "")
+                if isinstance(parsed.result, Exception):
+                    return self._failure(ValidationError("Invalid items"))
+                return self._success(Wrapper(parsed.result))
+
+        register_type_decoder(Wrapper, WrapperTypeDecoder())
+        try:
+            assert decode(["1", 2], Wrapper).values == [1, 2]
+
+            with pytest.raises(LocatedValidationErrorCollection):
+                decode("x", Wrapper)
+        finally:
+            del typers_parsers[Wrapper]
+
+    def test_decode_homogeneous_collections(self) -> None:
+        ids = [UUID(int=i) for i in range(100)]
+
+        assert decode([str(i) for i in ids], List[UUID]) == ids
+        assert decode(["1", 2, 2], Set[int]) == {1, 2}
+        assert decode([[1], ["2"]], List[List[int]]) == [[1], [2]]
+        assert decode(["1", "a"], cast(Type[Tuple[int, str]], Tuple[int, str])) == (
+            1,
+            "a",
+        )
+
+    def test_homogeneous_collection_error_paths(self) -> None:
+        class MyInt(int):
+            pass
+
+        with pytest.raises(LocatedValidationErrorCollection) as e:
+            decode(["1", "x", "2", "y"], List[MyInt])
+
+        assert [error.json_path for error in e.value.errors] == ["$[1]", "$[3]"]
+
+        with pytest.raises(LocatedValidationErrorCollection) as e:
+            decode({"a": 1}, Set[int])
+
+        assert [error.json_path for error in e.value.errors] == ["$"]
+
+    def test_mapped_type_resolves_through_mro(self) -> None:
+        class Mixin:
+            pass
+
+        class MixedInt(Mixin, int):
+            pass
+
+        class ChildInt(MixedInt):
+            pass
+
+        assert get_mapped_type(MixedInt) is int
+        assert get_mapped_type(ChildInt) is int
+        assert decode("2", ChildInt) == ChildInt(2)
+        assert isinstance(decode("2", ChildInt), ChildInt)
+
+    def test_register_type_decoder_invalidates_compiled_plans(self) -> None:
+        class Code(str):
+            pass
+
+        assert decode("abc", Code) == "abc"
+        assert get_mapped_type(Code) is str
+
+        register_type_decoder(Code, PrimitiveTypeDecoder(str.upper, "Code"))
+        try:
+            assert get_mapped_type(Code) is Code
+            assert decode("abc", Code) == "ABC"
+            assert decode(["abc"], List[Code]) == ["ABC"]
+        finally:
+            del typers_parsers[Code]
+
+        assert decode("abc", Code) == "abc"
+
+    def test_optional(self) -> None:
+        @dataclass
+        class Dummy:
+            value: int
+
+        assert decode(None, optional(Dummy)) is None
+        assert decode({"value": "1"}, optional(Dummy)) == Dummy(1)
+        assert decode("1", optional(int)) == 1
+        assert decode(1, optional(int)) == 1
+
+    def test_discriminated_union_by_field(self) -> None:
+        @dataclass
+        class Circle:
+            radius: int
+            kind: str = "circle"
+            __discriminator__ = "kind"
+
+        @dataclass
+        class Square:
+            side: int
+            kind: str = "square"
+            __discriminator__ = "kind"
+
+        shape_type: Any = Union[Circle, Square]
+
+        assert decode({"kind": "square", "side": "2"}, shape_type) == Square(side=2)
+
+        with pytest.raises(LocatedValidationErrorCollection) as e:
+            decode({"kind": "square", "side": "x"}, shape_type)
+
+        assert [(error.json_path, error.message) for error in e.value.errors] == [
+            ("$.side", "Expected type int, but 'x' is not a valid value")
+        ]
+
+    def test_discriminated_union_by_message_type(self) -> None:
+        @dataclass
+        class UserCreated:
+            name: str
+            __discriminator__ = "message_type"
+
+            @classmethod
+            def message_type(cls) -> str:
+                return "user_created"
+
+        @dataclass
+        class UserDeleted:
+            name: str
+            __discriminator__ = "message_type"
+
+            @classmethod
+            def message_type(cls) -> str:
+                return "user_deleted"
+
+        event_type: Any = Union[UserCreated, UserDeleted]
+        encoded = encode(UserDeleted(name="john"))
+
+        assert encoded == {"name": "john", "message_type": "user_deleted"}
+        assert decode(encoded, event_type) == UserDeleted("john")
+        assert decode(
+            [encode(UserCreated("a")), None, encode(UserDeleted("b"))],
+            List[optional(event_type)],  # type: ignore
+        ) == [UserCreated("a"), None, UserDeleted("b")]
+
+
+class TestJsonSerializerCodec:
+    def test_encode_primitives(self) -> None:
+        assert encode(1) == 1
+        assert encode(True) is True
+        assert encode(None) is None
+        assert encode(Decimal("1.10")) == "1.10"
+        assert encode(UUID(int=1)) == "00000000-0000-0000-0000-000000000001"
+        assert encode((1, "a")) == [1, "a"]
+        assert encode({1: Decimal("2")}) == {1: "2"}
+
+    def test_encode_nested_dataclass(self) -> None:
+        class MyEnum(Enum):
+            A = "A"
+
+        @dataclass
+        class Inner:
+            when: datetime
+            day: date
+            at: time
+
+        @dataclass
+        class Dummy:
+            inner: Inner
+            items: List[Inner]
+            pair: Tuple[int, MyEnum]
+            counter: ClassVar[int] = 0
+
+        inner = Inner(
+            datetime(2020, 1, 1, tzinfo=timezone.utc), date(2020, 1, 1), time(0, 0)
+        )
+        encoded_inner = {
+            "when": "2020-01-01T00:00:00+0000",
+            "day": "2020-01-01",
+            "at": "00:00:00",
+        }
+
+        assert encode(Dummy(inner, [inner], (1, MyEnum.A))) == {
+            "inner": encoded_inner,
+            "items": [encoded_inner],
+            "pair": [1, "A"],
+        }
+
+    def test_encode_unsupported_type(self) -> None:
+        with pytest.raises(ValueError):
+            encode(object())
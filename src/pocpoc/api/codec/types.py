@@ -2,6 +2,7 @@ from abc import ABC, abstractmethod
 from dataclasses import Field, dataclass
 from typing import (
     Any,
+    Callable,
     Dict,
     Generator,
     Generic,
@@ -100,3 +101,44 @@ class TypeDecoder(Generic[T], ABC):
 
     def _failure(self, error: ValidationErrorBase) -> ParseProcessResult[T]:
         return ParseProcessResult[T](result=error)
+
+
+class LeafTypeDecoder(TypeDecoder[T]):
+    """
+    A decoder for values that never contain other typed values.
+
+    `decode_value` returns the decoded value directly and raises a
+    `ValidationErrorBase` when the value is not valid, so compiled decoder
+    plans can call it without driving a generator. `parse` is kept for callers
+    that use the generator protocol.
+    """
+
+    @abstractmethod
+    def decode_value(self, value: Any, *types: Type[Any]) -> T:
+        raise NotImplementedError()
+
+    def parse(
+        self, value: Any, *types: Type[Any]
+    ) -> Generator[
+        ParseProcessYield[Any], ParseProcessResult[Any], ParseProcessResult[T]
+    ]:
+        try:
+            return self._success(self.decode_value(value, *types))
+        except ValidationErrorBase as e:
+            return self._failure(e)
+        yield
+
+
+class HomogeneousTypeDecoder(TypeDecoder[T]):
+    """
+    A container decoder whose items all share a single type argument.
+
+    When the items are decoded by a `LeafTypeDecoder`, compiled plans call
+    `decode_items` to convert the whole container in one pass. It raises a
+    `ValidationErrorBase` on the first invalid value without locating it; the
+    plan then falls back to `parse` to report the located errors.
+    """
+
+    @abstractmethod
+    def decode_items(self, value: Any, decode_item: Callable[[Any], Any]) -> T:
+        raise NotImplementedError()
@@ -16,25 +16,34 @@ class CustomDependencyInjectionManager(DependencyInjectionManger):
     def get_instance(self, type_: Type[InitializerType]) -> InitializerType:
         return cast(InitializerType, self.__get_or_create_instance(type_))
 
+    def create_instance(self, type_: Type[InitializerType]) -> InitializerType:
+        """
+        A new instance of `type_`, with its dependencies shared as usual.
+        """
+        return cast(
+            InitializerType,
+            self.__create_instance(self.cached_subtypes.get(type_, type_)),
+        )
+
     def __get_or_create_instance(self, type_: Type[Any]) -> Any:
         if type_ in self.cached_dependencies:
             logger.debug(
-                "Using cached instance of type {} for type {}".format(
-                    self.cached_dependencies[type_].__class__.__name__, type_.__name__
-                )
+                "Using cached instance of type %s for type %s",
+                self.cached_dependencies[type_].__class__.__name__,
+                type_.__name__,
             )
             return self.cached_dependencies[type_]
         elif type_ in self.cached_subtypes:
             logger.debug(
-                "Creating instance for type {} using subtype {}".format(
-                    type_.__name__, self.cached_subtypes[type_].__name__
-                )
+                "Creating instance for type %s using subtype %s",
+                type_.__name__,
+                self.cached_subtypes[type_].__name__,
             )
             new_instance = self.__create_instance(self.cached_subtypes[type_])
             self.register(type_, new_instance)
             return new_instance
 
-        logger.debug("Creating instance for type {}".format(type_.__name__))
+        logger.debug("Creating instance for type %s", type_.__name__)
         new_instance = self.__create_instance(type_)
         self.register(type_, new_instance)
         return new_instance
@@ -52,7 +61,8 @@ class CustomDependencyInjectionManager(DependencyInjectionManger):
             return type_(**args)
         except Exception:
             logger.critical(
-                "Failed to inject dependencies for type {}".format(type_.__name__),
+                "Failed to inject dependencies for type %s",
+                type_.__name__,
                 exc_info=True,
             )
 
@@ -0,0 +1,21 @@
+from pocpoc.api.di.adapters.custom import CustomDependencyInjectionManager
+
+
+class Repository:
+    pass
+
+
+class Controller:
+    def __init__(self, repository: Repository) -> None:
+        self.repository = repository
+
+
+def test_create_instance_shares_dependencies() -> None:
+    manager = CustomDependencyInjectionManager()
+
+    cached = manager.get_instance(Controller)
+    created = manager.create_instance(Controller)
+
+    assert manager.get_instance(Controller) is cached
+    assert created is not cached
+    assert created.repository is cached.repository
@@ -8,3 +8,10 @@ class ClassInitializer(metaclass=ABCMeta):
     # @abstractmethod
     def get_instance(self, type_: Type[InitializerType]) -> InitializerType:
         raise NotImplementedError()
+
+    def create_instance(self, type_: Type[InitializerType]) -> InitializerType:
+        """
+        A new instance of `type_`, for initializers that reuse the instances
+        `get_instance` returns.
+        """
+        return self.get_instance(type_)
@@ -0,0 +1,29 @@
+from enum import Enum
+from functools import partial
+from typing import Callable, Type
+
+from pocpoc.api.di.class_initializer import ClassInitializer, InitializerType
+
+
+class Lifetime(Enum):
+    # one instance, resolved when the container starts
+    SINGLETON = "singleton"
+    # a new instance for every message
+    PER_MESSAGE = "per_message"
+
+
+def get_lifetime(type_: Type[object]) -> Lifetime:
+    return getattr(type_, "lifetime", Lifetime.SINGLETON)
+
+
+def resolve_factory(
+    class_initializer: ClassInitializer, type_: Type[InitializerType]
+) -> Callable[[], InitializerType]:
+    """
+    Resolves singletons right away, so getting them later is a plain call.
+    """
+    if get_lifetime(type_) is Lifetime.PER_MESSAGE:
+        return partial(class_initializer.create_instance, type_)
+
+    instance = class_initializer.get_instance(type_)
+    return lambda: instance
@@ -0,0 +1,94 @@
+import codecs
+import importlib
+import json
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, Optional
+
+
+class JsonBackend(ABC):
+    """
+    `loads` receives either `bytes` or a `memoryview` over the message buffer.
+    """
+
+    @abstractmethod
+    def dumps(self, value: Any) -> bytes:
+        raise NotImplementedError()
+
+    @abstractmethod
+    def loads(self, payload: bytes) -> Any:
+        raise NotImplementedError()
+
+
+def is_utf8(encoding: str) -> bool:
+    return codecs.lookup(encoding).name == "utf-8"
+
+
+class StdlibJsonBackend(JsonBackend):
+    def __init__(self, encoding: str) -> None:
+        self.encoding = encoding
+
+    def dumps(self, value: Any) -> bytes:
+        return json.dumps(value, separators=(",", ":")).encode(self.encoding)
+
+    def loads(self, payload: bytes) -> Any:
+        # json.loads only reads str or bytes; str() decodes memoryviews in place
+        return json.loads(str(payload, self.encoding))
+
+
+class OrjsonJsonBackend(JsonBackend):
+    """
+    Requires the optional `orjson` package. orjson only reads and writes
+    UTF-8.
+    """
+
+    def __init__(self) -> None:
+        self.orjson = importlib.import_module("orjson")
+        self.dumps_options = self.orjson.OPT_NON_STR_KEYS
+
+    def dumps(self, value: Any) -> bytes:
+        return self.orjson.dumps(value, option=self.dumps_options)  # type: ignore
+
+    def loads(self, payload: bytes) -> Any:
+        return self.orjson.loads(payload)
+
+
+class UjsonJsonBackend(JsonBackend):
+    """
+    Requires the optional `ujson` package.
+    """
+
+    def __init__(self, encoding: str) -> None:
+        self.ujson = importlib.import_module("ujson")
+        self.encoding = encoding
+
+    def dumps(self, value: Any) -> bytes:
+        return self.ujson.dumps(value).encode(self.encoding)  # type: ignore
+
+    def loads(self, payload: bytes) -> Any:
+        if isinstance(payload, bytes) and is_utf8(self.encoding):
+            return self.ujson.loads(payload)
+        return self.ujson.loads(str(payload, self.encoding))
+
+
+json_backend_factories: Dict[str, Callable[[str], JsonBackend]] = {
+    "orjson": lambda encoding: OrjsonJsonBackend(),
+    "ujson": UjsonJsonBackend,
+    "json": StdlibJsonBackend,
+}
+
+
+def get_json_backend(encoding: str, name: Optional[str] = None) -> JsonBackend:
+    """
+    Returns the JSON backend called `name` ("orjson", "ujson" or "json"), or
+    the standard library backend without a name.
+
+    orjson and ujson are only used when asked for, since their output differs
+    from the standard library for some values, e.g. orjson writes NaN as null
+    and rejects integers wider than 64 bits.
+    """
+    if name is None:
+        return StdlibJsonBackend(encoding)
+
+    if name == "orjson" and not is_utf8(encoding):
+        raise ValueError(f"orjson does not support encoding {encoding}")
+    return json_backend_factories[name](encoding)
@@ -1,7 +1,9 @@
-from typing import Tuple
+from typing import List, Tuple, cast
+
 from pocpoc.api.messages.codec import (
     MessageDecoder,
     MessageEncoder,
+    MessageEnvelope,
     MessageKitDecoder,
     MessageKitEncoder,
     MessageMetadataDecoder,
@@ -11,33 +13,46 @@ from pocpoc.api.messages.message import Message, MessageMetadata
 
 
 class BufferWriter:
+    """
+    Collects the written chunks and joins them once in `getvalue`, so each
+    payload is copied a single time into the final buffer.
+    """
+
     def __init__(self) -> None:
-        self.buffer = bytearray()
+        self.chunks: List[bytes] = []
 
     def write_int(self, value: int) -> None:
         self.write(value.to_bytes(4, "big"))
 
     def write_string(self, value: str, encoding: str = "utf-8") -> None:
-        self.write_int(len(value))
-        self.write(value.encode(encoding))
+        self.write_bytes(value.encode(encoding))
 
     def write_bytes(self, value: bytes) -> None:
         self.write_int(len(value))
         self.write(value)
 
     def write(self, data: bytes) -> None:
-        self.buffer.extend(data)
+        self.chunks.append(data)
 
     def getvalue(self) -> bytes:
-        return bytes(self.buffer)
+        return b"".join(self.chunks)
 
 
 class BufferReader:
+    """
+    Reads from a `memoryview` of the buffer, so `read` and `read_bytes` return
+    views that share the buffer's memory instead of copies.
+    """
+
     def __init__(self, buffer: bytes) -> None:
-        self.buffer = buffer
+        self.buffer = memoryview(buffer)
         self.offset = 0
 
-    def read(self, size: int) -> bytes:
+    def read(self, size: int) -> memoryview:
+        if self.offset + size > len(self.buffer):
+            raise ValueError(
+                f"Cannot read {size} bytes at offset {self.offset}, buffer has {len(self.buffer)} bytes"
+            )
         data = self.buffer[self.offset : self.offset + size]
         self.offset += size
         return data
@@ -47,13 +62,24 @@ class BufferReader:
 
     def read_string(self, encoding: str = "utf-8") -> str:
         size = self.read_int()
-        return self.read(size).decode(encoding)
+        return str(self.read(size), encoding)
 
-    def read_bytes(self) -> bytes:
+    def read_bytes(self) -> memoryview:
         size = self.read_int()
         return self.read(size)
 
 
+def get_payload(decoder: object, view: memoryview) -> bytes:
+    """
+    Decoders whose class sets `accepts_memoryview` read the view without a
+    copy, see `JsonBackend.loads`. Any other decoder gets the `bytes` its
+    interface promises.
+    """
+    if type(decoder).__dict__.get("accepts_memoryview", False):
+        return cast(bytes, view)
+    return bytes(view)
+
+
 class JsonMessageKitEncoder(MessageKitEncoder[bytes]):
     def __init__(
         self,
@@ -82,15 +108,24 @@ class JsonMessageKitDecoder(MessageKitDecoder[bytes]):
         self.json_message_decoder = json_message_decoder
 
     def decode(self, message_buffer: bytes) -> Tuple[MessageMetadata, Message]:
+        envelope = self.decode_envelope(message_buffer)
+        return envelope.metadata, envelope.message
+
+    def decode_envelope(self, message_buffer: bytes) -> MessageEnvelope:
         buffer_reader = BufferReader(message_buffer)
 
-        message_metadata_bytes = buffer_reader.read_bytes()
-        message_bytes = buffer_reader.read_bytes()
+        message_metadata_bytes = get_payload(
+            self.json_message_metadata_decoder, buffer_reader.read_bytes()
+        )
+        message_bytes = get_payload(
+            self.json_message_decoder, buffer_reader.read_bytes()
+        )
 
         message_metadata = self.json_message_metadata_decoder.decode(
             message_metadata_bytes
         )
 
-        message = self.json_message_decoder.decode(message_metadata, message_bytes)
-
-        return message_metadata, message
+        return MessageEnvelope(
+            message_metadata,
+            lambda metadata: self.json_message_decoder.decode(metadata, message_bytes),
+        )
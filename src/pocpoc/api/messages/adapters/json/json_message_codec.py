@@ -1,12 +1,16 @@
-import json
 import logging
 from dataclasses import is_dataclass
+from typing import Optional
 
 from pocpoc.api.codec.json_codec import (
     LocatedValidationErrorCollection,
-    decode,
+    compile_decoder,
     encode,
 )
+from pocpoc.api.messages.adapters.json.json_backend import (
+    JsonBackend,
+    get_json_backend,
+)
 from pocpoc.api.messages.map import MessageMap
 from pocpoc.api.messages.message import (
     Message,
@@ -23,12 +27,21 @@ class MessageDecodeError(Exception):
 
 
 class JsonMessageDecoder(MessageDecoder[bytes]):
-    def __init__(self, message_map: MessageMap, encoding: str) -> None:
+    # reads memoryviews of the message kit without copying them
+    accepts_memoryview = True
+
+    def __init__(
+        self,
+        message_map: MessageMap,
+        encoding: str,
+        json_backend: Optional[JsonBackend] = None,
+    ) -> None:
         self.message_map = message_map
         self.encoding = encoding
+        self.json_backend = json_backend or get_json_backend(encoding)
 
     def decode(self, message_metadata: MessageMetadata, payload: bytes) -> Message:
-        message_as_dictionary = json.loads(payload.decode(self.encoding))
+        message_as_dictionary = self.json_backend.loads(payload)
         assert isinstance(message_as_dictionary, dict), "Message must be a dict"
 
         message_type = message_metadata.message_type
@@ -39,7 +52,9 @@ class JsonMessageDecoder(MessageDecoder[bytes]):
 
         if is_dataclass(message_cls):
             try:
-                parsed_value: Message = decode(message_as_dictionary, message_cls)
+                parsed_value: Message = compile_decoder(message_cls).decode(
+                    message_as_dictionary
+                )
                 return parsed_value
             except LocatedValidationErrorCollection as e:
                 logger.critical("Error deserializing Message payload: %s", e)
@@ -49,8 +64,11 @@ class JsonMessageDecoder(MessageDecoder[bytes]):
 
 
 class JsonMessageEncoder(MessageEncoder[bytes]):
-    def __init__(self, encoding: str) -> None:
+    def __init__(
+        self, encoding: str, json_backend: Optional[JsonBackend] = None
+    ) -> None:
         self.encoding = encoding
+        self.json_backend = json_backend or get_json_backend(encoding)
 
     def encode(self, message: Message) -> bytes:
-        return json.dumps(encode(message)).encode(self.encoding)
+        return self.json_backend.dumps(encode(message))
@@ -1,6 +1,10 @@
-import json
+from typing import Optional
 
-from pocpoc.api.codec.json_codec import decode, encode
+from pocpoc.api.codec.json_codec import compile_decoder, encode
+from pocpoc.api.messages.adapters.json.json_backend import (
+    JsonBackend,
+    get_json_backend,
+)
 from pocpoc.api.messages.codec import (
     MessageMetadataDecoder,
     MessageMetadataEncoder,
@@ -12,19 +16,26 @@ class JsonMessageMetadataEncoder(MessageMetadataEncoder[bytes]):
     def __init__(
         self,
         encoding: str,
+        json_backend: Optional[JsonBackend] = None,
     ):
         self.encoding = encoding
+        self.json_backend = json_backend or get_json_backend(encoding)
 
     def encode(self, metadata: MessageMetadata) -> bytes:
-        return json.dumps(encode(metadata)).encode(self.encoding)
+        return self.json_backend.dumps(encode(metadata))
 
 
 class JsonMessageMetadataDecoder(MessageMetadataDecoder[bytes]):
+    # reads memoryviews of the message kit without copying them
+    accepts_memoryview = True
+
     def __init__(
         self,
         encoding: str,
+        json_backend: Optional[JsonBackend] = None,
     ):
         self.encoding = encoding
+        self.json_backend = json_backend or get_json_backend(encoding)
 
     def decode(self, message: bytes) -> MessageMetadata:
-        return decode(json.loads(message.decode(self.encoding)), MessageMetadata)
+        return compile_decoder(MessageMetadata).decode(self.json_backend.loads(message))
@@ -0,0 +1,83 @@
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Dict
+
+import pytest
+
+from pocpoc.api.messages.adapters.json.json_backend import (
+    JsonBackend,
+    StdlibJsonBackend,
+    get_json_backend,
+)
+from pocpoc.api.messages.map import MessageMap
+from pocpoc.api.messages.message import Message, MessageMetadata
+from pocpoc.api.microservices.adapters.rmq import (
+    create_json_kit_decoder,
+    create_json_kit_encoder,
+)
+
+
+@dataclass
+class PriceChanged(Message):
+    product: str
+    price: Decimal
+    stock: Dict[int, int]
+
+    @classmethod
+    def message_type(cls) -> str:
+        return "price_changed"
+
+
+def get_backend(name: str) -> JsonBackend:
+    if name != "json":
+        pytest.importorskip(name)
+    return get_json_backend("utf-8", name)
+
+
+@pytest.mark.parametrize("backend_name", ["json", "ujson", "orjson"])
+def test_kit_round_trip(backend_name: str) -> None:
+    backend = get_backend(backend_name)
+    message_map = MessageMap()
+    message_map.register_messages(PriceChanged)
+
+    metadata = MessageMetadata(
+        message_type=PriceChanged.message_type(),
+        sent_at=datetime(2020, 1, 1, tzinfo=timezone.utc),
+        tracked_context=None,
+    )
+    message = PriceChanged("café", Decimal("1.10"), {1: 2})
+
+    body = create_json_kit_encoder("utf-8", backend).encode(metadata, message)
+
+    assert create_json_kit_decoder(message_map, "utf-8", backend).decode(body) == (
+        metadata,
+        PriceChanged("café", Decimal("1.10"), {1: 2}),
+    )
+
+
+def test_backends_are_interchangeable() -> None:
+    payload = {"name": "café", "values": [1, 2.5, None, True]}
+    stdlib = StdlibJsonBackend("utf-8")
+
+    for name in ["ujson", "orjson"]:
+        try:
+            backend = get_json_backend("utf-8", name)
+        except ImportError:
+            continue
+
+        assert stdlib.loads(backend.dumps(payload)) == payload
+        assert backend.loads(stdlib.dumps(payload)) == payload
+
+
+def test_standard_library_is_the_default() -> None:
+    assert isinstance(get_json_backend("utf-8"), StdlibJsonBackend)
+    assert isinstance(get_json_backend("utf-16"), StdlibJsonBackend)
+
+
+def test_non_utf8_encoding_is_not_supported_by_orjson() -> None:
+    backend = StdlibJsonBackend("utf-16")
+    assert backend.loads(backend.dumps({"a": "é"})) == {"a": "é"}
+
+    with pytest.raises(ValueError):
+        get_json_backend("latin-1", "orjson")
@@ -0,0 +1,118 @@
+import json
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+import pytest
+
+from pocpoc.api.messages.adapters.json.json_backend import StdlibJsonBackend
+from pocpoc.api.messages.adapters.json.json_kit_codec import (
+    BufferReader,
+    BufferWriter,
+    JsonMessageKitDecoder,
+)
+from pocpoc.api.messages.adapters.json.json_message_codec import (
+    JsonMessageDecoder,
+)
+from pocpoc.api.messages.adapters.json.json_message_metadata_codec import (
+    JsonMessageMetadataDecoder,
+)
+from pocpoc.api.messages.map import MessageMap
+from pocpoc.api.messages.message import Message, MessageMetadata
+from pocpoc.api.microservices.adapters.rmq import create_json_kit_encoder
+
+
+def test_buffer_round_trip() -> None:
+    writer = BufferWriter()
+    writer.write_int(7)
+    writer.write_string("café")
+    writer.write_bytes(b"payload")
+
+    reader = BufferReader(writer.getvalue())
+
+    assert reader.read_int() == 7
+    assert reader.read_string() == "café"
+    assert bytes(reader.read_bytes()) == b"payload"
+
+
+def test_buffer_reader_returns_views() -> None:
+    writer = BufferWriter()
+    writer.write_bytes(b'{"a":1}')
+    body = writer.getvalue()
+
+    view = BufferReader(body).read_bytes()
+
+    assert isinstance(view, memoryview)
+    assert view.obj is body
+    assert StdlibJsonBackend("utf-8").loads(view) == {"a": 1}  # type: ignore
+
+
+def test_buffer_reader_rejects_truncated_buffer() -> None:
+    writer = BufferWriter()
+    writer.write_bytes(b"payload")
+
+    with pytest.raises(ValueError):
+        BufferReader(writer.getvalue()[:-1]).read_bytes()
+
+
+@dataclass
+class ItemAdded(Message):
+    name: str
+
+    @classmethod
+    def message_type(cls) -> str:
+        return "item_added"
+
+
+class CountingMessageDecoder(JsonMessageDecoder):
+    calls = 0
+
+    def decode(self, message_metadata: MessageMetadata, payload: bytes) -> Message:
+        self.calls += 1
+        return super().decode(message_metadata, payload)
+
+
+def test_decode_envelope_defers_payload_decoding() -> None:
+    message_map = MessageMap()
+    message_map.register_messages(ItemAdded)
+    message_decoder = CountingMessageDecoder(message_map, "utf-8")
+    kit_decoder = JsonMessageKitDecoder(
+        JsonMessageMetadataDecoder("utf-8"), message_decoder
+    )
+    metadata = MessageMetadata(
+        message_type=ItemAdded.message_type(),
+        sent_at=datetime(2020, 1, 1, tzinfo=timezone.utc),
+        tracked_context=None,
+    )
+    body = create_json_kit_encoder("utf-8").encode(metadata, ItemAdded("pen"))
+
+    envelope = kit_decoder.decode_envelope(body)
+
+    assert envelope.metadata == metadata
+    assert not envelope.is_decoded
+    assert message_decoder.calls == 0
+
+    assert envelope.message == ItemAdded("pen")
+    assert envelope.message == ItemAdded("pen")
+    assert message_decoder.calls == 1
+
+
+class BytesMessageDecoder(JsonMessageDecoder):
+    def decode(self, message_metadata: MessageMetadata, payload: bytes) -> Message:
+        assert isinstance(payload, bytes)
+        return ItemAdded(**json.loads(payload.decode("utf-8")))
+
+
+def test_decode_gives_bytes_to_custom_decoders() -> None:
+    message_map = MessageMap()
+    message_map.register_messages(ItemAdded)
+    kit_decoder = JsonMessageKitDecoder(
+        JsonMessageMetadataDecoder("utf-8"), BytesMessageDecoder(message_map, "utf-8")
+    )
+    metadata = MessageMetadata(
+        message_type=ItemAdded.message_type(),
+        sent_at=datetime(2020, 1, 1, tzinfo=timezone.utc),
+        tracked_context=None,
+    )
+    body = create_json_kit_encoder("utf-8").encode(metadata, ItemAdded("pen"))
+
+    assert kit_decoder.decode(body) == (metadata, ItemAdded("pen"))
@@ -0,0 +1,100 @@
+from typing import Optional, Tuple
+
+from pocpoc.api.messages.adapters.json.json_kit_codec import (
+    BufferReader,
+    BufferWriter,
+    get_payload,
+)
+from pocpoc.api.messages.adapters.json.json_message_codec import (
+    MessageDecodeError,
+)
+from pocpoc.api.messages.codec import (
+    MessageDecoder,
+    MessageEncoder,
+    MessageEnvelope,
+    MessageKitDecoder,
+    MessageKitEncoder,
+    MessageMetadataDecoder,
+    MessageMetadataEncoder,
+)
+from pocpoc.api.messages.message import Message, MessageMetadata
+
+# 0xc1 is never used by msgpack and can't start a JSON kit body, whose first
+# byte is the high byte of the metadata length. The last byte is the version.
+MSGPACK_KIT_VERSION = 1
+MSGPACK_KIT_HEADER = b"\xc1pp" + bytes([MSGPACK_KIT_VERSION])
+
+
+def is_msgpack_kit(message_buffer: bytes) -> bool:
+    return message_buffer[:3] == MSGPACK_KIT_HEADER[:3]
+
+
+class MsgpackMessageKitEncoder(MessageKitEncoder[bytes]):
+    def __init__(
+        self,
+        msgpack_message_metadata_encoder: MessageMetadataEncoder[bytes],
+        msgpack_message_encoder: MessageEncoder[bytes],
+    ) -> None:
+        self.msgpack_message_metadata_encoder = msgpack_message_metadata_encoder
+        self.msgpack_message_encoder = msgpack_message_encoder
+
+    def encode(self, message_metadata: MessageMetadata, message: Message) -> bytes:
+        buffer_writer = BufferWriter()
+        buffer_writer.write(MSGPACK_KIT_HEADER)
+        buffer_writer.write_bytes(
+            self.msgpack_message_metadata_encoder.encode(message_metadata)
+        )
+        buffer_writer.write_bytes(self.msgpack_message_encoder.encode(message))
+        return buffer_writer.getvalue()
+
+
+class MsgpackMessageKitDecoder(MessageKitDecoder[bytes]):
+    """
+    Bodies without the msgpack kit header are handed to `fallback_decoder`,
+    so consumers can read both formats while producers migrate.
+    """
+
+    def __init__(
+        self,
+        msgpack_message_metadata_decoder: MessageMetadataDecoder[bytes],
+        msgpack_message_decoder: MessageDecoder[bytes],
+        fallback_decoder: Optional[MessageKitDecoder[bytes]] = None,
+    ) -> None:
+        self.msgpack_message_metadata_decoder = msgpack_message_metadata_decoder
+        self.msgpack_message_decoder = msgpack_message_decoder
+        self.fallback_decoder = fallback_decoder
+
+    def decode(self, message_buffer: bytes) -> Tuple[MessageMetadata, Message]:
+        envelope = self.decode_envelope(message_buffer)
+        return envelope.metadata, envelope.message
+
+    def decode_envelope(self, message_buffer: bytes) -> MessageEnvelope:
+        if not is_msgpack_kit(message_buffer):
+            if self.fallback_decoder is None:
+                raise MessageDecodeError("Message is not a msgpack message kit")
+            return self.fallback_decoder.decode_envelope(message_buffer)
+
+        buffer_reader = BufferReader(message_buffer)
+        version = buffer_reader.read(len(MSGPACK_KIT_HEADER))[-1]
+        if version > MSGPACK_KIT_VERSION:
+            raise MessageDecodeError(
+                f"Unsupported msgpack message kit version {version}"
+            )
+
+        message_metadata_bytes = get_payload(
+            self.msgpack_message_metadata_decoder, buffer_reader.read_bytes()
+        )
+        message_bytes = get_payload(
+            self.msgpack_message_decoder, buffer_reader.read_bytes()
+        )
+
+        message_metadata = self.msgpack_message_metadata_decoder.decode(
+            message_metadata_bytes
+        )
+
+        return MessageEnvelope(
+            message_metadata,
+            lambda metadata: self.msgpack_message_decoder.decode(
+                metadata, message_bytes
+            ),
+        )
@@ -0,0 +1,86 @@
+import logging
+from dataclasses import is_dataclass
+from typing import Optional
+
+from pocpoc.api.codec.json_codec import (
+    LocatedValidationErrorCollection,
+    compile_decoder,
+)
+from pocpoc.api.messages.adapters.json.json_message_codec import (
+    MessageDecodeError,
+)
+from pocpoc.api.messages.adapters.msgpack.msgpack_serializer import (
+    MsgpackSerializer,
+)
+from pocpoc.api.messages.codec import (
+    MessageDecoder,
+    MessageEncoder,
+    MessageMetadataDecoder,
+    MessageMetadataEncoder,
+)
+from pocpoc.api.messages.map import MessageMap
+from pocpoc.api.messages.message import Message, MessageMetadata
+
+logger = logging.getLogger(__name__)
+
+
+class MsgpackMessageDecoder(MessageDecoder[bytes]):
+    # reads memoryviews of the message kit without copying them
+    accepts_memoryview = True
+
+    def __init__(
+        self,
+        message_map: MessageMap,
+        serializer: Optional[MsgpackSerializer] = None,
+    ) -> None:
+        self.message_map = message_map
+        self.serializer = serializer or MsgpackSerializer()
+
+    def decode(self, message_metadata: MessageMetadata, payload: bytes) -> Message:
+        message_as_dictionary = self.serializer.loads(payload)
+        assert isinstance(message_as_dictionary, dict), "Message must be a dict"
+
+        message_type = message_metadata.message_type
+        message_cls = self.message_map.get_message_type(message_type)
+
+        if message_cls is None:
+            raise MessageDecodeError(f"Message type {message_type} is not registered")
+
+        if is_dataclass(message_cls):
+            try:
+                parsed_value: Message = compile_decoder(message_cls).decode(
+                    message_as_dictionary
+                )
+                return parsed_value
+            except LocatedValidationErrorCollection as e:
+                logger.critical("Error deserializing Message payload: %s", e)
+                raise e
+
+        raise MessageDecodeError("Message %s is not a dataclass" % message_type)
+
+
+class MsgpackMessageEncoder(MessageEncoder[bytes]):
+    def __init__(self, serializer: Optional[MsgpackSerializer] = None) -> None:
+        self.serializer = serializer or MsgpackSerializer()
+
+    def encode(self, message: Message) -> bytes:
+        return self.serializer.dumps(message)
+
+
+class MsgpackMessageMetadataEncoder(MessageMetadataEncoder[bytes]):
+    def __init__(self, serializer: Optional[MsgpackSerializer] = None) -> None:
+        self.serializer = serializer or MsgpackSerializer()
+
+    def encode(self, metadata: MessageMetadata) -> bytes:
+        return self.serializer.dumps(metadata)
+
+
+class MsgpackMessageMetadataDecoder(MessageMetadataDecoder[bytes]):
+    # reads memoryviews of the message kit without copying them
+    accepts_memoryview = True
+
+    def __init__(self, serializer: Optional[MsgpackSerializer] = None) -> None:
+        self.serializer = serializer or MsgpackSerializer()
+
+    def decode(self, message: bytes) -> MessageMetadata:
+        return compile_decoder(MessageMetadata).decode(self.serializer.loads(message))
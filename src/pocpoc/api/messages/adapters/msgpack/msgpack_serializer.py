@@ -0,0 +1,61 @@
+import importlib
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Any
+from uuid import UUID
+
+from pocpoc.api.codec.json_codec import ValueEncoder
+
+UUID_EXT_CODE = 1
+DECIMAL_EXT_CODE = 2
+
+msgpack_value_encoder = ValueEncoder(native_types=(UUID, Decimal, datetime))
+
+
+class MsgpackSerializer:
+    """
+    Requires the optional `msgpack` package.
+
+    `UUID` and `Decimal` are written as msgpack extension types and datetimes
+    as msgpack timestamps, so they are read back without being parsed from
+    strings. Datetimes are read back in UTC, as the JSON codec does.
+    """
+
+    def __init__(self) -> None:
+        self.msgpack = importlib.import_module("msgpack")
+
+    def dumps(self, value: Any) -> bytes:
+        return self.msgpack.packb(  # type: ignore
+            msgpack_value_encoder.encode(value),
+            default=self.pack_ext,
+            use_bin_type=True,
+            datetime=True,
+        )
+
+    def loads(self, payload: bytes) -> Any:
+        return self.msgpack.unpackb(
+            payload,
+            ext_hook=self.unpack_ext,
+            raw=False,
+            strict_map_key=False,
+            timestamp=3,
+        )
+
+    def pack_ext(self, value: Any) -> Any:
+        if isinstance(value, UUID):
+            return self.msgpack.ExtType(UUID_EXT_CODE, value.bytes)
+        if isinstance(value, Decimal):
+            return self.msgpack.ExtType(DECIMAL_EXT_CODE, str(value).encode("ascii"))
+        if isinstance(value, datetime):
+            # naive datetimes are local time, as in serialize_datetime
+            return self.msgpack.Timestamp.from_datetime(
+                value.astimezone(tz=timezone.utc)
+            )
+        raise TypeError(f"Cannot serialize {type(value)} with msgpack")
+
+    def unpack_ext(self, code: int, data: bytes) -> Any:
+        if code == UUID_EXT_CODE:
+            return UUID(bytes=bytes(data))
+        if code == DECIMAL_EXT_CODE:
+            return Decimal(str(data, "ascii"))
+        return self.msgpack.ExtType(code, data)
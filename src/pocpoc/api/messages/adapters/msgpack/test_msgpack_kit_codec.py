@@ -0,0 +1,96 @@
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Dict, List, Tuple
+from uuid import UUID, uuid4
+
+import pytest
+
+from pocpoc.api.messages.adapters.json.json_message_codec import (
+    MessageDecodeError,
+)
+from pocpoc.api.messages.map import MessageMap
+from pocpoc.api.messages.message import Message, MessageMetadata
+from pocpoc.api.microservices.adapters.rmq import (
+    create_json_kit_decoder,
+    create_json_kit_encoder,
+    create_msgpack_kit_decoder,
+    create_msgpack_kit_encoder,
+)
+
+pytest.importorskip("msgpack")
+
+
+@dataclass
+class OrderPlaced(Message):
+    order_id: UUID
+    total: Decimal
+    placed_at: datetime
+    quantities: Dict[int, int]
+    tags: List[str]
+
+    @classmethod
+    def message_type(cls) -> str:
+        return "order_placed"
+
+
+def get_message_map() -> MessageMap:
+    message_map = MessageMap()
+    message_map.register_messages(OrderPlaced)
+    return message_map
+
+
+def get_kit() -> Tuple[MessageMetadata, OrderPlaced]:
+    metadata = MessageMetadata(
+        message_type=OrderPlaced.message_type(),
+        sent_at=datetime(2020, 1, 1, 12, 30, 15, 250, tzinfo=timezone.utc),
+        tracked_context=None,
+    )
+    message = OrderPlaced(
+        uuid4(),
+        Decimal("10.25"),
+        datetime(2021, 5, 6, 7, 8, 9, 123456, tzinfo=timezone.utc),
+        {1: 2},
+        ["a", "b"],
+    )
+    return metadata, message
+
+
+def test_msgpack_kit_round_trip_keeps_native_types() -> None:
+    metadata, message = get_kit()
+
+    body = create_msgpack_kit_encoder().encode(metadata, message)
+
+    assert create_msgpack_kit_decoder(get_message_map()).decode(body) == (
+        metadata,
+        message,
+    )
+
+
+def test_msgpack_kit_decoder_falls_back_to_json() -> None:
+    message_map = get_message_map()
+    metadata, message = get_kit()
+    decoder = create_msgpack_kit_decoder(
+        message_map, create_json_kit_decoder(message_map, "utf-8")
+    )
+
+    json_body = create_json_kit_encoder("utf-8").encode(metadata, message)
+    decoded_metadata, decoded_message = decoder.decode(json_body)
+
+    assert decoded_metadata.message_type == metadata.message_type
+    assert isinstance(decoded_message, OrderPlaced)
+    assert decoded_message.order_id == message.order_id
+
+
+def test_msgpack_kit_decoder_rejects_unknown_bodies() -> None:
+    metadata, message = get_kit()
+    json_body = create_json_kit_encoder("utf-8").encode(metadata, message)
+    decoder = create_msgpack_kit_decoder(get_message_map())
+
+    with pytest.raises(MessageDecodeError):
+        decoder.decode(json_body)
+
+    body = bytearray(create_msgpack_kit_encoder().encode(metadata, message))
+    body[3] += 1
+    with pytest.raises(MessageDecodeError):
+        decoder.decode(bytes(body))
@@ -0,0 +1,248 @@
+"""
+asyncio counterparts of the RabbitMQ dispatcher and RPC client. Requires the
+optional `aio-pika` package.
+
+The current `ContextTracker` is read from contextvars, which asyncio copies
+into every task, so each coroutine sends its own context.
+"""
+import asyncio
+import logging
+from typing import Any, Dict, Optional, cast
+from uuid import uuid4
+
+import aio_pika
+from aio_pika.abc import (
+    AbstractChannel,
+    AbstractExchange,
+    AbstractIncomingMessage,
+    AbstractQueue,
+    AbstractRobustConnection,
+)
+
+from pocpoc.api.messages.adapters.rabbitmq.rmq_rpc_client import get_deadline
+from pocpoc.api.messages.adapters.rabbitmq.rmq_utils import get_metadata_headers
+from pocpoc.api.messages.adapters.rmq import RMQConnectionFactory
+from pocpoc.api.messages.codec import MessageKitDecoder, MessageKitEncoder
+from pocpoc.api.messages.dispatcher import AsyncMessageDispatcher
+from pocpoc.api.messages.message import (
+    Message,
+    MessageMetadata,
+    create_message_metadata,
+)
+from pocpoc.api.messages.rpc import AsyncRPCClient, RPC, RPCInput, RPCOutput
+from pocpoc.api.messages.rpc.errors import (
+    RPCServerError,
+    RPCServerErrorResponse,
+    RPCTimeoutError,
+)
+
+logger = logging.getLogger(__name__)
+
+
+async def connect_async(
+    connection_factory: RMQConnectionFactory,
+) -> AbstractRobustConnection:
+    return await aio_pika.connect_robust(
+        host=connection_factory.host,
+        port=connection_factory.port,
+        login=connection_factory.username,
+        password=connection_factory.password,
+    )
+
+
+def create_aio_pika_message(
+    message_metadata: MessageMetadata,
+    body: bytes,
+    metadata_headers: bool,
+    **kwargs: Any,
+) -> aio_pika.Message:
+    if metadata_headers:
+        kwargs.update(
+            type=message_metadata.message_type,
+            timestamp=message_metadata.sent_at,
+            headers=get_metadata_headers(message_metadata),
+        )
+    return aio_pika.Message(body, **kwargs)
+
+
+class AsyncRMQChannel:
+    """
+    One robust connection and channel, opened on first use and shared by
+    every coroutine.
+    """
+
+    def __init__(
+        self, connection_factory: RMQConnectionFactory, publisher_confirms: bool
+    ) -> None:
+        self.connection_factory = connection_factory
+        self.publisher_confirms = publisher_confirms
+        self.connection: Optional[AbstractRobustConnection] = None
+        self.channel: Optional[AbstractChannel] = None
+        self.exchanges: Dict[str, AbstractExchange] = {}
+        self.connecting: Optional["asyncio.Future[None]"] = None
+
+    async def open(self) -> None:
+        self.connection = await connect_async(self.connection_factory)
+        self.channel = await self.connection.channel(
+            publisher_confirms=self.publisher_confirms
+        )
+
+    async def get_channel(self) -> AbstractChannel:
+        if self.channel is None:
+            if self.connecting is None:
+                self.connecting = asyncio.ensure_future(self.open())
+            try:
+                await asyncio.shield(self.connecting)
+            except Exception:
+                self.connecting = None
+                raise
+        return cast(AbstractChannel, self.channel)
+
+    async def get_exchange(self, name: str) -> AbstractExchange:
+        exchange = self.exchanges.get(name)
+        if exchange is None:
+            channel = await self.get_channel()
+            exchange = self.exchanges[name] = await channel.get_exchange(
+                name, ensure=False
+            )
+        return exchange
+
+    async def close(self) -> None:
+        if self.connection is not None:
+            await self.connection.close()
+        self.connection = None
+        self.channel = None
+        self.connecting = None
+        self.exchanges.clear()
+
+
+class AsyncRMQMessageDispatcher(AsyncMessageDispatcher):
+    """
+    With `publisher_confirms`, `dispatch` returns once the broker accepted the
+    message. Concurrent dispatches wait for their confirms at the same time.
+    """
+
+    def __init__(
+        self,
+        connection_factory: RMQConnectionFactory,
+        service_name: str,
+        kit_encoder: MessageKitEncoder[bytes],
+        metadata_headers: bool = False,
+        publisher_confirms: bool = True,
+    ) -> None:
+        self._service_name = service_name
+        self.kit_encoder = kit_encoder
+        self.metadata_headers = metadata_headers
+        self.channel = AsyncRMQChannel(connection_factory, publisher_confirms)
+
+    async def dispatch(self, message: Message) -> None:
+        message_metadata = create_message_metadata(
+            message.message_type(), self._service_name
+        )
+        body = self.kit_encoder.encode(message_metadata, message)
+
+        exchange = await self.channel.get_exchange(message.message_type())
+        await exchange.publish(
+            create_aio_pika_message(message_metadata, body, self.metadata_headers),
+            routing_key="",
+        )
+
+    async def close(self) -> None:
+        await self.channel.close()
+
+
+class AsyncRMQRPCClient(AsyncRPCClient):
+    """
+    Sends every call over one channel and receives the replies on one
+    exclusive queue, matching them to calls by correlation id.
+    """
+
+    def __init__(
+        self,
+        service_name: str,
+        connection_factory: RMQConnectionFactory,
+        kit_encoder: MessageKitEncoder[bytes],
+        kit_decoder: MessageKitDecoder[bytes],
+        default_timeout: Optional[float] = None,
+    ) -> None:
+        self.service_name = service_name
+        self.kit_encoder = kit_encoder
+        self.kit_decoder = kit_decoder
+        self.default_timeout = default_timeout
+        self.channel = AsyncRMQChannel(connection_factory, publisher_confirms=False)
+        self.callback_queue: Optional[AbstractQueue] = None
+        self.declaring: Optional["asyncio.Future[None]"] = None
+        self.pending: Dict[str, "asyncio.Future[bytes]"] = {}
+
+    async def declare_callback_queue(self) -> None:
+        channel = await self.channel.get_channel()
+        callback_queue = await channel.declare_queue(exclusive=True)
+        await callback_queue.consume(self.on_reply, no_ack=True)
+        self.callback_queue = callback_queue
+
+    async def get_callback_queue(self) -> AbstractQueue:
+        if self.callback_queue is None:
+            if self.declaring is None:
+                self.declaring = asyncio.ensure_future(self.declare_callback_queue())
+            try:
+                await asyncio.shield(self.declaring)
+            except Exception:
+                self.declaring = None
+                raise
+        return cast(AbstractQueue, self.callback_queue)
+
+    async def on_reply(self, message: AbstractIncomingMessage) -> None:
+        future = self.pending.pop(message.correlation_id or "", None)
+        if future is None:
+            logger.warning(
+                "Discarding RPC response with unknown correlation_id %s",
+                message.correlation_id,
+            )
+            return
+        if not future.done():
+            future.set_result(message.body)
+
+    async def submit(
+        self, rpc: RPC[RPCInput, RPCOutput], timeout: Optional[float] = None
+    ) -> RPCOutput:
+        if timeout is None:
+            timeout = self.default_timeout
+
+        message_metadata = create_message_metadata(
+            rpc.message_type(), self.service_name, get_deadline(timeout)
+        )
+        body = self.kit_encoder.encode(message_metadata, rpc)
+
+        correlation_id = str(uuid4())
+        future: "asyncio.Future[bytes]" = asyncio.get_running_loop().create_future()
+        self.pending[correlation_id] = future
+
+        try:
+            callback_queue = await self.get_callback_queue()
+            exchange = await self.channel.get_exchange(rpc.message_type())
+            await exchange.publish(
+                aio_pika.Message(
+                    body,
+                    correlation_id=correlation_id,
+                    reply_to=callback_queue.name,
+                ),
+                routing_key="",
+            )
+            result = await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            raise RPCTimeoutError(
+                f"No reply to {rpc.message_type()} within {timeout} seconds"
+            )
+        finally:
+            self.pending.pop(correlation_id, None)
+
+        _, message = self.kit_decoder.decode(result)
+        if isinstance(message, RPCServerErrorResponse):
+            raise RPCServerError(message)
+
+        return cast(RPCOutput, message)
+
+    async def close(self) -> None:
+        await self.channel.close()
+        self.callback_queue = None
+        self.declaring = None
@@ -0,0 +1,270 @@
+import logging
+from collections import deque
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from queue import Empty, SimpleQueue
+from threading import Condition, Event, Lock, Thread
+from typing import Any, Deque, Dict, List, Optional
+
+from pika import BasicProperties, ConnectionParameters, SelectConnection
+from pika.channel import Channel
+from pika.spec import Basic
+
+logger = logging.getLogger(__name__)
+
+
+class RMQPublishError(Exception):
+    pass
+
+
+@dataclass
+class RMQPendingPublish:
+    exchange: str
+    body: bytes
+    properties: Optional[BasicProperties]
+    future: "Future[None]" = field(default_factory=Future)
+    attempts: int = 0
+
+
+class RMQConfirmPublisher:
+    """
+    Publishes with publisher confirms on a connection owned by a background
+    thread, so many messages can wait for their confirms at the same time.
+
+    `publish` returns a future that resolves when the broker acks the
+    message. Nacked messages, and messages still unconfirmed when the
+    connection is lost, are published again up to `max_retries` times, so
+    delivery is at least once.
+    """
+
+    def __init__(
+        self,
+        connection_parameters: ConnectionParameters,
+        max_retries: int = 3,
+        reconnect_delay: float = 1.0,
+    ) -> None:
+        self.connection_parameters = connection_parameters
+        self.max_retries = max_retries
+        self.reconnect_delay = reconnect_delay
+
+        self.outbox: "SimpleQueue[RMQPendingPublish]" = SimpleQueue()
+        self.lock = Lock()
+        self.thread: Optional[Thread] = None
+        # closing stops new publishes, closed stops the publisher thread
+        self.closing = Event()
+        self.closed = Event()
+        # publishes whose futures are not done yet
+        self.outstanding = 0
+        self.settled = Condition(self.lock)
+
+        # only used from the publisher thread
+        self.connection: Optional[SelectConnection] = None
+        self.channel: Optional[Channel] = None
+        self.delivery_tag = 0
+        self.unconfirmed: Dict[int, RMQPendingPublish] = {}
+        self.retries: Deque[RMQPendingPublish] = deque()
+
+    def start(self) -> None:
+        with self.lock:
+            if self.thread is None:
+                self.thread = Thread(
+                    target=self._run, name="rmq-confirm-publisher", daemon=True
+                )
+                self.thread.start()
+
+    def publish(
+        self,
+        exchange: str,
+        body: bytes,
+        properties: Optional[BasicProperties] = None,
+    ) -> "Future[None]":
+        if self.closing.is_set():
+            raise RMQPublishError("Publisher is closed")
+
+        self.start()
+        pending = RMQPendingPublish(exchange, body, properties)
+        with self.lock:
+            self.outstanding += 1
+        pending.future.add_done_callback(self._on_settled)
+        self.outbox.put(pending)
+        self._wake_up()
+        return pending.future
+
+    def close(
+        self, timeout: Optional[float] = None, confirm_timeout: float = 5.0
+    ) -> None:
+        """
+        Waits up to `confirm_timeout` seconds for the broker to confirm the
+        messages already published, then stops the publisher thread.
+
+        Publishes still pending fail once the thread stops. When it is still
+        running after `timeout`, they fail when it does.
+        """
+        self.closing.set()
+        with self.settled:
+            if not self.settled.wait_for(
+                lambda: self.outstanding == 0, confirm_timeout
+            ):
+                logger.warning(
+                    "Closing publisher with %s unconfirmed messages", self.outstanding
+                )
+
+        self.closed.set()
+        connection = self.connection
+        if connection is not None:
+            connection.ioloop.add_callback_threadsafe(self._close_connection)
+        if self.thread is not None:
+            self.thread.join(timeout)
+            if self.thread.is_alive():
+                logger.warning("Publisher thread is still stopping")
+                return
+        # only publishes queued after the thread stopped are left
+        self._fail_outbox(RMQPublishError("Publisher closed before confirming"))
+
+    def _on_settled(self, future: "Future[None]") -> None:
+        with self.settled:
+            self.outstanding -= 1
+            self.settled.notify_all()
+
+    def _wake_up(self) -> None:
+        connection = self.connection
+        if connection is not None:
+            connection.ioloop.add_callback_threadsafe(self._drain)
+
+    def _run(self) -> None:
+        try:
+            while not self.closed.is_set():
+                self.connection = SelectConnection(
+                    self.connection_parameters,
+                    on_open_callback=self._on_connection_open,
+                    on_open_error_callback=self._on_connection_lost,
+                    on_close_callback=self._on_connection_lost,
+                )
+                self.connection.ioloop.start()
+
+                self.channel = None
+                self._requeue_unconfirmed()
+                if not self.closed.is_set():
+                    logger.warning(
+                        "Publisher connection lost, reconnecting in %ss",
+                        self.reconnect_delay,
+                    )
+                    self.closed.wait(self.reconnect_delay)
+        finally:
+            self._fail_all(RMQPublishError("Publisher closed before confirming"))
+
+    def _on_connection_open(self, connection: Any) -> None:
+        if self.closed.is_set():
+            connection.close()
+            return
+        connection.channel(on_open_callback=self._on_channel_open)
+
+    def _on_connection_lost(self, connection: Any, error: Any) -> None:
+        if not self.closed.is_set():
+            logger.warning("Publisher connection closed: %s", error)
+        connection.ioloop.stop()
+
+    def _on_channel_open(self, channel: Channel) -> None:
+        self.delivery_tag = 0
+        channel.add_on_close_callback(self._on_channel_closed)
+        channel.confirm_delivery(
+            self._on_delivery_confirmation,
+            callback=lambda frame: self._set_channel(channel),
+        )
+
+    def _set_channel(self, channel: Channel) -> None:
+        self.channel = channel
+        self._drain()
+
+    def _on_channel_closed(self, channel: Channel, error: BaseException) -> None:
+        logger.warning("Publisher channel closed: %s", error)
+        self.channel = None
+        if self.connection is not None and self.connection.is_open:
+            self.connection.close()
+
+    def _close_connection(self) -> None:
+        if self.connection is not None and self.connection.is_open:
+            self.connection.close()
+        elif self.connection is not None:
+            self.connection.ioloop.stop()
+
+    def _drain(self) -> None:
+        while self.channel is not None and self.channel.is_open:
+            if self.retries:
+                pending = self.retries.popleft()
+            else:
+                try:
+                    pending = self.outbox.get_nowait()
+                except Empty:
+                    return
+            self._publish(self.channel, pending)
+
+    def _publish(self, channel: Channel, pending: RMQPendingPublish) -> None:
+        self.delivery_tag += 1
+        self.unconfirmed[self.delivery_tag] = pending
+        channel.basic_publish(
+            exchange=pending.exchange,
+            routing_key="",
+            body=pending.body,
+            properties=pending.properties,
+        )
+
+    def _on_delivery_confirmation(self, method_frame: Any) -> None:
+        method = method_frame.method
+        if method.multiple:
+            tags = [tag for tag in self.unconfirmed if tag <= method.delivery_tag]
+        else:
+            tags = [method.delivery_tag]
+
+        acked = isinstance(method, Basic.Ack)
+        for tag in tags:
+            pending = self.unconfirmed.pop(tag, None)
+            if pending is None:
+                continue
+            if acked:
+                pending.future.set_result(None)
+            else:
+                logger.warning("Message to %s was nacked", pending.exchange)
+                self._retry(pending)
+
+        if not acked:
+            self._drain()
+
+    def _retry(self, pending: RMQPendingPublish) -> None:
+        pending.attempts += 1
+        if pending.attempts > self.max_retries:
+            pending.future.set_exception(
+                RMQPublishError(
+                    f"Message to {pending.exchange} was not confirmed after {pending.attempts} attempts"
+                )
+            )
+        else:
+            self.retries.append(pending)
+
+    def _requeue_unconfirmed(self) -> None:
+        for tag in sorted(self.unconfirmed):
+            self._retry(self.unconfirmed[tag])
+        self.unconfirmed.clear()
+
+    def _fail_all(self, error: Exception) -> None:
+        pending_publishes = list(self.unconfirmed.values()) + list(self.retries)
+        self.unconfirmed.clear()
+        self.retries.clear()
+        self._fail(pending_publishes, error)
+        self._fail_outbox(error)
+
+    def _fail_outbox(self, error: Exception) -> None:
+        pending_publishes = []
+        while True:
+            try:
+                pending_publishes.append(self.outbox.get_nowait())
+            except Empty:
+                break
+        self._fail(pending_publishes, error)
+
+    def _fail(
+        self, pending_publishes: List[RMQPendingPublish], error: Exception
+    ) -> None:
+        for pending in pending_publishes:
+            if not pending.future.done():
+                pending.future.set_exception(error)
@@ -1,56 +1,128 @@
-from datetime import datetime
-from uuid import uuid4
+from concurrent.futures import Future
+from typing import List, Optional, Sequence, Tuple
 
-from pocpoc.api.context_tracker.context_track_manager import (
-    ContextTracker,
-    get_current_context,
+from pika import BasicProperties
+from pika.adapters.blocking_connection import BlockingChannel
+
+from pocpoc.api.messages.adapters.rabbitmq.rmq_confirm_publisher import (
+    RMQConfirmPublisher,
+)
+from pocpoc.api.messages.adapters.rabbitmq.rmq_utils import (
+    get_metadata_properties,
 )
 from pocpoc.api.messages.adapters.rmq import RMQConnectionFactory
 from pocpoc.api.messages.codec import MessageKitEncoder
-from pocpoc.api.messages.message import Message, MessageMetadata
-from pocpoc.api.messages.dispatcher import MessageDispatcher
+from pocpoc.api.messages.message import Message, create_message_metadata
+from pocpoc.api.messages.dispatcher import BatchMessageDispatcher
+
+# exchange, body and properties of a message ready to be published
+RMQPublish = Tuple[str, bytes, Optional[BasicProperties]]
 
 
-class RMQMessageDispatcher(MessageDispatcher):
+class RMQMessageDispatcher(BatchMessageDispatcher):
     def __init__(
         self,
         connection_factory: RMQConnectionFactory,
         service_name: str,
         kit_encoder: MessageKitEncoder[bytes],
+        metadata_headers: bool = False,
+        confirm_delivery: bool = False,
+        confirm_publisher: Optional[RMQConfirmPublisher] = None,
     ) -> None:
+        """
+        With `metadata_headers`, the message type, sent time and context ids
+        are also sent as AMQP properties and headers.
+
+        With `confirm_delivery`, dispatching returns once the broker has
+        accepted every message. With a `confirm_publisher`, messages are
+        published through it and confirmed individually, and
+        `dispatch_async` returns without waiting for the confirms.
+        """
         self.connection_factory = connection_factory
         self._service_name = service_name
         self.kit_encoder = kit_encoder
+        self.metadata_headers = metadata_headers
+        self.confirm_delivery = confirm_delivery
+        self.confirm_publisher = confirm_publisher
 
-    def dispatch(self, message: Message) -> None:
-        rmq_connection = self.connection_factory.get_connection()
+    def prepare(self, message: Message) -> RMQPublish:
+        message_metadata = create_message_metadata(
+            message.message_type(), self._service_name
+        )
 
-        channel = rmq_connection.channel()
+        body = self.kit_encoder.encode(message_metadata, message)
+        properties = (
+            get_metadata_properties(message_metadata) if self.metadata_headers else None
+        )
 
-        current_context = get_current_context()
+        return message.message_type(), body, properties
 
-        if current_context is None:
-            current_context = ContextTracker(
-                global_context_id=str(uuid4()),
-                global_started=datetime.utcnow(),
-                local_context_id=str(uuid4()),
-                local_started=datetime.utcnow(),
-                parent_context_id=None,
-                service_name=self._service_name,
+    def publish(self, channel: BlockingChannel, publishes: List[RMQPublish]) -> None:
+        for exchange, body, properties in publishes:
+            channel.basic_publish(
+                exchange=exchange,
+                routing_key="",
+                body=body,
+                properties=properties,
             )
 
-        message_metadata = MessageMetadata(
-            message_type=message.message_type(),
-            tracked_context=current_context,
-            sent_at=datetime.utcnow(),
-        )
+    def publish_confirmed(
+        self, tx_channel: BlockingChannel, publishes: List[RMQPublish]
+    ) -> None:
+        # A blocking channel in confirm mode waits for every publish, so the
+        # batch is sent in a transaction instead, which the broker confirms
+        # once on commit.
+        try:
+            self.publish(tx_channel, publishes)
+        except Exception:
+            # the channel is pooled, so nothing may be left for the next commit
+            if tx_channel.is_open:
+                tx_channel.tx_rollback()
+            raise
+        tx_channel.tx_commit()
 
-        body = self.kit_encoder.encode(message_metadata, message)
+    def dispatch(self, message: Message) -> None:
+        self.dispatch_batch([message])
 
-        channel.basic_publish(
-            exchange=message.message_type(),
-            routing_key="",
-            body=body,
-        )
+    def dispatch_batch(self, messages: Sequence[Message]) -> None:
+        if self.confirm_publisher is not None:
+            futures = [self.dispatch_async(message) for message in messages]
+            for future in futures:
+                future.result()
+            return
+
+        publishes = [self.prepare(message) for message in messages]
+        if not self.confirm_delivery:
+            self.connection_factory.channel_pool.run(
+                lambda channel: self.publish(channel, publishes)
+            )
+            return
+
+        committed = False
+
+        def publish_confirmed(tx_channel: BlockingChannel) -> None:
+            nonlocal committed
+            # a retry after the commit went through would publish twice
+            if committed:
+                return
+            self.publish_confirmed(tx_channel, publishes)
+            committed = True
+
+        self.connection_factory.channel_pool.run(publish_confirmed, transactional=True)
+
+    def dispatch_async(self, message: Message) -> "Future[None]":
+        """
+        Returns a future resolved once the message is confirmed. Without a
+        `confirm_publisher` the message is dispatched before returning.
+        """
+        if self.confirm_publisher is None:
+            future: "Future[None]" = Future()
+            self.dispatch(message)
+            future.set_result(None)
+            return future
+
+        return self.confirm_publisher.publish(*self.prepare(message))
 
-        rmq_connection.close()
+    def close(self) -> None:
+        if self.confirm_publisher is not None:
+            self.confirm_publisher.close()
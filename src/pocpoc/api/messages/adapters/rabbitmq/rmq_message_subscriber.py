@@ -1,25 +1,57 @@
 import logging
-from contextlib import contextmanager
+from contextlib import contextmanager, nullcontext
 from contextvars import ContextVar
-from dataclasses import dataclass
-from typing import Any, Callable, Generator, Optional
+from concurrent.futures import Future, wait
+from dataclasses import dataclass, field
+from functools import partial
+from threading import get_ident
+from typing import (
+    Any,
+    Callable,
+    ContextManager,
+    Dict,
+    Generator,
+    Hashable,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+)
 
 from pika.adapters.blocking_connection import BlockingChannel
+from pika.exceptions import AMQPError
 
+from pocpoc.api.messages.adapters.rabbitmq.rmq_utils import (
+    get_message_type_from_properties,
+)
 from pocpoc.api.messages.codec import MessageKitDecoder
-from pocpoc.api.messages.message import Message, MessageMetadata
+from pocpoc.api.messages.controller.message_controller import BatchLimits
+from pocpoc.api.messages.message import (
+    Message,
+    MessageMetadata,
+    PartitionKeyFunction,
+    get_partition_key,
+)
 from pocpoc.api.messages.subscriber import MessageSubscriber
 from pocpoc.api.microservices import GracefulKiller
+from pocpoc.api.utils.partitioned_executor import PartitionedExecutor
 
 logger = logging.getLogger(__name__)
 
 
+def run_now(action: Callable[[], None]) -> None:
+    action()
+
+
 @dataclass
 class RMQCurrentMessageData:
     channel: BlockingChannel
     method_frame: Any
     header_frame: Any
     body: bytes
+    # runs channel operations on the thread that owns the connection
+    run_threadsafe: Callable[[Callable[[], None]], None] = run_now
 
 
 current_message_ctx = ContextVar[Optional[RMQCurrentMessageData]](
@@ -33,9 +65,10 @@ def init_current_message_ctx(
     method_frame: Any,
     header_frame: Any,
     body: bytes,
+    run_threadsafe: Callable[[Callable[[], None]], None] = run_now,
 ) -> Generator[None, None, None]:
     token = current_message_ctx.set(
-        RMQCurrentMessageData(channel, method_frame, header_frame, body)
+        RMQCurrentMessageData(channel, method_frame, header_frame, body, run_threadsafe)
     )
     try:
         yield
@@ -51,60 +84,382 @@ def get_current_message_data() -> RMQCurrentMessageData:
     return value
 
 
+@dataclass
+class RMQDelivery:
+    delivery_tag: int
+    message_metadata: MessageMetadata
+    message: Message
+
+
+@dataclass
+class RMQPendingBatch:
+    deliveries: List[RMQDelivery] = field(default_factory=list)
+    timer: Any = None
+
+
+BatchCallback = Callable[[List[Tuple[MessageMetadata, Message]]], None]
+
+
 class RMQMessageSubscriber(MessageSubscriber):
     def __init__(
         self,
         channel: BlockingChannel,
         queue: str,
         kit_decoder: MessageKitDecoder[bytes],
+        message_filter: Optional[Callable[[str], bool]] = None,
+        max_workers: int = 1,
+        partition_key: PartitionKeyFunction = get_partition_key,
+        batch_limits: Optional[Callable[[str], Optional[BatchLimits]]] = None,
+        ack_batch_size: int = 1,
+        ack_delay_ms: int = 10,
     ):
+        """
+        Messages whose type `message_filter` rejects are acked without decoding
+        their payload, or without reading the body at all when the type is sent
+        in the message headers.
+
+        With more than one of `max_workers`, messages are handled concurrently
+        by a thread pool, and acks and rejects are sent from the connection
+        thread. The channel prefetch bounds how many messages are in flight.
+        Messages with the same `partition_key` are handled in delivery order,
+        one at a time.
+
+        Messages of a type `batch_limits` returns limits for are accumulated
+        and handled in batches, see `listen`. The channel prefetch must allow
+        a full batch to be unacked at once.
+
+        With an `ack_batch_size` above one, acks are held until that many are
+        pending or `ack_delay_ms` passed, and sent together. Pending acks are
+        flushed when `listen` returns.
+        """
         self.channel = channel
         self.queue = queue
         self.kit_decoder = kit_decoder
+        self.message_filter = message_filter
+        self.max_workers = max_workers
+        self.partition_key = partition_key
+        self.batch_limits = batch_limits
+        self.ack_batch_size = ack_batch_size
+        self.ack_delay_ms = ack_delay_ms
+        self.consumer_thread: Optional[int] = None
+
+        # only used from the consumer thread
+        self.unacked: Set[int] = set()
+        self.pending_acks: Set[int] = set()
+        self.ack_timer: Any = None
+        self.batches: Dict[str, RMQPendingBatch] = {}
+        self.guard: Callable[[], ContextManager[None]] = nullcontext
+
+        self.executor: Optional[PartitionedExecutor] = None
+        self.in_flight: Set["Future[None]"] = set()
+
+    def is_wanted(self, message_type: Optional[str]) -> bool:
+        if self.message_filter is None or message_type is None:
+            return True
+        return self.message_filter(message_type)
+
+    def run_threadsafe(self, action: Callable[[], None]) -> None:
+        if get_ident() == self.consumer_thread:
+            action()
+            return
+
+        try:
+            self.channel.connection.add_callback_threadsafe(action)
+        except AMQPError:
+            # the message is redelivered once the broker notices
+            logger.warning("Connection closed before acking a message")
+
+    def settle(self, delivery_tags: Sequence[int], ack: bool) -> None:
+        """
+        Acks or rejects messages from the connection thread. Rejects are sent
+        right away, one per message, acks are coalesced by `flush_acks`.
+        """
+        if not ack:
+            for tag in delivery_tags:
+                self.channel.basic_reject(tag, requeue=False)
+            self.unacked.difference_update(delivery_tags)
+            return
+
+        self.pending_acks.update(delivery_tags)
+        if len(self.pending_acks) >= self.ack_batch_size:
+            self.flush_acks()
+        elif self.ack_timer is None:
+            self.ack_timer = self.channel.connection.call_later(
+                self.ack_delay_ms / 1000, self.on_ack_timeout
+            )
+
+    def on_ack_timeout(self) -> None:
+        self.ack_timer = None
+        self.flush_acks()
+
+    def flush_acks(self) -> None:
+        """
+        Sends the pending acks, with a single `multiple` frame for those that
+        no unacked message precedes, and one frame for each of the others.
+        """
+        if self.ack_timer is not None:
+            self.channel.connection.remove_timeout(self.ack_timer)
+            self.ack_timer = None
+        if not self.pending_acks:
+            return
+
+        # a multiple ack would also ack the messages still being handled
+        in_progress = self.unacked - self.pending_acks
+        first_in_progress = min(in_progress) if in_progress else None
+        pending = sorted(self.pending_acks)
+        contiguous = [
+            tag
+            for tag in pending
+            if first_in_progress is None or tag < first_in_progress
+        ]
+
+        if len(contiguous) > 1:
+            self.channel.basic_ack(contiguous[-1], multiple=True)
+        elif contiguous:
+            self.channel.basic_ack(contiguous[0])
+        for tag in pending[len(contiguous) :]:
+            self.channel.basic_ack(tag)
+
+        self.unacked -= self.pending_acks
+        self.pending_acks.clear()
+
+    def ack(self, delivery_tag: int) -> None:
+        self.run_threadsafe(partial(self.settle, [delivery_tag], True))
+
+    def reject(self, delivery_tag: int) -> None:
+        self.run_threadsafe(partial(self.settle, [delivery_tag], False))
+
+    def stop(self) -> None:
+        """
+        Stops consuming from any thread. In-flight messages are finished and
+        every pending ack is sent before `listen` returns.
+        """
+        self.run_threadsafe(self.channel.stop_consuming)
+
+    def decode(
+        self, method_frame: Any, props: Any, body: bytes
+    ) -> Optional[Tuple[MessageMetadata, Message]]:
+        """
+        Returns None after acking or rejecting messages that are not handled.
+        """
+        if not self.is_wanted(get_message_type_from_properties(props)):
+            logger.debug(
+                "Skipping unhandled message with delivery tag %s",
+                method_frame.delivery_tag,
+            )
+            self.ack(method_frame.delivery_tag)
+            return None
+
+        try:
+            envelope = self.kit_decoder.decode_envelope(body)
+            message_metadata = envelope.metadata
+
+            if not self.is_wanted(message_metadata.message_type):
+                logger.debug("Skipping unhandled message %s", message_metadata)
+                self.ack(method_frame.delivery_tag)
+                return None
+
+            return message_metadata, envelope.message
+
+        except Exception:
+            logger.exception(
+                "Error deserializing Message from rabbitmq message with delivery tag %s",
+                method_frame.delivery_tag or "unknown",
+            )
+            self.reject(method_frame.delivery_tag)
+            return None
+
+    def process(
+        self,
+        callback: Callable[[MessageMetadata, Message], None],
+        channel: BlockingChannel,
+        method_frame: Any,
+        props: Any,
+        body: bytes,
+        message_metadata: MessageMetadata,
+        message: Message,
+    ) -> None:
+        try:
+            with init_current_message_ctx(
+                channel, method_frame, props, body, self.run_threadsafe
+            ):
+                callback(message_metadata, message)
+
+            if method_frame.delivery_tag:
+                self.ack(method_frame.delivery_tag)
+        except Exception:
+            if method_frame.delivery_tag is not None:
+                self.reject(method_frame.delivery_tag)
+
+            logger.exception(
+                "Error deserializing message from rabbitmq message with delivery tag %s",
+                method_frame.delivery_tag or "unknown",
+            )
+
+    def process_batch(
+        self, batch_callback: BatchCallback, deliveries: List[RMQDelivery]
+    ) -> None:
+        delivery_tags = [delivery.delivery_tag for delivery in deliveries]
+        try:
+            batch_callback(
+                [
+                    (delivery.message_metadata, delivery.message)
+                    for delivery in deliveries
+                ]
+            )
+            self.run_threadsafe(partial(self.settle, delivery_tags, True))
+        except Exception:
+            self.run_threadsafe(partial(self.settle, delivery_tags, False))
+
+            logger.exception(
+                "Error handling batch of rabbitmq messages with delivery tags %s",
+                delivery_tags,
+            )
+
+    def add_to_batch(
+        self, batch_callback: BatchCallback, limits: BatchLimits, delivery: RMQDelivery
+    ) -> None:
+        message_type = delivery.message_metadata.message_type
+        batch = self.batches.get(message_type)
+        if batch is None:
+            batch = self.batches[message_type] = RMQPendingBatch()
+            batch.timer = self.channel.connection.call_later(
+                limits.max_wait_ms / 1000,
+                partial(self.on_batch_timeout, batch_callback, message_type, batch),
+            )
+
+        batch.deliveries.append(delivery)
+        if len(batch.deliveries) >= limits.max_size:
+            self.channel.connection.remove_timeout(batch.timer)
+            self.flush_batch(batch_callback, message_type)
+
+    def on_batch_timeout(
+        self, batch_callback: BatchCallback, message_type: str, batch: RMQPendingBatch
+    ) -> None:
+        with self.guard():
+            if self.batches.get(message_type) is batch:
+                self.flush_batch(batch_callback, message_type)
+
+    def flush_batch(self, batch_callback: BatchCallback, message_type: str) -> None:
+        batch = self.batches.pop(message_type)
+        # a key no message partition uses, so batches of a type are handled
+        # one at a time, in delivery order
+        self.run(
+            (RMQPendingBatch, message_type),
+            self.process_batch,
+            batch_callback,
+            batch.deliveries,
+        )
+
+    def run(self, key: Optional[Hashable], fn: Callable[..., None], *args: Any) -> None:
+        if self.executor is None:
+            fn(*args)
+            return
+
+        future = self.executor.submit(key, fn, *args)
+        self.in_flight.add(future)
+        future.add_done_callback(self.in_flight.discard)
+
+    def listen(
+        self,
+        callback: Callable[[MessageMetadata, Message], None],
+        batch_callback: Optional[BatchCallback] = None,
+    ) -> None:
+        """
+        Messages of the types `batch_limits` returns limits for are passed to
+        `batch_callback` in batches, and acked or rejected together.
+        """
+        self.consumer_thread = get_ident()
 
-    def listen(self, callback: Callable[[MessageMetadata, Message], None]) -> None:
         def on_message(
             channel: BlockingChannel,
             method_frame: Any,
             props: Any,
             body: bytes,
         ) -> None:
-            with GracefulKiller.wait_for_kill():
+            self.unacked.add(method_frame.delivery_tag)
+
+            with self.guard():
                 if not GracefulKiller.should_continue():
                     logger.info("Gracefully stopping subscriber")
                     return
 
-                try:
-                    message_metadata, message = self.kit_decoder.decode(body)
-
-                except Exception:
-                    logger.exception(
-                        "Error deserializing Message from rabbitmq message with delivery tag %s",
-                        method_frame.delivery_tag or "unknown",
-                    )
-                    self.channel.basic_reject(method_frame.delivery_tag, requeue=False)
+                # decoded here, so messages are partitioned in delivery order
+                decoded = self.decode(method_frame, props, body)
+                if decoded is None:
                     return
 
-                try:
-                    with init_current_message_ctx(channel, method_frame, props, body):
-                        callback(message_metadata, message)
+                message_metadata, message = decoded
+                if batch_callback is not None and self.batch_limits is not None:
+                    limits = self.batch_limits(message_metadata.message_type)
+                    if limits is not None:
+                        self.add_to_batch(
+                            batch_callback,
+                            limits,
+                            RMQDelivery(
+                                method_frame.delivery_tag, message_metadata, message
+                            ),
+                        )
+                        return
 
-                    if method_frame.delivery_tag:
-                        self.channel.basic_ack(method_frame.delivery_tag)
-                except Exception:
-                    if method_frame.delivery_tag is not None:
-                        self.channel.basic_reject(
-                            method_frame.delivery_tag, requeue=False
+                # only a worker pool needs partitions
+                key: Optional[Hashable] = None
+                if self.executor is not None:
+                    try:
+                        key = self.partition_key(message_metadata, message)
+                    except Exception:
+                        logger.exception(
+                            "Error getting the partition key of rabbitmq message with delivery tag %s",
+                            method_frame.delivery_tag,
                         )
+                        self.reject(method_frame.delivery_tag)
+                        return
 
-                    logger.exception(
-                        "Error deserializing message from rabbitmq message with delivery tag %s",
-                        method_frame.delivery_tag or "unknown",
-                    )
+                self.run(
+                    key,
+                    self.process,
+                    callback,
+                    channel,
+                    method_frame,
+                    props,
+                    body,
+                    message_metadata,
+                    message,
+                )
 
-        self.channel.basic_consume(
-            queue=self.queue,
-            on_message_callback=on_message,
-        )
+        self.channel.basic_consume(queue=self.queue, on_message_callback=on_message)
+
+        if self.max_workers <= 1:
+            self.guard = GracefulKiller.wait_for_kill
+            try:
+                self.channel.start_consuming()
+            finally:
+                if self.pending_acks and self.channel.connection.is_open:
+                    self.flush_acks()
+            return
+
+        with PartitionedExecutor(
+            self.max_workers, thread_name_prefix="rmq-worker"
+        ) as executor:
+            self.executor = executor
+            try:
+                self.channel.start_consuming()
+            finally:
+                if batch_callback is not None and self.channel.connection.is_open:
+                    for message_type in list(self.batches):
+                        self.flush_batch(batch_callback, message_type)
+                self.drain()
+                if self.pending_acks and self.channel.connection.is_open:
+                    self.flush_acks()
+                self.executor = None
 
-        self.channel.start_consuming()
+    def drain(self) -> None:
+        """
+        Waits for the in-flight messages while sending their acks.
+        """
+        connection = self.channel.connection
+        while self.in_flight and connection.is_open:
+            wait(list(self.in_flight), timeout=0.1)
+            connection.process_data_events(time_limit=0)
+        if connection.is_open:
+            connection.process_data_events(time_limit=0)
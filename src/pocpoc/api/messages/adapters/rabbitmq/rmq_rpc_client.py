@@ -1,29 +1,43 @@
 import logging
-from datetime import datetime
-from typing import Any, Optional, cast
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from datetime import datetime, timedelta, timezone
+from functools import partial
+from threading import Event, Lock, Thread
+from time import monotonic
+from typing import Any, Callable, Dict, List, Optional, Sequence, Union, cast
 from uuid import uuid4
 
 import pika
+from pika.adapters.blocking_connection import BlockingChannel
 
-from pocpoc.api.context_tracker.context_track_manager import (
-    ContextTracker,
-    get_current_context,
-)
 from pocpoc.api.messages.adapters.rmq import RMQConnectionFactory
 from pocpoc.api.messages.codec import (
     MessageKitDecoder,
     MessageKitEncoder,
 )
-from pocpoc.api.messages.message import MessageMetadata
+from pocpoc.api.messages.message import Message, create_message_metadata
 from pocpoc.api.messages.rpc import RPC, RPCClient, RPCInput, RPCOutput
 from pocpoc.api.messages.rpc.errors import (
     RPCServerError,
     RPCServerErrorResponse,
+    RPCTimeoutError,
 )
 
 logger = logging.getLogger(__name__)
 
 
+def get_deadline(timeout: Optional[float]) -> Optional[datetime]:
+    if timeout is None:
+        return None
+    deadline = datetime.now(timezone.utc) + timedelta(seconds=timeout)
+    # the JSON codec drops fractions of a second, round up so the server never
+    # sees a deadline earlier than the caller's
+    if deadline.microsecond:
+        deadline = deadline.replace(microsecond=0) + timedelta(seconds=1)
+    return deadline
+
+
 class RMQRCPClientCaller:
     def __init__(
         self, connection: pika.BlockingConnection, exchange: str, input: bytes
@@ -38,7 +52,8 @@ class RMQRCPClientCaller:
         if self.correlation_id == props.correlation_id:
             self.response = body
 
-    def call(self) -> bytes:
+    def call(self, timeout: Optional[float] = None) -> bytes:
+        deadline = None if timeout is None else monotonic() + timeout
         channel = self.connection.channel()
         self.correlation_id = str(uuid4())
 
@@ -72,13 +87,209 @@ class RMQRCPClientCaller:
             logger.debug(
                 "Waiting for RPC response for correlation_id %s", self.correlation_id
             )
-            self.connection.process_data_events(time_limit=None)  # type: ignore
+            time_limit = None if deadline is None else deadline - monotonic()
+            if time_limit is not None and time_limit <= 0:
+                raise RPCTimeoutError(
+                    f"No RPC response for correlation_id {self.correlation_id}"
+                )
+            self.connection.process_data_events(time_limit=time_limit)  # type: ignore
 
         logger.debug("RPC response received for correlation_id %s", self.correlation_id)
 
         return self.response
 
 
+DIRECT_REPLY_TO_QUEUE = "amq.rabbitmq.reply-to"
+
+
+class RPCConnectionError(Exception):
+    pass
+
+
+class RMQRPCChannel:
+    """
+    A connection owned by a background thread that publishes RPC requests
+    and receives every reply on the direct reply-to pseudo-queue, so any
+    number of calls can wait for their replies at the same time.
+
+    Replies are matched to calls by correlation id. Calls waiting on a
+    connection that is lost fail with RPCConnectionError, since their
+    replies can only arrive on that connection. Calls made while there is
+    no connection wait for the connection attempt in progress, if any, and
+    fail with RPCConnectionError when it does not succeed.
+    """
+
+    def __init__(
+        self,
+        connection_factory: Callable[[], pika.BlockingConnection],
+        reconnect_delay: float = 1.0,
+    ) -> None:
+        self.connection_factory = connection_factory
+        self.reconnect_delay = reconnect_delay
+
+        self.lock = Lock()
+        self.pending: Dict[str, "Future[bytes]"] = {}
+        self.thread: Optional[Thread] = None
+        # set while no connection attempt is in progress
+        self.ready = Event()
+        self.connection_error: Optional[BaseException] = None
+        self.closed = Event()
+        self.stopped = Event()
+        self.connection: Optional[pika.BlockingConnection] = None
+        self.channel: Optional[BlockingChannel] = None
+
+    def start(self) -> None:
+        with self.lock:
+            if self.thread is None:
+                self.thread = Thread(target=self._run, name="rmq-rpc", daemon=True)
+                self.thread.start()
+
+    def call(
+        self, exchange: str, body: bytes, timeout: Optional[float] = None
+    ) -> "Future[bytes]":
+        """
+        `timeout` only bounds waiting for the connection, the caller waits on
+        the returned future and discards it when giving up.
+        """
+        if self.closed.is_set():
+            raise RPCConnectionError("RPC channel is closed")
+
+        self.start()
+        if not self.ready.wait(timeout):
+            raise RPCTimeoutError("Timed out waiting for the RPC connection")
+        if self.stopped.is_set():
+            raise RPCConnectionError("RPC channel is not running")
+
+        correlation_id = str(uuid4())
+        future: "Future[bytes]" = Future()
+
+        with self.lock:
+            connection = self.connection
+            if connection is None:
+                raise RPCConnectionError(
+                    f"RPC channel is not connected: {self.connection_error!r}"
+                ) from self.connection_error
+            self.pending[correlation_id] = future
+
+        logger.debug(
+            "Sending RPC request to exchange %s with correlation_id %s",
+            exchange,
+            correlation_id,
+        )
+        connection.add_callback_threadsafe(
+            partial(self._publish, exchange, body, correlation_id)
+        )
+        return future
+
+    def discard(self, future: "Future[bytes]") -> None:
+        with self.lock:
+            for correlation_id, pending in self.pending.items():
+                if pending is future:
+                    del self.pending[correlation_id]
+                    break
+
+    def close(self) -> None:
+        self.closed.set()
+        if self.thread is not None:
+            self.thread.join()
+        self._fail_pending(RPCConnectionError("RPC channel closed"))
+
+    def _run(self) -> None:
+        try:
+            while not self.closed.is_set():
+                self._connect_and_serve()
+                self.closed.wait(self.reconnect_delay)
+        finally:
+            # unblock calls waiting for a connection that will not come
+            self.stopped.set()
+            self.ready.set()
+
+    def _connect_and_serve(self) -> None:
+        self.ready.clear()
+        connection = None
+        try:
+            connection = self.connection_factory()
+            channel = connection.channel()
+            channel.basic_consume(
+                queue=DIRECT_REPLY_TO_QUEUE,
+                on_message_callback=self._on_reply,
+                auto_ack=True,
+            )
+
+            with self.lock:
+                self.connection = connection
+                self.channel = channel
+                self.connection_error = None
+            self.ready.set()
+
+            while not self.closed.is_set():
+                connection.process_data_events(time_limit=1)
+                # the connection does not raise for a channel the broker
+                # closed, e.g. after publishing to a missing exchange
+                if channel.is_closed:
+                    raise RPCConnectionError("RPC channel closed by the broker")
+        except Exception as e:
+            if self.ready.is_set():
+                logger.exception("RPC connection lost")
+            else:
+                logger.exception("Could not open the RPC connection")
+            with self.lock:
+                self.connection_error = e
+        finally:
+            with self.lock:
+                self.connection = None
+                self.channel = None
+            self.ready.set()
+            self._fail_pending(RPCConnectionError("RPC connection lost"))
+            if connection is not None and connection.is_open:
+                try:
+                    connection.close()
+                except Exception:
+                    logger.debug("Error closing RPC connection", exc_info=True)
+
+    def _publish(self, exchange: str, body: bytes, correlation_id: str) -> None:
+        try:
+            if self.channel is None or self.channel.is_closed:
+                raise RPCConnectionError("RPC channel is closed")
+            self.channel.basic_publish(
+                exchange=exchange,
+                routing_key="",
+                properties=pika.BasicProperties(
+                    reply_to=DIRECT_REPLY_TO_QUEUE,
+                    correlation_id=correlation_id,
+                ),
+                body=body,
+            )
+        except Exception as e:
+            with self.lock:
+                future = self.pending.pop(correlation_id, None)
+            if future is not None:
+                future.set_exception(e)
+
+    def _on_reply(self, ch: Any, method: Any, props: Any, body: bytes) -> None:
+        with self.lock:
+            future = self.pending.pop(props.correlation_id, None)
+
+        if future is None:
+            logger.warning(
+                "Discarding RPC response with unknown correlation_id %s",
+                props.correlation_id,
+            )
+            return
+
+        logger.debug(
+            "RPC response received for correlation_id %s", props.correlation_id
+        )
+        future.set_result(body)
+
+    def _fail_pending(self, error: Exception) -> None:
+        with self.lock:
+            pending, self.pending = self.pending, {}
+
+        for future in pending.values():
+            future.set_exception(error)
+
+
 class RMQRPCClient(RPCClient):
     def __init__(
         self,
@@ -86,39 +297,104 @@ class RMQRPCClient(RPCClient):
         rmq_connection_factory: RMQConnectionFactory,
         kit_encoder: MessageKitEncoder[bytes],
         kit_decoder: MessageKitDecoder[bytes],
+        default_timeout: Optional[float] = None,
     ) -> None:
         self.service_name = service_name
         self.rmq_connection_factory = rmq_connection_factory
         self.kit_encoder = kit_encoder
         self.kit_decoder = kit_decoder
+        self.default_timeout = default_timeout
+        self.rpc_channel = RMQRPCChannel(rmq_connection_factory.get_connection)
 
-    def submit(self, rpc: RPC[RPCInput, RPCOutput]) -> RPCOutput:
-        with self.rmq_connection_factory.get_connection() as conn:
-            current_context = get_current_context() or ContextTracker(
-                global_context_id=str(uuid4()),
-                parent_context_id=None,
-                global_started=datetime.utcnow(),
-                local_context_id=str(uuid4()),
-                local_started=datetime.utcnow(),
-                service_name=self.service_name,
-            )
+    def encode_request(
+        self, rpc: RPC[RPCInput, RPCOutput], timeout: Optional[float] = None
+    ) -> bytes:
+        message_metadata = create_message_metadata(
+            rpc.message_type(), self.service_name, get_deadline(timeout)
+        )
 
-            message_metadata = MessageMetadata(
-                message_type=rpc.message_type(),
-                sent_at=datetime.utcnow(),
-                tracked_context=current_context,
-            )
+        return self.kit_encoder.encode(message_metadata, rpc)
+
+    def decode_response(self, result: bytes) -> Any:
+        (
+            __response_message_metadata,
+            message,
+        ) = self.kit_decoder.decode(result)
+
+        if isinstance(message, RPCServerErrorResponse):
+            raise RPCServerError(message)
+
+        return message
+
+    def submit(
+        self, rpc: RPC[RPCInput, RPCOutput], timeout: Optional[float] = None
+    ) -> RPCOutput:
+        if timeout is None:
+            timeout = self.default_timeout
 
-            body = self.kit_encoder.encode(message_metadata, rpc)
+        started = monotonic()
+        body = self.encode_request(rpc, timeout)
+        future = self.rpc_channel.call(rpc.message_type(), body, timeout)
 
-            result = RMQRCPClientCaller(conn, rpc.message_type(), body).call()
+        return cast(RPCOutput, self.wait_response(rpc, future, started, timeout))
 
-            (
-                __response_message_metadata,
-                message,
-            ) = self.kit_decoder.decode(result)
+    def submit_many(
+        self, rpcs: Sequence[RPC[Any, Any]], timeout: Optional[float] = None
+    ) -> List[Union[Message, Exception]]:
+        """
+        Publishes every request before waiting for the first reply, so the
+        calls take about as long as the slowest one. `timeout` applies to the
+        whole batch. A request that fails, to be sent or answered, gets its
+        error in place of a result.
+        """
+        if timeout is None:
+            timeout = self.default_timeout
+
+        started = monotonic()
+        futures: List[Union["Future[bytes]", Exception]] = []
+        try:
+            for rpc in rpcs:
+                try:
+                    body = self.encode_request(rpc, timeout)
+                    futures.append(
+                        self.rpc_channel.call(rpc.message_type(), body, timeout)
+                    )
+                except Exception as e:
+                    futures.append(e)
+
+            results: List[Union[Message, Exception]] = []
+            for rpc, future in zip(rpcs, futures):
+                if isinstance(future, Exception):
+                    results.append(future)
+                    continue
+                try:
+                    results.append(self.wait_response(rpc, future, started, timeout))
+                except Exception as e:
+                    results.append(e)
+            return results
+        finally:
+            for future in futures:
+                if not isinstance(future, Exception) and not future.done():
+                    self.rpc_channel.discard(future)
+
+    def wait_response(
+        self,
+        rpc: RPC[Any, Any],
+        future: "Future[bytes]",
+        started: float,
+        timeout: Optional[float],
+    ) -> Any:
+        try:
+            result = future.result(
+                None if timeout is None else max(0, timeout - (monotonic() - started))
+            )
+        except FutureTimeoutError:
+            self.rpc_channel.discard(future)
+            raise RPCTimeoutError(
+                f"No reply to {rpc.message_type()} within {timeout} seconds"
+            )
 
-            if isinstance(message, RPCServerErrorResponse):
-                raise RPCServerError(message)
+        return self.decode_response(result)
 
-            return cast(RPCOutput, message)
+    def close(self) -> None:
+        self.rpc_channel.close()
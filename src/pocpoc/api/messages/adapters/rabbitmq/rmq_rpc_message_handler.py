@@ -1,5 +1,6 @@
 import logging
 from datetime import datetime
+from functools import partial
 
 from pika import BasicProperties
 
@@ -10,6 +11,9 @@ from pocpoc.api.di.class_initializer import ClassInitializer
 from pocpoc.api.messages.adapters.rabbitmq.rmq_message_subscriber import (
     get_current_message_data,
 )
+from pocpoc.api.messages.adapters.rabbitmq.rmq_utils import (
+    get_metadata_properties,
+)
 from pocpoc.api.messages.codec import MessageKitEncoder
 from pocpoc.api.messages.message import Message, MessageMetadata
 from pocpoc.api.messages.rpc.handler import RPCMessageHandler
@@ -24,9 +28,11 @@ class RabbitMQRPCMessageHandler(RPCMessageHandler):
         rpc_map: RPCMap,
         class_initializer: ClassInitializer,
         kit_encoder: MessageKitEncoder[bytes],
+        metadata_headers: bool = False,
     ) -> None:
         super().__init__(rpc_map, class_initializer)
         self.kit_encoder = kit_encoder
+        self.metadata_headers = metadata_headers
 
     def reply(self, result: Message) -> None:
         current_message = get_current_message_data()
@@ -42,12 +48,23 @@ class RabbitMQRPCMessageHandler(RPCMessageHandler):
 
         body = self.kit_encoder.encode(message_metadata, result)
 
-        current_message.channel.basic_publish(
-            exchange="",
-            routing_key=current_message.header_frame.reply_to,
-            properties=BasicProperties(
-                correlation_id=current_message.header_frame.correlation_id,
+        correlation_id = current_message.header_frame.correlation_id
+        if self.metadata_headers:
+            properties = get_metadata_properties(
+                message_metadata, correlation_id=correlation_id
+            )
+        else:
+            properties = BasicProperties(
+                correlation_id=correlation_id,
                 timestamp=int(datetime.utcnow().timestamp()),
-            ),
-            body=body,
+            )
+
+        current_message.run_threadsafe(
+            partial(
+                current_message.channel.basic_publish,
+                exchange="",
+                routing_key=current_message.header_frame.reply_to,
+                properties=properties,
+                body=body,
+            )
         )
@@ -1,9 +1,12 @@
 import logging
-from typing import Iterable, Type
+from typing import Any, Dict, Iterable, Optional, Type, cast
 
+from pika import BasicProperties
 from pika.adapters.blocking_connection import BlockingChannel
 from pika.exchange_type import ExchangeType
-from pocpoc.api.messages.message import Message
+
+from pocpoc.api.codec.codecs.datetime_codec import serialize_datetime
+from pocpoc.api.messages.message import Message, MessageMetadata
 
 logger = logging.getLogger(__name__)
 
@@ -33,3 +36,51 @@ def register_messages_as_exchange_to_queue(
             queue=service_queue,
             exchange=message_cls.message_type(),
         )
+
+
+MESSAGE_TYPE_HEADER = "x-message-type"
+SENT_AT_HEADER = "x-sent-at"
+SERVICE_NAME_HEADER = "x-service-name"
+GLOBAL_CONTEXT_ID_HEADER = "x-global-context-id"
+LOCAL_CONTEXT_ID_HEADER = "x-local-context-id"
+PARENT_CONTEXT_ID_HEADER = "x-parent-context-id"
+
+
+def get_metadata_headers(message_metadata: MessageMetadata) -> Dict[str, Any]:
+    """
+    The metadata fields consumers and header exchanges route on, which are
+    also encoded in the body.
+    """
+    headers: Dict[str, Any] = {
+        MESSAGE_TYPE_HEADER: message_metadata.message_type,
+        SENT_AT_HEADER: serialize_datetime(message_metadata.sent_at),
+    }
+
+    context = message_metadata.tracked_context
+    if context is not None:
+        headers[SERVICE_NAME_HEADER] = context.service_name
+        headers[GLOBAL_CONTEXT_ID_HEADER] = context.global_context_id
+        headers[LOCAL_CONTEXT_ID_HEADER] = context.local_context_id
+        if context.parent_context_id is not None:
+            headers[PARENT_CONTEXT_ID_HEADER] = context.parent_context_id
+
+    return headers
+
+
+def get_metadata_properties(
+    message_metadata: MessageMetadata, **properties: Any
+) -> BasicProperties:
+    return BasicProperties(
+        type=message_metadata.message_type,
+        timestamp=int(message_metadata.sent_at.timestamp()),
+        headers=get_metadata_headers(message_metadata),
+        **properties,
+    )
+
+
+def get_message_type_from_properties(properties: Any) -> Optional[str]:
+    headers = getattr(properties, "headers", None) or {}
+    message_type = headers.get(MESSAGE_TYPE_HEADER)
+    if isinstance(message_type, bytes):
+        return message_type.decode("utf-8")
+    return cast(Optional[str], message_type)
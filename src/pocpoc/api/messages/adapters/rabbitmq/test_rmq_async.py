@@ -0,0 +1,170 @@
+import asyncio
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import pytest
+
+from pocpoc.api.context_tracker.context_track_manager import init_new_context
+from pocpoc.api.messages.map import MessageMap
+from pocpoc.api.messages.message import Message
+from pocpoc.api.messages.rpc import RPC
+from pocpoc.api.messages.rpc.errors import RPCTimeoutError
+from pocpoc.api.microservices.adapters.rmq import (
+    create_json_kit_decoder,
+    create_json_kit_encoder,
+)
+
+pytest.importorskip("aio_pika")
+
+from pocpoc.api.messages.adapters.rabbitmq.rmq_async import (  # noqa: E402
+    AsyncRMQMessageDispatcher,
+    AsyncRMQRPCClient,
+)
+
+
+@dataclass
+class Pong(Message):
+    count: int
+
+    @classmethod
+    def message_type(cls) -> str:
+        return "pong"
+
+
+@dataclass
+class Ping(RPC[None, Pong]):
+    count: int
+
+    def get_input(self) -> None:
+        return None
+
+    @classmethod
+    def message_type(cls) -> str:
+        return "ping"
+
+
+@dataclass
+class Lost(RPC[None, Pong]):
+    def get_input(self) -> None:
+        return None
+
+    @classmethod
+    def message_type(cls) -> str:
+        return "black_hole"
+
+
+message_map = MessageMap()
+message_map.register_messages(Ping, Pong)
+kit_encoder = create_json_kit_encoder("utf-8")
+kit_decoder = create_json_kit_decoder(message_map, "utf-8")
+
+
+@dataclass
+class FakeIncomingMessage:
+    correlation_id: str
+    body: bytes
+
+
+class FakeQueue:
+    name = "callback"
+
+    def __init__(self) -> None:
+        self.on_reply: Optional[Callable[..., Any]] = None
+
+    async def consume(self, callback: Callable[..., Any], no_ack: bool) -> None:
+        assert no_ack
+        self.on_reply = callback
+
+
+class FakeExchange:
+    def __init__(self, channel: "FakeChannel", name: str) -> None:
+        self.channel = channel
+        self.name = name
+
+    async def publish(self, message: Any, routing_key: str) -> None:
+        self.channel.published.append((self.name, message))
+        if self.name != "ping":
+            return
+
+        metadata, ping = kit_decoder.decode(message.body)
+        assert isinstance(ping, Ping)
+        reply = kit_encoder.encode(metadata, Pong(ping.count))
+        queue = self.channel.queue
+        assert queue.on_reply is not None
+        asyncio.get_event_loop().call_soon(
+            lambda: asyncio.ensure_future(
+                queue.on_reply(FakeIncomingMessage(message.correlation_id, reply))  # type: ignore
+            )
+        )
+
+
+class FakeChannel:
+    def __init__(self) -> None:
+        self.published: List[Tuple[str, Any]] = []
+        self.exchanges: Dict[str, FakeExchange] = {}
+        self.queue = FakeQueue()
+        self.queues_declared = 0
+
+    async def get_exchange(self, name: str, ensure: bool) -> FakeExchange:
+        return self.exchanges.setdefault(name, FakeExchange(self, name))
+
+    async def declare_queue(self, exclusive: bool) -> FakeQueue:
+        self.queues_declared += 1
+        await asyncio.sleep(0)
+        return self.queue
+
+
+def create_client(channel: FakeChannel) -> AsyncRMQRPCClient:
+    client = AsyncRMQRPCClient("caller", None, kit_encoder, kit_decoder)  # type: ignore
+    client.channel.channel = channel  # type: ignore
+    return client
+
+
+def test_concurrent_submits_share_one_reply_queue() -> None:
+    channel = FakeChannel()
+    client = create_client(channel)
+
+    async def submit_all() -> List[Pong]:
+        return await asyncio.gather(*(client.submit(Ping(i)) for i in range(500)))
+
+    results = asyncio.run(submit_all())
+
+    assert [pong.count for pong in results] == list(range(500))
+    assert channel.queues_declared == 1
+    assert len(channel.exchanges) == 1
+    assert client.pending == {}
+
+
+def test_submit_times_out_without_a_reply() -> None:
+    client = create_client(FakeChannel())
+
+    with pytest.raises(RPCTimeoutError):
+        asyncio.run(client.submit(Lost(), timeout=0.05))
+    assert client.pending == {}
+
+
+def test_dispatch_sends_the_context_of_each_task() -> None:
+    channel = FakeChannel()
+    dispatcher = AsyncRMQMessageDispatcher(
+        None, "sender", kit_encoder, metadata_headers=True  # type: ignore
+    )
+    dispatcher.channel.channel = channel  # type: ignore
+
+    async def dispatch(count: int) -> str:
+        with init_new_context("sender") as context:
+            await asyncio.sleep(0)
+            await dispatcher.dispatch(Pong(count))
+            return context.global_context_id
+
+    async def dispatch_all() -> List[str]:
+        return await asyncio.gather(*(dispatch(i) for i in range(10)))
+
+    context_ids = asyncio.run(dispatch_all())
+
+    assert len(set(context_ids)) == 10
+    for context_id, (exchange, message) in zip(context_ids, channel.published):
+        metadata, _ = kit_decoder.decode(message.body)
+        assert exchange == "pong"
+        assert metadata.tracked_context is not None
+        assert metadata.tracked_context.global_context_id == context_id
+        assert message.headers["x-global-context-id"] == context_id
@@ -0,0 +1,140 @@
+from threading import Thread
+from typing import Any, List
+
+import pytest
+from pika import ConnectionParameters
+from pika.spec import Basic
+
+from pocpoc.api.messages.adapters.rabbitmq.rmq_confirm_publisher import (
+    RMQConfirmPublisher,
+    RMQPendingPublish,
+    RMQPublishError,
+)
+
+
+class FakeChannel:
+    is_open = True
+
+    def __init__(self) -> None:
+        self.published: List[bytes] = []
+
+    def basic_publish(
+        self, exchange: str, routing_key: str, body: bytes, properties: Any
+    ) -> None:
+        self.published.append(body)
+
+
+class FakeFrame:
+    def __init__(self, method: Any) -> None:
+        self.method = method
+
+
+def create_publisher(max_retries: int = 1) -> RMQConfirmPublisher:
+    publisher = RMQConfirmPublisher(ConnectionParameters(), max_retries=max_retries)
+    publisher.channel = FakeChannel()  # type: ignore
+    return publisher
+
+
+def publish(publisher: RMQConfirmPublisher, *bodies: bytes) -> List[Any]:
+    pending = [RMQPendingPublish("exchange", body, None) for body in bodies]
+    for item in pending:
+        publisher.outbox.put(item)
+    publisher._drain()
+    return [item.future for item in pending]
+
+
+def test_acks_resolve_futures() -> None:
+    publisher = create_publisher()
+    first, second, third = publish(publisher, b"1", b"2", b"3")
+
+    publisher._on_delivery_confirmation(FakeFrame(Basic.Ack(2, multiple=True)))
+
+    assert first.result(0) is None
+    assert second.result(0) is None
+    assert not third.done()
+
+    publisher._on_delivery_confirmation(FakeFrame(Basic.Ack(3)))
+    assert third.result(0) is None
+    assert publisher.unconfirmed == {}
+
+
+def test_nacked_messages_are_published_again() -> None:
+    publisher = create_publisher(max_retries=1)
+    channel: Any = publisher.channel
+    (future,) = publish(publisher, b"1")
+
+    publisher._on_delivery_confirmation(FakeFrame(Basic.Nack(1)))
+    assert channel.published == [b"1", b"1"]
+    assert not future.done()
+
+    publisher._on_delivery_confirmation(FakeFrame(Basic.Nack(2)))
+    with pytest.raises(RMQPublishError):
+        future.result(0)
+
+
+def test_unconfirmed_messages_are_retried_after_reconnecting() -> None:
+    publisher = create_publisher()
+    (future,) = publish(publisher, b"1")
+
+    publisher.channel = None
+    publisher._requeue_unconfirmed()
+    publisher.channel = FakeChannel()  # type: ignore
+    publisher.delivery_tag = 0
+    publisher._drain()
+
+    publisher._on_delivery_confirmation(FakeFrame(Basic.Ack(1)))
+    assert future.result(0) is None
+
+
+def test_close_fails_queued_messages() -> None:
+    publisher = create_publisher()
+    pending = RMQPendingPublish("exchange", b"1", None)
+    publisher.outbox.put(pending)
+
+    publisher.close()
+
+    with pytest.raises(RMQPublishError):
+        pending.future.result(0)
+    with pytest.raises(RMQPublishError):
+        publisher.publish("exchange", b"2")
+
+
+def test_stopped_publisher_thread_fails_unconfirmed_messages() -> None:
+    publisher = create_publisher()
+    (future,) = publish(publisher, b"1")
+
+    publisher.closed.set()
+    publisher._run()
+
+    with pytest.raises(RMQPublishError):
+        future.result(0)
+    assert publisher.unconfirmed == {}
+
+
+def test_close_waits_for_published_messages_to_be_confirmed() -> None:
+    publisher = create_publisher()
+    publisher.start = lambda: None  # type: ignore
+    future = publisher.publish("exchange", b"1")
+
+    closing = Thread(target=publisher.close)
+    closing.start()
+    publisher.closing.wait(5)
+    assert not publisher.closed.is_set()
+
+    publisher._drain()
+    publisher._on_delivery_confirmation(FakeFrame(Basic.Ack(1)))
+    closing.join(5)
+
+    assert future.result(0) is None
+    assert publisher.closed.is_set()
+
+
+def test_close_gives_up_waiting_after_confirm_timeout() -> None:
+    publisher = create_publisher()
+    publisher.start = lambda: None  # type: ignore
+    future = publisher.publish("exchange", b"1")
+
+    publisher.close(confirm_timeout=0.01)
+
+    with pytest.raises(RMQPublishError):
+        future.result(0)
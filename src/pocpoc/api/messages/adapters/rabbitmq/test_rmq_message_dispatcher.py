@@ -0,0 +1,159 @@
+from dataclasses import dataclass
+from typing import Any, List, Tuple
+
+from pika.exceptions import AMQPError
+
+from pocpoc.api.messages.adapters.rabbitmq.rmq_message_dispatcher import (
+    RMQMessageDispatcher,
+)
+from pocpoc.api.messages.adapters.rmq import RMQChannelPool, RMQConnectionFactory
+from pocpoc.api.messages.message import Message
+from pocpoc.api.microservices.adapters.rmq import (
+    create_json_kit_encoder,
+    create_rmq_json_message_dispatcher,
+)
+
+
+@dataclass
+class Greeted(Message):
+    name: str
+
+    @classmethod
+    def message_type(cls) -> str:
+        return "greeted"
+
+
+class FakeChannel:
+    def __init__(self, connection: "FakeConnection") -> None:
+        self.connection = connection
+        self.is_open = True
+        self.transactional = False
+        self.pending: List[Tuple[str, bytes]] = []
+        self.selects = 0
+
+    def basic_publish(
+        self, exchange: str, routing_key: str, body: bytes, properties: Any
+    ) -> None:
+        if self.transactional:
+            self.pending.append((exchange, body))
+        else:
+            self.connection.published.append((exchange, body))
+
+    def tx_select(self) -> None:
+        self.transactional = True
+        self.selects += 1
+
+    def tx_commit(self) -> None:
+        self.connection.published.extend(self.pending)
+        self.connection.commits += 1
+        self.pending = []
+
+    def tx_rollback(self) -> None:
+        self.pending = []
+
+    def close(self) -> None:
+        self.is_open = False
+
+
+class FakeConnection:
+    is_open = True
+
+    def __init__(self) -> None:
+        self.published: List[Tuple[str, bytes]] = []
+        self.channels: List[FakeChannel] = []
+        self.commits = 0
+        self.closes = 0
+
+    def channel(self) -> FakeChannel:
+        channel = FakeChannel(self)
+        self.channels.append(channel)
+        return channel
+
+    def process_data_events(self, time_limit: Any = None) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closes += 1
+
+
+class FakeConnectionFactory:
+    def __init__(self) -> None:
+        self.connection = FakeConnection()
+        self.channel_pool = RMQChannelPool(lambda: self.connection)  # type: ignore
+
+
+def create_dispatcher(
+    confirm_delivery: bool,
+) -> Tuple[RMQMessageDispatcher, FakeConnection]:
+    factory = FakeConnectionFactory()
+    dispatcher = RMQMessageDispatcher(
+        factory,  # type: ignore
+        "greeter",
+        create_json_kit_encoder("utf-8"),
+        confirm_delivery=confirm_delivery,
+    )
+    return dispatcher, factory.connection
+
+
+def test_dispatch_batch_reuses_one_channel() -> None:
+    dispatcher, connection = create_dispatcher(confirm_delivery=False)
+
+    dispatcher.dispatch_batch([Greeted("a"), Greeted("b")])
+    dispatcher.dispatch(Greeted("c"))
+
+    assert [exchange for exchange, _ in connection.published] == ["greeted"] * 3
+    assert len(connection.channels) == 1
+
+
+def test_dispatch_batch_with_confirms_commits_once() -> None:
+    dispatcher, connection = create_dispatcher(confirm_delivery=True)
+
+    dispatcher.dispatch_batch([Greeted("a"), Greeted("b")])
+
+    assert len(connection.published) == 2
+    assert connection.commits == 1
+
+
+def test_dispatch_batch_with_confirms_reuses_transactional_channel() -> None:
+    dispatcher, connection = create_dispatcher(confirm_delivery=True)
+
+    dispatcher.dispatch_batch([Greeted("a")])
+    dispatcher.dispatch_batch([Greeted("b")])
+
+    assert connection.commits == 2
+    assert len(connection.channels) == 2
+    assert [channel.selects for channel in connection.channels] == [0, 1]
+
+
+def test_dispatch_batch_with_confirms_retries_uncommitted_batch() -> None:
+    dispatcher, connection = create_dispatcher(confirm_delivery=True)
+    publish = dispatcher.publish
+    failures = [AMQPError()]
+
+    def publish_failing_once(channel: Any, publishes: Any) -> None:
+        publish(channel, publishes)
+        if failures:
+            raise failures.pop()
+
+    dispatcher.publish = publish_failing_once  # type: ignore
+
+    dispatcher.dispatch_batch([Greeted("a"), Greeted("b")])
+
+    assert len(connection.published) == 2
+    assert connection.commits == 1
+    assert connection.closes == 1
+
+
+def test_dispatcher_factory_wires_the_confirm_publisher() -> None:
+    dispatcher = create_rmq_json_message_dispatcher(
+        "greeter",
+        RMQConnectionFactory("localhost", 5672, "guest", "guest"),
+        "utf-8",
+        use_confirm_publisher=True,
+    )
+    confirm_publisher = dispatcher.confirm_publisher
+    assert confirm_publisher is not None
+
+    dispatcher.close()
+
+    assert confirm_publisher.closed.is_set()
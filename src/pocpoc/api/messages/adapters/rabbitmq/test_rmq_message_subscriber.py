@@ -0,0 +1,436 @@
+from dataclasses import dataclass, replace
+from datetime import datetime, timezone
+from queue import Empty, SimpleQueue
+from threading import Barrier, get_ident
+from time import sleep
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from pocpoc.api.context_tracker.context_track_manager import ContextTracker
+from pocpoc.api.messages.adapters.rabbitmq.rmq_message_subscriber import (
+    RMQMessageSubscriber,
+    get_current_message_data,
+)
+from pocpoc.api.messages.adapters.rabbitmq.rmq_utils import (
+    GLOBAL_CONTEXT_ID_HEADER,
+    MESSAGE_TYPE_HEADER,
+    get_message_type_from_properties,
+    get_metadata_properties,
+)
+from pocpoc.api.messages.controller.message_controller import BatchLimits
+from pocpoc.api.messages.map import MessageMap
+from pocpoc.api.messages.message import Message, MessageMetadata
+from pocpoc.api.microservices.adapters.rmq import (
+    create_json_kit_decoder,
+    create_json_kit_encoder,
+)
+
+
+@dataclass
+class UserCreated(Message):
+    name: str
+
+    @classmethod
+    def message_type(cls) -> str:
+        return "user_created"
+
+
+@dataclass
+class FakeMethodFrame:
+    delivery_tag: int
+
+
+class FakeChannel:
+    def __init__(self) -> None:
+        self.acks: List[int] = []
+        self.rejects: List[int] = []
+        self.on_message: Optional[Callable[..., None]] = None
+
+    def basic_consume(self, queue: str, on_message_callback: Any) -> None:
+        self.on_message = on_message_callback
+
+    def start_consuming(self) -> None:
+        pass
+
+    def basic_ack(self, delivery_tag: int) -> None:
+        self.acks.append(delivery_tag)
+
+    def basic_reject(self, delivery_tag: int, requeue: bool) -> None:
+        self.rejects.append(delivery_tag)
+
+
+def get_metadata() -> MessageMetadata:
+    return MessageMetadata(
+        message_type=UserCreated.message_type(),
+        sent_at=datetime(2020, 1, 1, tzinfo=timezone.utc),
+        tracked_context=ContextTracker(
+            global_started=datetime(2020, 1, 1, tzinfo=timezone.utc),
+            global_context_id="global",
+            local_started=datetime(2020, 1, 1, tzinfo=timezone.utc),
+            local_context_id="local",
+            service_name="users",
+        ),
+    )
+
+
+def listen(message_filter: Callable[[str], bool]) -> Tuple[FakeChannel, List[Message]]:
+    message_map = MessageMap()
+    message_map.register_messages(UserCreated)
+    channel = FakeChannel()
+    received: List[Message] = []
+
+    subscriber = RMQMessageSubscriber(
+        channel,  # type: ignore
+        "users",
+        create_json_kit_decoder(message_map, "utf-8"),
+        message_filter,
+    )
+    subscriber.listen(lambda metadata, message: received.append(message))
+    return channel, received
+
+
+def test_metadata_properties() -> None:
+    properties: Any = get_metadata_properties(get_metadata(), correlation_id="abc")
+
+    assert properties.type == "user_created"
+    assert properties.correlation_id == "abc"
+    assert properties.headers[GLOBAL_CONTEXT_ID_HEADER] == "global"
+    assert get_message_type_from_properties(properties) == "user_created"
+    assert get_message_type_from_properties(None) is None
+
+
+def test_subscriber_skips_unwanted_messages_by_header() -> None:
+    channel, received = listen(lambda message_type: False)
+    assert channel.on_message is not None
+
+    channel.on_message(
+        channel,
+        FakeMethodFrame(1),
+        get_metadata_properties(get_metadata()),
+        b"not a message kit",
+    )
+
+    assert channel.acks == [1]
+    assert channel.rejects == []
+    assert received == []
+
+
+def test_subscriber_filters_on_metadata_without_headers() -> None:
+    body = create_json_kit_encoder("utf-8").encode(get_metadata(), UserCreated("a"))
+
+    channel, received = listen(lambda message_type: False)
+    assert channel.on_message is not None
+    channel.on_message(channel, FakeMethodFrame(1), None, body)
+    assert channel.acks == [1]
+    assert received == []
+
+    channel, received = listen(lambda message_type: message_type == "user_created")
+    assert channel.on_message is not None
+    properties: Any = get_metadata_properties(get_metadata())
+    properties.headers[MESSAGE_TYPE_HEADER] = b"user_created"
+    channel.on_message(channel, FakeMethodFrame(2), properties, body)
+    assert channel.acks == [2]
+    assert received == [UserCreated("a")]
+
+
+class FakeConnection:
+    is_open = True
+
+    def __init__(self) -> None:
+        self.callbacks: "SimpleQueue[Callable[[], None]]" = SimpleQueue()
+
+    def add_callback_threadsafe(self, callback: Callable[[], None]) -> None:
+        self.callbacks.put(callback)
+
+    def process_data_events(self, time_limit: Any = None) -> None:
+        while True:
+            try:
+                self.callbacks.get_nowait()()
+            except Empty:
+                return
+
+
+class FakeConsumingChannel(FakeChannel):
+    def __init__(self, bodies: List[bytes]) -> None:
+        super().__init__()
+        self.connection = FakeConnection()
+        self.bodies = bodies
+        self.ack_threads: Set[int] = set()
+
+    def start_consuming(self) -> None:
+        assert self.on_message is not None
+        for tag, body in enumerate(self.bodies, 1):
+            self.on_message(self, FakeMethodFrame(tag), None, body)
+
+    def basic_ack(self, delivery_tag: int) -> None:
+        super().basic_ack(delivery_tag)
+        self.ack_threads.add(get_ident())
+
+
+def test_worker_pool_handles_messages_concurrently() -> None:
+    message_map = MessageMap()
+    message_map.register_messages(UserCreated)
+    encoder = create_json_kit_encoder("utf-8")
+    channel = FakeConsumingChannel(
+        [encoder.encode(get_metadata(), UserCreated(str(tag))) for tag in range(1, 5)]
+    )
+    barrier = Barrier(4, timeout=5)
+    received: List[Tuple[int, str]] = []
+
+    def callback(metadata: MessageMetadata, message: Any) -> None:
+        # only passes when all four messages are handled at the same time
+        barrier.wait()
+        current_message = get_current_message_data()
+        received.append((current_message.method_frame.delivery_tag, message.name))
+
+    subscriber = RMQMessageSubscriber(
+        channel,  # type: ignore
+        "users",
+        create_json_kit_decoder(message_map, "utf-8"),
+        max_workers=4,
+    )
+    subscriber.listen(callback)
+
+    assert sorted(received) == [(1, "1"), (2, "2"), (3, "3"), (4, "4")]
+    assert sorted(channel.acks) == [1, 2, 3, 4]
+    assert channel.ack_threads == {get_ident()}
+
+
+def test_worker_pool_keeps_partitions_in_order() -> None:
+    message_map = MessageMap()
+    message_map.register_messages(UserCreated)
+    encoder = create_json_kit_encoder("utf-8")
+    names = [f"{user}{i}" for i in range(10) for user in "abc"]
+    channel = FakeConsumingChannel(
+        [encoder.encode(get_metadata(), UserCreated(name)) for name in names]
+    )
+    received: List[str] = []
+
+    def callback(metadata: MessageMetadata, message: Any) -> None:
+        sleep(0.001)
+        received.append(message.name)
+
+    subscriber = RMQMessageSubscriber(
+        channel,  # type: ignore
+        "users",
+        create_json_kit_decoder(message_map, "utf-8"),
+        max_workers=3,
+        partition_key=lambda metadata, message: message.name[0],  # type: ignore
+    )
+    subscriber.listen(callback)
+
+    for user in "abc":
+        assert [name for name in received if name[0] == user] == [
+            name for name in names if name[0] == user
+        ]
+    assert sorted(channel.acks) == list(range(1, 31))
+
+
+def test_messages_without_a_partition_key_are_rejected() -> None:
+    message_map = MessageMap()
+    message_map.register_messages(UserCreated)
+    encoder = create_json_kit_encoder("utf-8")
+    channel = FakeConsumingChannel(
+        [encoder.encode(get_metadata(), UserCreated(name)) for name in ["a", ""]]
+    )
+    received: List[str] = []
+
+    subscriber = RMQMessageSubscriber(
+        channel,  # type: ignore
+        "users",
+        create_json_kit_decoder(message_map, "utf-8"),
+        max_workers=2,
+        partition_key=lambda metadata, message: message.name[0],  # type: ignore
+    )
+    subscriber.listen(lambda metadata, message: received.append(message.name))  # type: ignore
+
+    assert received == ["a"]
+    assert channel.acks == [1]
+    assert channel.rejects == [2]
+
+
+def test_partition_key_is_not_computed_without_a_worker_pool() -> None:
+    def partition_key(metadata: MessageMetadata, message: Message) -> str:
+        raise AssertionError("partition key computed")
+
+    message_map = MessageMap()
+    message_map.register_messages(UserCreated)
+    encoder = create_json_kit_encoder("utf-8")
+    channel = FakeConsumingChannel([encoder.encode(get_metadata(), UserCreated("a"))])
+
+    subscriber = RMQMessageSubscriber(
+        channel,  # type: ignore
+        "users",
+        create_json_kit_decoder(message_map, "utf-8"),
+        partition_key=partition_key,
+    )
+    subscriber.listen(lambda metadata, message: None)
+
+    assert channel.acks == [1]
+
+
+@dataclass
+class UserDeleted(Message):
+    name: str
+
+    @classmethod
+    def message_type(cls) -> str:
+        return "user_deleted"
+
+
+class FakeTimerConnection(FakeConnection):
+    def __init__(self) -> None:
+        super().__init__()
+        self.timers: Dict[int, Callable[[], None]] = {}
+
+    def call_later(self, delay: float, callback: Callable[[], None]) -> int:
+        self.timers[len(self.timers)] = callback
+        return len(self.timers) - 1
+
+    def remove_timeout(self, timer_id: int) -> None:
+        del self.timers[timer_id]
+
+    def fire_timers(self) -> None:
+        timers, self.timers = self.timers, {}
+        for callback in timers.values():
+            callback()
+
+
+class FakeBatchingChannel(FakeChannel):
+    def __init__(self) -> None:
+        super().__init__()
+        self.connection = FakeTimerConnection()
+        self.multiple_acks: List[int] = []
+
+    def basic_ack(self, delivery_tag: int, multiple: bool = False) -> None:
+        if multiple:
+            self.multiple_acks.append(delivery_tag)
+        else:
+            super().basic_ack(delivery_tag)
+
+
+def test_subscriber_batches_messages_by_type() -> None:
+    message_map = MessageMap()
+    message_map.register_messages(UserCreated, UserDeleted)
+    encoder = create_json_kit_encoder("utf-8")
+    channel = FakeBatchingChannel()
+    received: List[Message] = []
+    batches: List[List[Message]] = []
+
+    subscriber = RMQMessageSubscriber(
+        channel,  # type: ignore
+        "users",
+        create_json_kit_decoder(message_map, "utf-8"),
+        batch_limits=lambda message_type: BatchLimits(3, 100)
+        if message_type == "user_created"
+        else None,
+    )
+    subscriber.listen(
+        lambda metadata, message: received.append(message),
+        lambda batch: batches.append([message for _, message in batch]),
+    )
+
+    def deliver(tag: int, message: Message) -> None:
+        assert channel.on_message is not None
+        metadata = replace(get_metadata(), message_type=message.message_type())
+        channel.on_message(
+            channel, FakeMethodFrame(tag), None, encoder.encode(metadata, message)
+        )
+
+    for tag in range(1, 4):
+        deliver(tag, UserCreated(str(tag)))
+    # one frame acks the whole batch
+    assert channel.multiple_acks == [3]
+    assert channel.connection.timers == {}
+
+    deliver(4, UserCreated("4"))
+    deliver(5, UserDeleted("5"))
+    deliver(6, UserCreated("6"))
+    assert received == [UserDeleted("5")]
+    assert channel.acks == [5]
+
+    channel.connection.fire_timers()
+    assert batches == [
+        [UserCreated("1"), UserCreated("2"), UserCreated("3")],
+        [UserCreated("4"), UserCreated("6")],
+    ]
+    assert channel.multiple_acks == [3, 6]
+    assert subscriber.unacked == set()
+
+
+class FakeCoalescingChannel(FakeBatchingChannel):
+    def __init__(self, bodies: List[bytes]) -> None:
+        super().__init__()
+        self.bodies = bodies
+
+    def start_consuming(self) -> None:
+        assert self.on_message is not None
+        for tag, body in enumerate(self.bodies, 1):
+            self.on_message(self, FakeMethodFrame(tag), None, body)
+
+
+def create_coalescing_subscriber(
+    channel: FakeBatchingChannel,
+) -> RMQMessageSubscriber:
+    message_map = MessageMap()
+    message_map.register_messages(UserCreated)
+    return RMQMessageSubscriber(
+        channel,  # type: ignore
+        "users",
+        create_json_kit_decoder(message_map, "utf-8"),
+        ack_batch_size=3,
+    )
+
+
+def test_acks_are_coalesced() -> None:
+    encoder = create_json_kit_encoder("utf-8")
+    channel = FakeBatchingChannel()
+    subscriber = create_coalescing_subscriber(channel)
+
+    def callback(metadata: MessageMetadata, message: Any) -> None:
+        if message.name == "fail":
+            raise ValueError()
+
+    subscriber.listen(callback)
+    assert channel.on_message is not None
+    for tag, name in enumerate(["a", "b", "fail", "c", "d", "e"], 1):
+        channel.on_message(
+            channel,
+            FakeMethodFrame(tag),
+            None,
+            encoder.encode(get_metadata(), UserCreated(name)),
+        )
+
+    # rejects are sent right away, one per message
+    assert channel.rejects == [3]
+    assert channel.multiple_acks == [4]
+    assert channel.acks == []
+
+    channel.connection.fire_timers()
+    assert channel.multiple_acks == [4, 6]
+    assert subscriber.unacked == set()
+
+
+def test_acks_after_a_message_in_progress_are_sent_one_by_one() -> None:
+    channel = FakeBatchingChannel()
+    subscriber = create_coalescing_subscriber(channel)
+    subscriber.unacked = {1, 2, 3, 4}
+
+    for tag in (1, 3, 4):
+        subscriber.settle([tag], True)
+
+    assert channel.acks == [1, 3, 4]
+    assert channel.multiple_acks == []
+    assert subscriber.unacked == {2}
+
+
+def test_pending_acks_are_flushed_when_listen_returns() -> None:
+    encoder = create_json_kit_encoder("utf-8")
+    channel = FakeCoalescingChannel(
+        [encoder.encode(get_metadata(), UserCreated(name)) for name in "ab"]
+    )
+    subscriber = create_coalescing_subscriber(channel)
+
+    subscriber.listen(lambda metadata, message: None)
+
+    assert channel.multiple_acks == [2]
+    assert channel.connection.timers == {}
@@ -0,0 +1,358 @@
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from queue import Empty, SimpleQueue
+from time import sleep
+from typing import Any, Callable, List, Optional, Tuple
+
+import pytest
+from pika.exceptions import AMQPConnectionError, StreamLostError
+
+from pocpoc.api.messages.adapters.rabbitmq.rmq_rpc_client import (
+    RMQRPCChannel,
+    RMQRPCClient,
+    RPCConnectionError,
+)
+from pocpoc.api.messages.map import MessageMap
+from pocpoc.api.messages.message import Message, create_message_metadata
+from pocpoc.api.messages.rpc import RPC
+from pocpoc.api.messages.rpc.errors import (
+    RPCServerError,
+    RPCServerErrorResponse,
+    RPCTimeoutError,
+)
+from pocpoc.api.microservices.adapters.rmq import (
+    create_json_kit_decoder,
+    create_json_kit_encoder,
+)
+
+
+@dataclass
+class FakeProperties:
+    correlation_id: str
+
+
+class FakeChannel:
+    def __init__(self, connection: "FakeConnection") -> None:
+        self.connection = connection
+        self.on_reply: Optional[Callable[..., None]] = None
+        self.is_closed = False
+
+    def basic_consume(
+        self, queue: str, on_message_callback: Any, auto_ack: bool
+    ) -> None:
+        assert auto_ack
+        self.on_reply = on_message_callback
+
+    def basic_publish(
+        self, exchange: str, routing_key: str, properties: Any, body: bytes
+    ) -> None:
+        assert properties.reply_to == "amq.rabbitmq.reply-to"
+        self.connection.published.append(exchange)
+        if exchange == "missing":
+            # the broker closes the channel, pika only raises on channel methods
+            self.is_closed = True
+        elif exchange == "echo":
+            self.connection.replies.put((properties.correlation_id, body))
+        elif exchange == "fail":
+            error = create_json_kit_encoder("utf-8").encode(
+                create_message_metadata("rpc_server_error_response", "server"),
+                RPCServerErrorResponse("failed"),
+            )
+            self.connection.replies.put((properties.correlation_id, error))
+
+
+class FakeConnection:
+    is_open = True
+
+    def __init__(self) -> None:
+        self.callbacks: "SimpleQueue[Callable[[], None]]" = SimpleQueue()
+        self.replies: "SimpleQueue[Tuple[str, bytes]]" = SimpleQueue()
+        self.published: List[str] = []
+        self.fake_channel = FakeChannel(self)
+        self.lost = False
+
+    def channel(self) -> FakeChannel:
+        return self.fake_channel
+
+    def add_callback_threadsafe(self, callback: Callable[[], None]) -> None:
+        self.callbacks.put(callback)
+
+    def process_data_events(self, time_limit: Any = None) -> None:
+        if self.lost:
+            raise StreamLostError("lost")
+        try:
+            self.callbacks.get(timeout=0.01)()
+        except Empty:
+            pass
+        while not self.replies.empty():
+            correlation_id, body = self.replies.get()
+            assert self.fake_channel.on_reply is not None
+            self.fake_channel.on_reply(
+                self.fake_channel, None, FakeProperties(correlation_id), body
+            )
+
+    def close(self) -> None:
+        self.is_open = False
+
+
+def test_concurrent_calls_share_one_connection() -> None:
+    connections: List[FakeConnection] = []
+
+    def connect() -> Any:
+        connections.append(FakeConnection())
+        return connections[-1]
+
+    rpc_channel = RMQRPCChannel(connect)
+    try:
+        with ThreadPoolExecutor(8) as executor:
+            bodies = [str(i).encode() for i in range(50)]
+            futures = list(
+                executor.map(lambda body: rpc_channel.call("echo", body), bodies)
+            )
+            assert [future.result(5) for future in futures] == bodies
+    finally:
+        rpc_channel.close()
+
+    assert len(connections) == 1
+    assert len(connections[0].published) == 50
+
+
+def test_calls_fail_when_the_connection_is_lost() -> None:
+    connection = FakeConnection()
+    rpc_channel = RMQRPCChannel(lambda: connection, reconnect_delay=60)  # type: ignore
+
+    try:
+        future = rpc_channel.call("black_hole", b"")
+        connection.lost = True
+        with pytest.raises(RPCConnectionError):
+            future.result(5)
+    finally:
+        rpc_channel.close()
+
+    with pytest.raises(RPCConnectionError):
+        rpc_channel.call("echo", b"")
+
+
+def call_once_reconnected(rpc_channel: RMQRPCChannel, body: bytes) -> bytes:
+    # calls fail fast until the channel has reconnected
+    for _ in range(100):
+        try:
+            return rpc_channel.call("echo", body, timeout=5).result(5)
+        except RPCConnectionError:
+            sleep(0.01)
+    raise AssertionError("RPC channel did not reconnect")
+
+
+def test_channel_reconnects_after_unexpected_errors() -> None:
+    connections: List[FakeConnection] = []
+
+    def connect() -> Any:
+        connections.append(FakeConnection())
+        return connections[-1]
+
+    rpc_channel = RMQRPCChannel(connect, reconnect_delay=0)
+    try:
+        future = rpc_channel.call("black_hole", b"")
+
+        def fail(time_limit: Any = None) -> None:
+            raise RuntimeError("unexpected")
+
+        connections[0].process_data_events = fail  # type: ignore
+        with pytest.raises(RPCConnectionError):
+            future.result(5)
+
+        assert call_once_reconnected(rpc_channel, b"1") == b"1"
+    finally:
+        rpc_channel.close()
+
+    assert len(connections) == 2
+
+
+def test_call_fails_when_the_channel_has_stopped() -> None:
+    rpc_channel = RMQRPCChannel(FakeConnection)  # type: ignore
+    rpc_channel.start()
+    rpc_channel.closed.set()
+    assert rpc_channel.thread is not None
+    rpc_channel.thread.join(5)
+    rpc_channel.closed.clear()
+
+    with pytest.raises(RPCConnectionError):
+        rpc_channel.call("echo", b"", timeout=5)
+
+
+def test_call_fails_when_the_broker_cannot_be_reached() -> None:
+    def connect() -> Any:
+        raise AMQPConnectionError("unreachable")
+
+    rpc_channel = RMQRPCChannel(connect, reconnect_delay=60)
+    try:
+        with pytest.raises(RPCConnectionError) as e:
+            rpc_channel.call("echo", b"")
+        assert isinstance(e.value.__cause__, AMQPConnectionError)
+    finally:
+        rpc_channel.close()
+
+
+def test_channel_reconnects_after_the_broker_closes_it() -> None:
+    connections: List[FakeConnection] = []
+
+    def connect() -> Any:
+        connections.append(FakeConnection())
+        return connections[-1]
+
+    rpc_channel = RMQRPCChannel(connect, reconnect_delay=0)
+    try:
+        future = rpc_channel.call("missing", b"")
+        with pytest.raises(RPCConnectionError):
+            future.result(5)
+
+        assert call_once_reconnected(rpc_channel, b"1") == b"1"
+    finally:
+        rpc_channel.close()
+
+    assert len(connections) == 2
+
+
+@dataclass
+class Pong(Message):
+    @classmethod
+    def message_type(cls) -> str:
+        return "pong"
+
+
+@dataclass
+class Ping(RPC[None, Pong]):
+    def get_input(self) -> None:
+        return None
+
+    @classmethod
+    def message_type(cls) -> str:
+        return "black_hole"
+
+
+class FakeConnectionFactory:
+    def __init__(self) -> None:
+        self.connection = FakeConnection()
+
+    def get_connection(self) -> Any:
+        return self.connection
+
+
+def test_submit_times_out_without_a_reply() -> None:
+    message_map = MessageMap()
+    message_map.register_messages(Pong)
+    client = RMQRPCClient(
+        "caller",
+        FakeConnectionFactory(),  # type: ignore
+        create_json_kit_encoder("utf-8"),
+        create_json_kit_decoder(message_map, "utf-8"),
+        default_timeout=5,
+    )
+
+    try:
+        with pytest.raises(RPCTimeoutError):
+            client.submit(Ping(), timeout=0.05)
+        assert client.rpc_channel.pending == {}
+    finally:
+        client.close()
+
+
+@dataclass
+class Echo(RPC[None, "Echo"]):
+    value: int
+
+    def get_input(self) -> None:
+        return None
+
+    @classmethod
+    def message_type(cls) -> str:
+        return "echo"
+
+
+@dataclass
+class Fail(RPC[None, Pong]):
+    def get_input(self) -> None:
+        return None
+
+    @classmethod
+    def message_type(cls) -> str:
+        return "fail"
+
+
+def test_submit_many_returns_results_and_errors_in_order() -> None:
+    message_map = MessageMap()
+    message_map.register_messages(Echo, RPCServerErrorResponse)
+    connection_factory = FakeConnectionFactory()
+    client = RMQRPCClient(
+        "caller",
+        connection_factory,  # type: ignore
+        create_json_kit_encoder("utf-8"),
+        create_json_kit_decoder(message_map, "utf-8"),
+    )
+
+    try:
+        results = client.submit_many([Echo(1), Fail(), Ping(), Echo(2)], timeout=0.2)
+    finally:
+        client.close()
+
+    assert results[0] == Echo(1)
+    assert isinstance(results[1], RPCServerError)
+    assert results[1].error_response.message == "failed"
+    assert isinstance(results[2], RPCTimeoutError)
+    assert results[3] == Echo(2)
+    assert connection_factory.connection.published == [
+        "echo",
+        "fail",
+        "black_hole",
+        "echo",
+    ]
+
+
+def test_submit_many_returns_errors_of_requests_that_were_not_sent() -> None:
+    message_map = MessageMap()
+    message_map.register_messages(Echo)
+    client = RMQRPCClient(
+        "caller",
+        FakeConnectionFactory(),  # type: ignore
+        create_json_kit_encoder("utf-8"),
+        create_json_kit_decoder(message_map, "utf-8"),
+    )
+    call = client.rpc_channel.call
+
+    def call_or_fail(exchange: str, body: bytes, timeout: Any = None) -> Any:
+        if exchange == "black_hole":
+            raise RPCConnectionError("not sent")
+        return call(exchange, body, timeout)
+
+    client.rpc_channel.call = call_or_fail  # type: ignore
+
+    try:
+        results = client.submit_many([Echo(1), Ping(), Echo(2)], timeout=5)
+        assert client.rpc_channel.pending == {}
+    finally:
+        client.close()
+
+    assert results[0] == Echo(1)
+    assert isinstance(results[1], RPCConnectionError)
+    assert results[2] == Echo(2)
+
+
+def test_submit_many_discards_pending_calls_when_interrupted() -> None:
+    client = RMQRPCClient(
+        "caller",
+        FakeConnectionFactory(),  # type: ignore
+        create_json_kit_encoder("utf-8"),
+        create_json_kit_decoder(MessageMap(), "utf-8"),
+    )
+
+    def interrupt(*args: Any) -> Any:
+        raise KeyboardInterrupt()
+
+    client.wait_response = interrupt  # type: ignore
+
+    try:
+        with pytest.raises(KeyboardInterrupt):
+            client.submit_many([Ping(), Ping()], timeout=5)
+        assert client.rpc_channel.pending == {}
+    finally:
+        client.close()
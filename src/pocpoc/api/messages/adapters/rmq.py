@@ -1,19 +1,183 @@
+import logging
+from contextlib import contextmanager
+from threading import BoundedSemaphore, Lock
+from typing import (
+    Callable,
+    ContextManager,
+    Dict,
+    Generator,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+
 from pika import BlockingConnection, PlainCredentials, ConnectionParameters
+from pika.adapters.blocking_connection import BlockingChannel
+from pika.exceptions import AMQPError
+
+T = TypeVar("T")
+
+logger = logging.getLogger(__name__)
+
+
+class RMQChannelPool:
+    """
+    Long-lived connections with one channel each. pika connections are not
+    thread-safe, so a connection is only used by the thread that acquired it.
+
+    Connections are checked when acquired and replaced when they are closed
+    or fail while in use. Transactional channels are opened on a connection
+    the first time they are asked for and kept with it.
+    """
+
+    def __init__(
+        self,
+        connection_factory: Callable[[], BlockingConnection],
+        max_size: int = 4,
+        acquire_timeout: Optional[float] = None,
+    ) -> None:
+        self.connection_factory = connection_factory
+        self.acquire_timeout = acquire_timeout
+        self.slots = BoundedSemaphore(max_size)
+        self.lock = Lock()
+        self.idle: List[Tuple[BlockingConnection, BlockingChannel]] = []
+        self.tx_channels: Dict[BlockingConnection, BlockingChannel] = {}
+
+    def _is_healthy(
+        self, connection: BlockingConnection, channel: BlockingChannel
+    ) -> bool:
+        if not connection.is_open or not channel.is_open:
+            return False
+        try:
+            # services heartbeats missed while the connection was idle
+            connection.process_data_events(time_limit=0)
+        except AMQPError:
+            logger.warning("Discarding broken pooled rabbitmq connection")
+            return False
+        return channel.is_open
+
+    def _discard(self, connection: BlockingConnection) -> None:
+        with self.lock:
+            self.tx_channels.pop(connection, None)
+        try:
+            if connection.is_open:
+                connection.close()
+        except AMQPError:
+            logger.debug("Error closing pooled rabbitmq connection", exc_info=True)
+
+    def _take(self) -> Tuple[BlockingConnection, BlockingChannel]:
+        while True:
+            with self.lock:
+                if not self.idle:
+                    break
+                connection, channel = self.idle.pop()
+
+            if self._is_healthy(connection, channel):
+                return connection, channel
+            self._discard(connection)
+
+        connection = self.connection_factory()
+        return connection, connection.channel()
+
+    def _tx_channel(self, connection: BlockingConnection) -> BlockingChannel:
+        with self.lock:
+            channel = self.tx_channels.get(connection)
+        if channel is not None and channel.is_open:
+            return channel
+
+        channel = connection.channel()
+        channel.tx_select()
+        with self.lock:
+            self.tx_channels[connection] = channel
+        return channel
+
+    @contextmanager
+    def acquire(
+        self, transactional: bool = False
+    ) -> Generator[BlockingChannel, None, None]:
+        """
+        With `transactional`, yields a channel of the pooled connection that
+        is already in transaction mode.
+        """
+        if not self.slots.acquire(timeout=self.acquire_timeout):
+            raise TimeoutError("Timed out waiting for a pooled rabbitmq channel")
+
+        try:
+            connection, channel = self._take()
+            broken = False
+            try:
+                yield self._tx_channel(connection) if transactional else channel
+            except AMQPError:
+                broken = True
+                raise
+            finally:
+                if broken:
+                    self._discard(connection)
+                else:
+                    with self.lock:
+                        self.idle.append((connection, channel))
+        finally:
+            self.slots.release()
+
+    def run(
+        self,
+        action: Callable[[BlockingChannel], T],
+        retries: int = 1,
+        transactional: bool = False,
+    ) -> T:
+        """
+        Runs `action` with a pooled channel, retrying on a fresh connection
+        when the connection or channel fails. A retried publish may be
+        delivered twice.
+        """
+        while True:
+            try:
+                with self.acquire(transactional) as channel:
+                    return action(channel)
+            except AMQPError:
+                if retries <= 0:
+                    raise
+                retries -= 1
+                logger.warning("Retrying on a new rabbitmq connection", exc_info=True)
+
+    def close(self) -> None:
+        with self.lock:
+            idle, self.idle = self.idle, []
+            self.tx_channels.clear()
+
+        for connection, _ in idle:
+            self._discard(connection)
 
 
 class RMQConnectionFactory:
-    def __init__(self, host: str, port: int, username: str, password: str):
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        username: str,
+        password: str,
+        pool_size: int = 4,
+    ):
         self.host = host
         self.port = port
         self.username = username
         self.password = password
+        self.channel_pool = RMQChannelPool(self.get_connection, pool_size)
 
-    def get_connection(self) -> BlockingConnection:
-        return BlockingConnection(
-            ConnectionParameters(
-                credentials=PlainCredentials(self.username, self.password),
-                host=self.host,
-                port=self.port,
-                heartbeat=120,
-            ),
+    def get_connection_parameters(self) -> ConnectionParameters:
+        return ConnectionParameters(
+            credentials=PlainCredentials(self.username, self.password),
+            host=self.host,
+            port=self.port,
+            heartbeat=120,
         )
+
+    def get_connection(self) -> BlockingConnection:
+        return BlockingConnection(self.get_connection_parameters())
+
+    def acquire_channel(self) -> ContextManager[BlockingChannel]:
+        return self.channel_pool.acquire()
+
+    def close(self) -> None:
+        self.channel_pool.close()
@@ -0,0 +1,113 @@
+from threading import Thread
+from typing import Any, List
+
+import pytest
+from pika.exceptions import AMQPConnectionError, StreamLostError
+
+from pocpoc.api.messages.adapters.rmq import RMQChannelPool
+
+
+class FakeChannel:
+    is_open = True
+
+
+class FakeConnection:
+    def __init__(self) -> None:
+        self.is_open = True
+        self.fail_next_poll = False
+        self.published: List[str] = []
+
+    def channel(self) -> FakeChannel:
+        return FakeChannel()
+
+    def process_data_events(self, time_limit: Any = None) -> None:
+        if self.fail_next_poll:
+            raise StreamLostError("lost")
+
+    def close(self) -> None:
+        self.is_open = False
+
+
+class FakeConnectionFactory:
+    def __init__(self) -> None:
+        self.connections: List[FakeConnection] = []
+
+    def __call__(self) -> Any:
+        connection = FakeConnection()
+        self.connections.append(connection)
+        return connection
+
+
+def test_pool_reuses_connections() -> None:
+    factory = FakeConnectionFactory()
+    pool = RMQChannelPool(factory)
+
+    with pool.acquire() as first:
+        pass
+    with pool.acquire() as second:
+        pass
+
+    assert first is second
+    assert len(factory.connections) == 1
+
+
+def test_pool_replaces_unhealthy_connections() -> None:
+    factory = FakeConnectionFactory()
+    pool = RMQChannelPool(factory)
+
+    with pool.acquire():
+        pass
+    factory.connections[0].fail_next_poll = True
+
+    with pool.acquire():
+        pass
+
+    assert len(factory.connections) == 2
+    assert not factory.connections[0].is_open
+
+
+def test_pool_run_retries_on_a_new_connection() -> None:
+    factory = FakeConnectionFactory()
+    pool = RMQChannelPool(factory)
+    attempts: List[Any] = []
+
+    def publish(channel: Any) -> str:
+        attempts.append(channel)
+        if len(attempts) == 1:
+            raise AMQPConnectionError("closed")
+        return "published"
+
+    assert pool.run(publish) == "published"
+    assert attempts[0] is not attempts[1]
+    assert not factory.connections[0].is_open
+
+
+def test_pool_run_gives_up_after_retries() -> None:
+    pool = RMQChannelPool(FakeConnectionFactory())
+
+    def publish(channel: Any) -> None:
+        raise AMQPConnectionError("closed")
+
+    with pytest.raises(AMQPConnectionError):
+        pool.run(publish, retries=2)
+
+
+def test_pool_limits_concurrent_connections() -> None:
+    factory = FakeConnectionFactory()
+    pool = RMQChannelPool(factory, max_size=2)
+
+    def use_channel() -> None:
+        for _ in range(50):
+            with pool.acquire():
+                pass
+
+    threads = [Thread(target=use_channel) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(factory.connections) <= 2
+
+    pool.close()
+    assert not any(connection.is_open for connection in factory.connections)
@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import Generic, Tuple, TypeVar
+from typing import Callable, Generic, Optional, Tuple, TypeVar
 
 from pocpoc.api.messages.message import Message, MessageMetadata
 
@@ -36,7 +36,42 @@ class MessageKitEncoder(ABC, Generic[T]):
         raise NotImplementedError()
 
 
+class MessageEnvelope:
+    """
+    Decoded metadata and a message that is decoded on first access.
+    """
+
+    def __init__(
+        self,
+        metadata: MessageMetadata,
+        decode_message: Callable[[MessageMetadata], Message],
+    ) -> None:
+        self.metadata = metadata
+        self.decode_message = decode_message
+        self._message: Optional[Message] = None
+
+    @classmethod
+    def decoded(cls, metadata: MessageMetadata, message: Message) -> "MessageEnvelope":
+        envelope = cls(metadata, lambda metadata: message)
+        envelope._message = message
+        return envelope
+
+    @property
+    def is_decoded(self) -> bool:
+        return self._message is not None
+
+    @property
+    def message(self) -> Message:
+        if self._message is None:
+            self._message = self.decode_message(self.metadata)
+        return self._message
+
+
 class MessageKitDecoder(ABC, Generic[T]):
     @abstractmethod
     def decode(self, payload: T) -> Tuple[MessageMetadata, Message]:
         raise NotImplementedError()
+
+    def decode_envelope(self, payload: T) -> MessageEnvelope:
+        message_metadata, message = self.decode(payload)
+        return MessageEnvelope.decoded(message_metadata, message)
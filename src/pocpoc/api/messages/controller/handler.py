@@ -1,6 +1,12 @@
 import logging
+from typing import Any, Callable, Dict, List, Sequence, Tuple, Type, TypeVar
 
 from pocpoc.api.di.class_initializer import ClassInitializer
+from pocpoc.api.di.lifetime import resolve_factory
+from pocpoc.api.messages.controller.message_controller import (
+    BatchMessageController,
+    MessageController,
+)
 from pocpoc.api.messages.controller.message_map import MessageControllerMap
 from pocpoc.api.messages.handler import (
     MessageHandler,
@@ -10,6 +16,11 @@ from pocpoc.api.messages.message import Message, MessageMetadata
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
+# controller classes of each message type with the factories of their instances
+ResolvedControllers = Dict[str, List[Tuple[Type[T], Callable[[], T]]]]
+
 
 class MessageControllerHandler(MessageHandler):
     def __init__(
@@ -17,38 +28,87 @@ class MessageControllerHandler(MessageHandler):
         message_controller_map: MessageControllerMap,
         class_initializer: ClassInitializer,
     ) -> None:
+        """
+        Controllers are resolved once here, according to their lifetime.
+        """
         self.message_controller_map = message_controller_map
         self.class_initializer = class_initializer
 
+        self.controllers: ResolvedControllers[MessageController[Any]] = {
+            message_type: [
+                (cls, resolve_factory(class_initializer, cls)) for cls in controllers
+            ]
+            for message_type, controllers in message_controller_map.message_controllers_by_type_name.items()
+        }
+        self.batch_controllers: ResolvedControllers[BatchMessageController[Any]] = {
+            message_type: [
+                (cls, resolve_factory(class_initializer, cls)) for cls in controllers
+            ]
+            for message_type, controllers in message_controller_map.batch_controllers_by_type_name.items()
+        }
+
     def handle_message(
         self, message_metadata: MessageMetadata, message: Message
     ) -> None:
-        handlers_class = self.message_controller_map.get_controllers(
-            message.message_type()
-        )
+        self.handle_batch([(message_metadata, message)])
 
-        if handlers_class is None:
+    def handle_batch(self, batch: Sequence[Tuple[MessageMetadata, Message]]) -> None:
+        """
+        Handles messages of one type, calling each batch controller once for
+        the whole batch and the other controllers once per message.
+        """
+        message_metadata, message = batch[0]
+        handlers = self.controllers.get(message.message_type())
+        batch_handlers = self.batch_controllers.get(message.message_type())
+
+        if handlers is None and batch_handlers is None:
             raise UnHandlableMessageException(message_metadata, message, "No handlers")
 
-        for cls in handlers_class:
+        messages: List[Message] = [message for _, message in batch]
+        for batch_cls, batch_factory in batch_handlers or []:
             try:
-                handler = self.class_initializer.get_instance(cls)
+                batch_handler = batch_factory()
             except Exception as e:
                 logger.error(
-                    "Error instantiating handler %s for message %s",
-                    cls,
-                    message_metadata,
+                    "Error instantiating handler %s for %s messages %s",
+                    batch_cls,
+                    len(batch),
+                    message.message_type(),
                 )
                 logger.exception(e)
                 continue
 
             try:
-                handler.execute(message)
+                batch_handler.execute_batch(messages)
             except Exception as e:
                 logger.critical(
-                    "Error handling message %s with handler %s",
-                    message_metadata,
-                    "{}.{}".format(cls.__module__, cls.__name__),
+                    "Error handling %s messages %s with handler %s",
+                    len(batch),
+                    message.message_type(),
+                    "{}.{}".format(batch_cls.__module__, batch_cls.__name__),
                     exc_info=e,
                 )
-                logger.exception(e)
+
+        for message_metadata, message in batch:
+            for cls, factory in handlers or []:
+                try:
+                    handler = factory()
+                except Exception as e:
+                    logger.error(
+                        "Error instantiating handler %s for message %s",
+                        cls,
+                        message_metadata,
+                    )
+                    logger.exception(e)
+                    continue
+
+                try:
+                    handler.execute(message)
+                except Exception as e:
+                    logger.critical(
+                        "Error handling message %s with handler %s",
+                        message_metadata,
+                        "{}.{}".format(cls.__module__, cls.__name__),
+                        exc_info=e,
+                    )
+                    logger.exception(e)
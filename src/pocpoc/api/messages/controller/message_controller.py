@@ -1,12 +1,36 @@
 from abc import ABC, abstractmethod
-from typing import Generic, TypeVar
+from typing import Generic, List, NamedTuple, TypeVar
 
+from pocpoc.api.di.lifetime import Lifetime
 from pocpoc.api.messages.message import Message
 
 MessageT = TypeVar("MessageT", bound=Message)
 
 
 class MessageController(ABC, Generic[MessageT]):
+    lifetime = Lifetime.SINGLETON
+
     @abstractmethod
     def execute(self, message: MessageT) -> None:
         raise NotImplementedError()
+
+
+class BatchLimits(NamedTuple):
+    max_size: int
+    max_wait_ms: int
+
+
+class BatchMessageController(ABC, Generic[MessageT]):
+    """
+    Receives messages of its type in batches of up to `max_batch_size`
+    messages, or fewer when `max_batch_wait_ms` passed since the first one
+    arrived.
+    """
+
+    lifetime = Lifetime.SINGLETON
+    max_batch_size = 100
+    max_batch_wait_ms = 100
+
+    @abstractmethod
+    def execute_batch(self, messages: List[MessageT]) -> None:
+        raise NotImplementedError()
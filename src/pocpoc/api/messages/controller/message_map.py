@@ -1,7 +1,21 @@
 import logging
-from typing import Callable, Dict, Iterable, List, Optional, Type, TypeVar, cast
+from typing import (
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Type,
+    TypeVar,
+    Union,
+    cast,
+)
 
-from pocpoc.api.messages.controller.message_controller import MessageController
+from pocpoc.api.messages.controller.message_controller import (
+    BatchLimits,
+    BatchMessageController,
+    MessageController,
+)
 from pocpoc.api.messages.map import MessageMap
 from pocpoc.api.messages.message import Message
 
@@ -20,30 +34,82 @@ class MessageControllerMap(MessageMap):
         self.message_controllers_by_type_name: Dict[
             str, List[Type[MessageController[Message]]]
         ] = {}
+        self.batch_controllers_by_type_name: Dict[
+            str, List[Type[BatchMessageController[Message]]]
+        ] = {}
         self.hooks: Dict[Type[Message], List[Callable[[Message], None]]] = {}
 
     def register(
         self,
         message_type: Type[MESSAGE_TYPE],
-        *handlers: Type[MessageController[MESSAGE_TYPE]],
+        *handlers: Union[
+            Type[MessageController[MESSAGE_TYPE]],
+            Type[BatchMessageController[MESSAGE_TYPE]],
+        ],
     ) -> None:
         super().register_messages(message_type)
-        self.message_controller_map.setdefault(message_type, []).extend(handlers)  # type: ignore
+        self.message_type_by_name[message_type.message_type()] = message_type
+
+        batch_handlers = [
+            handler
+            for handler in handlers
+            if issubclass(handler, BatchMessageController)
+        ]
+        message_handlers = [
+            handler for handler in handlers if handler not in batch_handlers
+        ]
 
         logger.debug(
-            f"Registered message type {message_type.message_type()} with handlers {[handler.__module__ + '.' + handler.__name__ for handler in handlers]}"
+            "Registered message type %s with handlers %s",
+            message_type.message_type(),
+            [handler.__module__ + "." + handler.__name__ for handler in handlers],
         )
 
-        self.message_type_by_name[message_type.message_type()] = message_type
+        if batch_handlers:
+            self.batch_controllers_by_type_name.setdefault(
+                message_type.message_type(), []
+            ).extend(
+                cast(Iterable[Type[BatchMessageController[Message]]], batch_handlers)
+            )
+            if not message_handlers:
+                return
+
+        self.message_controller_map.setdefault(message_type, []).extend(message_handlers)  # type: ignore
         self.message_controllers_by_type_name.setdefault(
             message_type.message_type(), []
-        ).extend(cast(Iterable[Type[MessageController[Message]]], handlers))
+        ).extend(cast(Iterable[Type[MessageController[Message]]], message_handlers))
 
     def get_controllers(
         self, message_type: str
     ) -> Optional[List[Type[MessageController[Message]]]]:
         return self.message_controllers_by_type_name.get(message_type)
 
+    def get_batch_controllers(
+        self, message_type: str
+    ) -> Optional[List[Type[BatchMessageController[Message]]]]:
+        return self.batch_controllers_by_type_name.get(message_type)
+
+    def get_batch_limits(self, message_type: str) -> Optional[BatchLimits]:
+        """
+        The tightest limits of the batch controllers of `message_type`, or None
+        when it has none.
+        """
+        controllers = self.get_batch_controllers(message_type)
+        if controllers is None:
+            return None
+
+        return BatchLimits(
+            min(controller.max_batch_size for controller in controllers),
+            min(controller.max_batch_wait_ms for controller in controllers),
+        )
+
+    def has_handlers(self, message_type: str) -> bool:
+        return (
+            message_type in self.message_controllers_by_type_name
+            or message_type in self.batch_controllers_by_type_name
+            or any(hook_type.message_type() == message_type for hook_type in self.hooks)
+        )
+
     def get_message_type(self, message_type_name: str) -> Optional[Type[Message]]:
         return (
             self.message_type_by_name[message_type_name]
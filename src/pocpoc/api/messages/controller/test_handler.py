@@ -0,0 +1,122 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, List, Type
+
+from pocpoc.api.di.class_initializer import ClassInitializer
+from pocpoc.api.di.lifetime import Lifetime
+from pocpoc.api.messages.controller.handler import MessageControllerHandler
+from pocpoc.api.messages.controller.message_controller import (
+    BatchLimits,
+    BatchMessageController,
+    MessageController,
+)
+from pocpoc.api.messages.controller.message_map import MessageControllerMap
+from pocpoc.api.messages.message import Message, MessageMetadata
+
+
+@dataclass
+class Visited(Message):
+    page: str
+
+    @classmethod
+    def message_type(cls) -> str:
+        return "visited"
+
+
+batches: List[List[Visited]] = []
+executed: List[Visited] = []
+
+
+class VisitsProjection(BatchMessageController[Visited]):
+    max_batch_size = 50
+
+    def execute_batch(self, messages: List[Visited]) -> None:
+        batches.append(messages)
+
+
+class VisitLogger(MessageController[Visited]):
+    def execute(self, message: Visited) -> None:
+        executed.append(message)
+
+
+class Initializer(ClassInitializer):
+    def get_instance(self, type_: Type[Any]) -> Any:
+        return type_()
+
+
+def create_handler() -> MessageControllerHandler:
+    batches.clear()
+    executed.clear()
+    message_controller_map = MessageControllerMap()
+    message_controller_map.register(Visited, VisitsProjection, VisitLogger)
+    return MessageControllerHandler(message_controller_map, Initializer())
+
+
+def get_metadata() -> MessageMetadata:
+    return MessageMetadata("visited", datetime(2020, 1, 1), None)
+
+
+def test_batch_controllers_are_registered_apart() -> None:
+    message_controller_map = create_handler().message_controller_map
+
+    assert message_controller_map.get_controllers("visited") == [VisitLogger]
+    assert message_controller_map.get_batch_controllers("visited") == [VisitsProjection]
+    assert message_controller_map.get_batch_limits("visited") == BatchLimits(50, 100)
+    assert message_controller_map.get_batch_limits("other") is None
+    assert message_controller_map.has_handlers("visited")
+
+
+def test_handle_batch_executes_batch_controllers_once() -> None:
+    handler = create_handler()
+    messages = [Visited("a"), Visited("b"), Visited("c")]
+
+    handler.handle_batch([(get_metadata(), message) for message in messages])
+
+    assert batches == [messages]
+    assert executed == messages
+
+
+def test_handle_message_executes_a_batch_of_one() -> None:
+    handler = create_handler()
+
+    handler.handle_message(get_metadata(), Visited("a"))
+
+    assert batches == [[Visited("a")]]
+    assert executed == [Visited("a")]
+
+
+class CountingInitializer(ClassInitializer):
+    def __init__(self) -> None:
+        self.created: List[Type[Any]] = []
+
+    def get_instance(self, type_: Type[Any]) -> Any:
+        self.created.append(type_)
+        return type_()
+
+
+class RequestScopedVisitLogger(MessageController[Visited]):
+    lifetime = Lifetime.PER_MESSAGE
+    instances: List["RequestScopedVisitLogger"] = []
+
+    def execute(self, message: Visited) -> None:
+        self.instances.append(self)
+
+
+def test_controllers_are_resolved_by_lifetime() -> None:
+    message_controller_map = MessageControllerMap()
+    message_controller_map.register(
+        Visited, VisitsProjection, VisitLogger, RequestScopedVisitLogger
+    )
+    initializer = CountingInitializer()
+
+    handler = MessageControllerHandler(message_controller_map, initializer)
+    assert initializer.created == [VisitLogger, VisitsProjection]
+
+    for page in "abc":
+        handler.handle_message(get_metadata(), Visited(page))
+
+    assert (
+        initializer.created
+        == [VisitLogger, VisitsProjection] + [RequestScopedVisitLogger] * 3
+    )
+    assert len(set(map(id, RequestScopedVisitLogger.instances))) == 3
@@ -1,4 +1,5 @@
 from abc import ABC
+from typing import Sequence
 
 from pocpoc.api.messages.message import Message
 
@@ -7,3 +8,19 @@ class MessageDispatcher(ABC):
     # @abstractmethod
     def dispatch(self, message: Message) -> None:
         raise NotImplementedError()
+
+
+class BatchMessageDispatcher(MessageDispatcher):
+    """
+    A dispatcher that can send several messages at once, in order.
+    """
+
+    # @abstractmethod
+    def dispatch_batch(self, messages: Sequence[Message]) -> None:
+        raise NotImplementedError()
+
+
+class AsyncMessageDispatcher(ABC):
+    # @abstractmethod
+    async def dispatch(self, message: Message) -> None:
+        raise NotImplementedError()
@@ -1,10 +1,12 @@
 from abc import ABC, ABCMeta, abstractclassmethod, abstractmethod
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Optional
+from typing import Callable, Hashable, Optional
+from uuid import uuid4
 
 from pocpoc.api.context_tracker.context_track_manager import (
     ContextTracker,
+    get_current_context,
 )
 
 
@@ -16,9 +18,51 @@ class Message(ABC):
             "message_type() not implemented for class {}".format(cls.__name__)
         )
 
+    def partition_key(self) -> Optional[Hashable]:
+        """
+        Messages with the same key are handled in order, one at a time, by
+        consumers with a worker pool. None means no ordering.
+        """
+        return None
+
 
 @dataclass
 class MessageMetadata:
     message_type: str
     sent_at: datetime
     tracked_context: Optional[ContextTracker]
+    # after this moment nobody is waiting for the message to be handled
+    deadline: Optional[datetime] = None
+
+
+PartitionKeyFunction = Callable[[MessageMetadata, Message], Optional[Hashable]]
+
+
+def get_partition_key(
+    message_metadata: MessageMetadata, message: Message
+) -> Optional[Hashable]:
+    return message.partition_key()
+
+
+def create_message_metadata(
+    message_type: str, service_name: str, deadline: Optional[datetime] = None
+) -> MessageMetadata:
+    """
+    Metadata for a message sent from the current context, or from a new root
+    context of `service_name` when there is none.
+    """
+    current_context = get_current_context() or ContextTracker(
+        global_context_id=str(uuid4()),
+        parent_context_id=None,
+        global_started=datetime.utcnow(),
+        local_context_id=str(uuid4()),
+        local_started=datetime.utcnow(),
+        service_name=service_name,
+    )
+
+    return MessageMetadata(
+        message_type=message_type,
+        sent_at=datetime.utcnow(),
+        tracked_context=current_context,
+        deadline=deadline,
+    )
@@ -1,8 +1,10 @@
 import typing
 from abc import ABC, abstractmethod
-from typing import Generic
+from typing import Any, Generic, List, Optional, Sequence, Union
 
+from pocpoc.api.di.lifetime import Lifetime
 from pocpoc.api.messages.message import Message
+from pocpoc.api.messages.rpc.errors import RPCServerError, RPCTimeoutError
 
 
 RPCInput = typing.TypeVar("RPCInput")
@@ -21,11 +23,43 @@ class RPC(RPCBase[RPCInput, RPCOutput], Message):
 
 class RPCClient(ABC):
     # @abstractmethod
-    def submit(self, rpc: RPC[RPCInput, RPCOutput]) -> RPCOutput:
+    def submit(
+        self, rpc: RPC[RPCInput, RPCOutput], timeout: Optional[float] = None
+    ) -> RPCOutput:
+        """
+        Raises RPCTimeoutError when no reply arrives within `timeout` seconds,
+        or the client's default timeout when it is None.
+        """
+        raise NotImplementedError()
+
+    def submit_many(
+        self, rpcs: Sequence[RPC[Any, Any]], timeout: Optional[float] = None
+    ) -> List[Union[Message, Exception]]:
+        """
+        Returns the results in the order of `rpcs`. The RPCServerError or
+        RPCTimeoutError of a single call is returned in its place instead of
+        raised.
+        """
+        results: List[Union[Message, Exception]] = []
+        for rpc in rpcs:
+            try:
+                results.append(self.submit(rpc, timeout))
+            except (RPCServerError, RPCTimeoutError) as e:
+                results.append(e)
+        return results
+
+
+class AsyncRPCClient(ABC):
+    # @abstractmethod
+    async def submit(
+        self, rpc: RPC[RPCInput, RPCOutput], timeout: Optional[float] = None
+    ) -> RPCOutput:
         raise NotImplementedError()
 
 
 class RPCController(ABC, Generic[RPCInput, RPCOutput]):
+    lifetime = Lifetime.SINGLETON
+
     @abstractmethod
     def execute(self, request: RPCInput) -> RPCOutput:
         raise NotImplementedError()
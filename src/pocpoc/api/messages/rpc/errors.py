@@ -15,3 +15,7 @@ class RPCServerErrorResponse(Message):
 class RPCServerError(Exception):
     def __init__(self, error_response: RPCServerErrorResponse) -> None:
         self.error_response = error_response
+
+
+class RPCTimeoutError(TimeoutError):
+    pass
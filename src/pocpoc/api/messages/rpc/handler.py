@@ -1,14 +1,17 @@
 import logging
 from abc import abstractmethod
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Tuple, Type
 
 from pocpoc.api.messages.handler import (
     MessageHandler,
     UnHandlableMessageException,
 )
 from pocpoc.api.messages.message import Message, MessageMetadata
-from pocpoc.api.messages.rpc import RPC
+from pocpoc.api.messages.rpc import RPC, RPCController
 from pocpoc.api.messages.rpc.errors import RPCServerErrorResponse
 from pocpoc.api.di.class_initializer import ClassInitializer
+from pocpoc.api.di.lifetime import resolve_factory
 from pocpoc.api.messages.rpc.map import RPCMap
 
 logger = logging.getLogger(__name__)
@@ -22,29 +25,45 @@ class RPCMessageHandler(MessageHandler):
         class_initializer: ClassInitializer,
         # rpc_from_message_data: Callable[[MessageMetadata], Optional[RPC[Any, Any]]],
     ) -> None:
+        """
+        Controllers are resolved once here, according to their lifetime.
+        """
         self.rpc_controller_map = rpc_controller_map
         self.class_initializer = class_initializer
 
+        self.controllers: Dict[
+            str,
+            Tuple[Type[RPCController[Any, Any]], Callable[[], RPCController[Any, Any]]],
+        ] = {
+            rpc_type: (cls, resolve_factory(class_initializer, cls))
+            for rpc_type, cls in rpc_controller_map.rpc_controller_map_by_name.items()
+        }
+
     def handle_message(self, message_data: MessageMetadata, message: Message) -> None:
         if not isinstance(message, RPC):
             raise UnHandlableMessageException(message_data, message, "Not an RPC")
 
         rpc_from_message = message
 
+        if message_data.deadline is not None and message_data.deadline < datetime.now(
+            timezone.utc
+        ):
+            logger.warning("Skipping rpc %s past its deadline", message_data)
+            return
+
         if rpc_from_message is None:
             logger.warning("No rpc for message %s", message_data)
             return
 
-        rpc_controller_class = self.rpc_controller_map.get_controller_by_name(
-            rpc_from_message.message_type()
-        )
+        resolved = self.controllers.get(rpc_from_message.message_type())
 
-        if rpc_controller_class is None:
+        if resolved is None:
             logger.warning("No rpc controller for rpc %s", message_data)
             return
 
+        rpc_controller_class, rpc_controller_factory = resolved
         try:
-            rpc_controller = self.class_initializer.get_instance(rpc_controller_class)
+            rpc_controller = rpc_controller_factory()
         except Exception as e:
             logger.error(
                 "Error instantiating rpc controller %s for rpc %s",
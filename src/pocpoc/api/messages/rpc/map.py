@@ -30,13 +30,19 @@ class RPCMap(MessageMap):
 
         if rpc_type in self.rpc_controller_map:
             logger.warning(
-                f"RPC type {rpc_type} already registered, replacing with {handler.__module__}.{handler.__name__}"
+                "RPC type %s already registered, replacing with %s.%s",
+                rpc_type,
+                handler.__module__,
+                handler.__name__,
             )
 
         self.rpc_controller_map[rpc_type] = handler
 
         logger.debug(
-            f"Registered RPC type {rpc_type.message_type()} with handler {handler.__module__}.{handler.__name__}"
+            "Registered RPC type %s with handler %s.%s",
+            rpc_type.message_type(),
+            handler.__module__,
+            handler.__name__,
         )
 
         self.rpc_controller_map_by_name[rpc_type.message_type()] = handler
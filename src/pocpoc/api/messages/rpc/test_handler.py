@@ -0,0 +1,75 @@
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, List, Optional, Type
+
+from pocpoc.api.di.class_initializer import ClassInitializer
+from pocpoc.api.messages.message import Message, MessageMetadata
+from pocpoc.api.messages.rpc import RPC, RPCController
+from pocpoc.api.messages.rpc.handler import RPCMessageHandler
+from pocpoc.api.messages.rpc.map import RPCMap
+
+
+@dataclass
+class Sum(Message):
+    value: int
+
+    @classmethod
+    def message_type(cls) -> str:
+        return "sum"
+
+
+@dataclass
+class Add(RPC[List[int], Sum]):
+    numbers: List[int]
+
+    def get_input(self) -> List[int]:
+        return self.numbers
+
+    @classmethod
+    def message_type(cls) -> str:
+        return "add"
+
+
+class AddController(RPCController[List[int], Sum]):
+    def execute(self, request: List[int]) -> Sum:
+        return Sum(sum(request))
+
+
+class Initializer(ClassInitializer):
+    def get_instance(self, type_: Type[Any]) -> Any:
+        return type_()
+
+
+class RecordingRPCMessageHandler(RPCMessageHandler):
+    def __init__(self, rpc_map: RPCMap) -> None:
+        super().__init__(rpc_map, Initializer())
+        self.replies: List[Message] = []
+
+    def reply(self, result: Message) -> None:
+        self.replies.append(result)
+
+
+def handle(deadline: Optional[datetime]) -> List[Message]:
+    rpc_map = RPCMap()
+    rpc_map.register(Add, AddController)
+    handler = RecordingRPCMessageHandler(rpc_map)
+
+    handler.handle_message(
+        MessageMetadata(
+            message_type=Add.message_type(),
+            sent_at=datetime.now(timezone.utc),
+            tracked_context=None,
+            deadline=deadline,
+        ),
+        Add([1, 2]),
+    )
+    return handler.replies
+
+
+def test_handles_rpc_before_deadline() -> None:
+    assert handle(None) == [Sum(3)]
+    assert handle(datetime.now(timezone.utc) + timedelta(seconds=5)) == [Sum(3)]
+
+
+def test_skips_rpc_past_deadline() -> None:
+    assert handle(datetime.now(timezone.utc) - timedelta(seconds=1)) == []
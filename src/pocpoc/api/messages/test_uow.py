@@ -0,0 +1,58 @@
+from dataclasses import dataclass
+from typing import List, Sequence
+
+from pocpoc.api.messages.dispatcher import (
+    BatchMessageDispatcher,
+    MessageDispatcher,
+)
+from pocpoc.api.messages.message import Message
+from pocpoc.api.messages.uow import MessageDispatcherUnitOfWork
+
+
+@dataclass
+class Greeted(Message):
+    name: str
+
+    @classmethod
+    def message_type(cls) -> str:
+        return "greeted"
+
+
+class RecordingDispatcher(MessageDispatcher):
+    def __init__(self) -> None:
+        self.dispatched: List[Message] = []
+
+    def dispatch(self, message: Message) -> None:
+        self.dispatched.append(message)
+
+
+class RecordingBatchDispatcher(BatchMessageDispatcher):
+    def __init__(self) -> None:
+        self.batches: List[List[Message]] = []
+
+    def dispatch(self, message: Message) -> None:
+        raise AssertionError("commit should dispatch a batch")
+
+    def dispatch_batch(self, messages: Sequence[Message]) -> None:
+        self.batches.append(list(messages))
+
+
+def test_commit_dispatches_messages_one_by_one() -> None:
+    dispatcher = RecordingDispatcher()
+
+    with MessageDispatcherUnitOfWork(dispatcher) as uow:
+        uow.add_message(Greeted("a"))
+        uow.add_message(Greeted("b"))
+
+    assert dispatcher.dispatched == [Greeted("a"), Greeted("b")]
+
+
+def test_commit_dispatches_one_batch() -> None:
+    dispatcher = RecordingBatchDispatcher()
+
+    with MessageDispatcherUnitOfWork(dispatcher) as uow:
+        uow.add_message(Greeted("a"))
+        uow.add_message(Greeted("b"))
+        uow.commit()
+
+    assert dispatcher.batches == [[Greeted("a"), Greeted("b")]]
@@ -3,7 +3,10 @@ from optparse import Option
 from types import TracebackType
 from typing import List, Optional, Type
 from pocpoc import ClassInitializer
-from pocpoc.api.messages.dispatcher import MessageDispatcher
+from pocpoc.api.messages.dispatcher import (
+    BatchMessageDispatcher,
+    MessageDispatcher,
+)
 from pocpoc.api.messages.message import Message
 
 from pocpoc.api.unit_of_work import UnitOfWork, UnitOfWorkFactory
@@ -24,8 +27,12 @@ class MessageDispatcherUnitOfWork(UnitOfWork):
         self.staged_messages.append(message)
 
     def commit(self) -> None:
-        for message in self.staged_messages:
-            self.message_dispatcher.dispatch(message)
+        if isinstance(self.message_dispatcher, BatchMessageDispatcher):
+            if self.staged_messages:
+                self.message_dispatcher.dispatch_batch(self.staged_messages)
+        else:
+            for message in self.staged_messages:
+                self.message_dispatcher.dispatch(message)
 
         self.staged_messages = []
 
@@ -4,7 +4,7 @@ import logging
 import signal
 from contextlib import contextmanager
 from threading import Lock, Thread
-from typing import Any, Callable, Generator, List, Optional, Type
+from typing import Any, Callable, Generator, List, Optional, Type, Union
 
 
 from pocpoc.api.di import DependencyInjectionManger, ServiceT
@@ -13,6 +13,7 @@ from pocpoc.api.di.adapters.custom import (
 )
 from pocpoc.api.di.class_initializer import ClassInitializer
 from pocpoc.api.messages.controller.message_controller import (
+    BatchMessageController,
     MessageController,
     MessageT,
 )
@@ -122,7 +123,9 @@ class Container:
     def register_message_controller(
         self,
         message_type: Type[MessageT],
-        *controller_type: Type[MessageController[MessageT]]
+        *controller_type: Union[
+            Type[MessageController[MessageT]], Type[BatchMessageController[MessageT]]
+        ]
     ) -> "Container":
         self._message_controller_map.register(message_type, *controller_type)
         self._message_map.register_messages(message_type)
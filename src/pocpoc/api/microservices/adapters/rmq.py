@@ -1,11 +1,15 @@
 import logging
 import signal
 from contextlib import suppress
-from typing import Any, Optional
+from typing import Any, List, Optional, Tuple
 
 from pocpoc.api.context_tracker.context_track_manager import (
     init_new_context,
 )
+from pocpoc.api.messages.adapters.json.json_backend import (
+    JsonBackend,
+    get_json_backend,
+)
 from pocpoc.api.messages.adapters.json.json_kit_codec import (
     JsonMessageKitDecoder,
     JsonMessageKitEncoder,
@@ -18,6 +22,22 @@ from pocpoc.api.messages.adapters.json.json_message_metadata_codec import (
     JsonMessageMetadataDecoder,
     JsonMessageMetadataEncoder,
 )
+from pocpoc.api.messages.adapters.msgpack.msgpack_kit_codec import (
+    MsgpackMessageKitDecoder,
+    MsgpackMessageKitEncoder,
+)
+from pocpoc.api.messages.adapters.msgpack.msgpack_message_codec import (
+    MsgpackMessageDecoder,
+    MsgpackMessageEncoder,
+    MsgpackMessageMetadataDecoder,
+    MsgpackMessageMetadataEncoder,
+)
+from pocpoc.api.messages.adapters.msgpack.msgpack_serializer import (
+    MsgpackSerializer,
+)
+from pocpoc.api.messages.adapters.rabbitmq.rmq_confirm_publisher import (
+    RMQConfirmPublisher,
+)
 from pocpoc.api.messages.adapters.rabbitmq.rmq_message_dispatcher import (
     RMQMessageDispatcher,
 )
@@ -41,7 +61,12 @@ from pocpoc.api.messages.codec import (
 from pocpoc.api.messages.controller.handler import MessageControllerHandler
 from pocpoc.api.messages.handler import UnHandlableMessageException
 from pocpoc.api.messages.map import MessageMap
-from pocpoc.api.messages.message import Message, MessageMetadata
+from pocpoc.api.messages.message import (
+    Message,
+    MessageMetadata,
+    PartitionKeyFunction,
+    get_partition_key,
+)
 from pocpoc.api.microservices import (
     Container,
     ContainerHandler,
@@ -54,25 +79,99 @@ logger = logging.getLogger(__name__)
 class RabbitMQHandler(ContainerHandler):
     kit_encoder: Optional[MessageKitEncoder[bytes]] = None
     kit_decoder: Optional[MessageKitDecoder[bytes]] = None
+    metadata_headers = False
+    prefetch_count = 1
+    max_workers = 1
+    partition_key: Optional[PartitionKeyFunction] = None
+    ack_batch_size = 1
+    ack_delay_ms = 10
 
     def __init__(self, service_queue: str, connection_factory: RMQConnectionFactory):
         super().__init__()
         self.connection_factory = connection_factory
         self.service_queue = service_queue
 
-    def use_json_kit_codec(self, encoding: str) -> "RabbitMQHandler":
+    def use_metadata_headers(self) -> "RabbitMQHandler":
+        """
+        Sends the reply metadata as AMQP properties and headers too.
+        """
+        self.metadata_headers = True
+        return self
+
+    def use_prefetch(self, prefetch_count: int) -> "RabbitMQHandler":
+        """
+        Number of unacked messages the broker sends to this worker ahead of
+        time.
+        """
+        self.prefetch_count = prefetch_count
+        return self
+
+    def use_worker_pool(
+        self, max_workers: int, partition_key: Optional[PartitionKeyFunction] = None
+    ) -> "RabbitMQHandler":
+        """
+        Handles up to `max_workers` messages at the same time on a thread
+        pool. The prefetch is raised to `max_workers` when lower, so every
+        worker has a message to handle.
+
+        Messages with the same `partition_key`, by default
+        `Message.partition_key()`, are still handled in order.
+        """
+        self.max_workers = max_workers
+        self.partition_key = partition_key
+        self.prefetch_count = max(self.prefetch_count, max_workers)
+        return self
+
+    def use_ack_coalescing(
+        self, batch_size: int = 50, delay_ms: int = 10
+    ) -> "RabbitMQHandler":
+        """
+        Sends acks together, once `batch_size` are pending or `delay_ms`
+        passed. Keep `batch_size` below the prefetch, the broker does not send
+        more messages while the prefetch is filled with unsent acks.
+        """
+        self.ack_batch_size = batch_size
+        self.ack_delay_ms = delay_ms
+        return self
+
+    def use_json_kit_codec(
+        self, encoding: str, json_backend: Optional[JsonBackend] = None
+    ) -> "RabbitMQHandler":
         def hook(container: Container) -> None:
-            self.kit_encoder = JsonMessageKitEncoder(
-                JsonMessageMetadataEncoder(encoding), JsonMessageEncoder(encoding)
-            )
-            self.kit_decoder = JsonMessageKitDecoder(
-                JsonMessageMetadataDecoder(encoding),
-                JsonMessageDecoder(container.get_message_map(), encoding),
+            backend = json_backend or get_json_backend(encoding)
+            self.kit_encoder = create_json_kit_encoder(encoding, backend)
+            self.kit_decoder = create_json_kit_decoder(
+                container.get_message_map(), encoding, backend
             )
 
         self.before_start(hook)
         return self
 
+    def use_msgpack_kit_codec(
+        self, json_encoding: Optional[str] = "utf-8", write_json: bool = False
+    ) -> "RabbitMQHandler":
+        """
+        Reads msgpack kits, and JSON kits in `json_encoding` unless it is None.
+        Set `write_json` to keep replying in JSON until every client reads
+        msgpack.
+        """
+
+        def hook(container: Container) -> None:
+            message_map = container.get_message_map()
+            json_decoder = None
+            if json_encoding is not None:
+                json_decoder = create_json_kit_decoder(message_map, json_encoding)
+
+            if write_json:
+                assert json_encoding is not None, "write_json requires json_encoding"
+                self.kit_encoder = create_json_kit_encoder(json_encoding)
+            else:
+                self.kit_encoder = create_msgpack_kit_encoder()
+            self.kit_decoder = create_msgpack_kit_decoder(message_map, json_decoder)
+
+        self.before_start(hook)
+        return self
+
     def _run(self, container: Container) -> Any:
         if self.kit_encoder is None or self.kit_decoder is None:
             raise RuntimeError(
@@ -83,6 +182,7 @@ class RabbitMQHandler(ContainerHandler):
             container._rpc_map,
             container.get_class_initializer(),
             self.kit_encoder,
+            self.metadata_headers,
         )
 
         message_controller_handler = MessageControllerHandler(
@@ -90,15 +190,17 @@ class RabbitMQHandler(ContainerHandler):
             container._dependency_injection_manager,
         )
 
+        message_controller_map = container._message_controller_map
+        # a batch is only complete when all its messages can be unacked at once
+        prefetch_count = self.prefetch_count
+        for message_type in message_controller_map.batch_controllers_by_type_name:
+            batch_limits = message_controller_map.get_batch_limits(message_type)
+            if batch_limits is not None:
+                prefetch_count = max(prefetch_count, batch_limits.max_size)
+
         with self.connection_factory.get_connection() as connection:
             with connection.channel() as channel:
-                channel.basic_qos(prefetch_count=1)
-
-                def on_exit() -> None:
-                    channel.cancel()
-                    connection.close()
-
-                GracefulKiller.on_exit(on_exit)
+                channel.basic_qos(prefetch_count=prefetch_count)
 
                 register_messages_as_exchange_to_queue(
                     container.get_message_map().get_messages().values(),
@@ -107,12 +209,34 @@ class RabbitMQHandler(ContainerHandler):
                 )
                 channel.queue_declare(queue=self.service_queue, durable=True)
 
+                def is_handled(message_type: str) -> bool:
+                    rpc_map = container._rpc_map
+                    return rpc_map.get_controller_by_name(
+                        message_type
+                    ) is not None or message_controller_map.has_handlers(message_type)
+
                 subscriber = RMQMessageSubscriber(
                     channel,
                     self.service_queue,
                     self.kit_decoder,
+                    is_handled,
+                    self.max_workers,
+                    self.partition_key or get_partition_key,
+                    message_controller_map.get_batch_limits,
+                    self.ack_batch_size,
+                    self.ack_delay_ms,
                 )
 
+                def on_exit() -> None:
+                    if self.max_workers > 1 or self.ack_batch_size > 1:
+                        subscriber.stop()
+                        return
+
+                    channel.cancel()
+                    connection.close()
+
+                GracefulKiller.on_exit(on_exit)
+
                 def on_alarm(signum: int, frame: Any) -> None:
                     raise TimeoutError("Timeout", signum, frame)
 
@@ -158,7 +282,60 @@ class RabbitMQHandler(ContainerHandler):
 
                     # signal.alarm(0)
 
-                subscriber.listen(on_message)
+                def on_batch(batch: List[Tuple[MessageMetadata, Message]]) -> None:
+                    # one context for the batch, continuing the first message's
+                    with init_new_context(
+                        container._service_name,
+                        batch[0][0].tracked_context,
+                    ):
+                        message_controller_handler.handle_batch(batch)
+
+                subscriber.listen(on_message, on_batch)
+
+
+def create_json_kit_encoder(
+    encoding: str, json_backend: Optional[JsonBackend] = None
+) -> JsonMessageKitEncoder:
+    json_backend = json_backend or get_json_backend(encoding)
+    return JsonMessageKitEncoder(
+        JsonMessageMetadataEncoder(encoding, json_backend),
+        JsonMessageEncoder(encoding, json_backend),
+    )
+
+
+def create_json_kit_decoder(
+    message_map: MessageMap,
+    encoding: str,
+    json_backend: Optional[JsonBackend] = None,
+) -> JsonMessageKitDecoder:
+    json_backend = json_backend or get_json_backend(encoding)
+    return JsonMessageKitDecoder(
+        JsonMessageMetadataDecoder(encoding, json_backend),
+        JsonMessageDecoder(message_map, encoding, json_backend),
+    )
+
+
+def create_msgpack_kit_encoder(
+    serializer: Optional[MsgpackSerializer] = None,
+) -> MsgpackMessageKitEncoder:
+    serializer = serializer or MsgpackSerializer()
+    return MsgpackMessageKitEncoder(
+        MsgpackMessageMetadataEncoder(serializer),
+        MsgpackMessageEncoder(serializer),
+    )
+
+
+def create_msgpack_kit_decoder(
+    message_map: MessageMap,
+    fallback_decoder: Optional[MessageKitDecoder[bytes]] = None,
+    serializer: Optional[MsgpackSerializer] = None,
+) -> MsgpackMessageKitDecoder:
+    serializer = serializer or MsgpackSerializer()
+    return MsgpackMessageKitDecoder(
+        MsgpackMessageMetadataDecoder(serializer),
+        MsgpackMessageDecoder(message_map, serializer),
+        fallback_decoder,
+    )
 
 
 def create_rmq_json_rpc_client(
@@ -166,29 +343,88 @@ def create_rmq_json_rpc_client(
     connection_factory: RMQConnectionFactory,
     encoding: str,
     message_map: MessageMap,
+    json_backend: Optional[JsonBackend] = None,
+    default_timeout: Optional[float] = None,
 ) -> RMQRPCClient:
+    json_backend = json_backend or get_json_backend(encoding)
     return RMQRPCClient(
         service_name,
         connection_factory,
-        JsonMessageKitEncoder(
-            JsonMessageMetadataEncoder(encoding), JsonMessageEncoder(encoding)
-        ),
-        JsonMessageKitDecoder(
-            JsonMessageMetadataDecoder(encoding),
-            JsonMessageDecoder(message_map, encoding),
-        ),
+        create_json_kit_encoder(encoding, json_backend),
+        create_json_kit_decoder(message_map, encoding, json_backend),
+        default_timeout,
     )
 
 
+def create_rmq_confirm_publisher(
+    connection_factory: RMQConnectionFactory,
+) -> RMQConfirmPublisher:
+    return RMQConfirmPublisher(connection_factory.get_connection_parameters())
+
+
 def create_rmq_json_message_dispatcher(
     service_name: str,
     connection_factory: RMQConnectionFactory,
     encoding: str,
+    json_backend: Optional[JsonBackend] = None,
+    metadata_headers: bool = False,
+    confirm_delivery: bool = False,
+    use_confirm_publisher: bool = False,
+) -> RMQMessageDispatcher:
+    """
+    With `use_confirm_publisher`, messages are confirmed one by one on a
+    background connection and `dispatch_async` does not wait for the
+    confirms. Close the dispatcher to wait for them before exiting.
+    """
+    return RMQMessageDispatcher(
+        connection_factory,
+        service_name,
+        create_json_kit_encoder(encoding, json_backend),
+        metadata_headers,
+        confirm_delivery,
+        create_rmq_confirm_publisher(connection_factory)
+        if use_confirm_publisher
+        else None,
+    )
+
+
+def create_rmq_msgpack_rpc_client(
+    service_name: str,
+    connection_factory: RMQConnectionFactory,
+    message_map: MessageMap,
+    json_encoding: Optional[str] = "utf-8",
+    default_timeout: Optional[float] = None,
+) -> RMQRPCClient:
+    json_decoder = None
+    if json_encoding is not None:
+        json_decoder = create_json_kit_decoder(message_map, json_encoding)
+
+    return RMQRPCClient(
+        service_name,
+        connection_factory,
+        create_msgpack_kit_encoder(),
+        create_msgpack_kit_decoder(message_map, json_decoder),
+        default_timeout,
+    )
+
+
+def create_rmq_msgpack_message_dispatcher(
+    service_name: str,
+    connection_factory: RMQConnectionFactory,
+    metadata_headers: bool = False,
+    confirm_delivery: bool = False,
+    use_confirm_publisher: bool = False,
 ) -> RMQMessageDispatcher:
+    """
+    See `create_rmq_json_message_dispatcher` for `use_confirm_publisher`.
+    """
     return RMQMessageDispatcher(
         connection_factory,
         service_name,
-        JsonMessageKitEncoder(
-            JsonMessageMetadataEncoder(encoding), JsonMessageEncoder(encoding)
-        ),
+        create_msgpack_kit_encoder(),
+        metadata_headers,
+        confirm_delivery,
+        create_rmq_confirm_publisher(connection_factory)
+        if use_confirm_publisher
+        else None,
     )
@@ -0,0 +1,72 @@
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from threading import Condition
+from typing import Any, Callable, Deque, Dict, Hashable, Optional, Tuple
+
+Task = Tuple["Future[Any]", Callable[[], Any]]
+
+
+class PartitionedExecutor:
+    """
+    Runs tasks on a thread pool. Tasks submitted with the same key run one at
+    a time, in the order they were submitted. Tasks with different keys, or
+    without a key, run in parallel.
+    """
+
+    def __init__(self, max_workers: int, thread_name_prefix: str = "") -> None:
+        self.executor = ThreadPoolExecutor(max_workers, thread_name_prefix)
+        self.condition = Condition()
+        # tasks waiting for the running task of their partition
+        self.partitions: Dict[Hashable, Deque[Task]] = {}
+
+    def __enter__(self) -> "PartitionedExecutor":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.shutdown()
+
+    def submit(
+        self, key: Optional[Hashable], fn: Callable[..., Any], *args: Any
+    ) -> "Future[Any]":
+        if key is None:
+            return self.executor.submit(fn, *args)
+
+        future: "Future[Any]" = Future()
+        task = (future, partial(fn, *args))
+        with self.condition:
+            waiting = self.partitions.get(key)
+            if waiting is not None:
+                waiting.append(task)
+                return future
+            self.partitions[key] = deque()
+
+        self.executor.submit(self._run, key, task)
+        return future
+
+    def _run(self, key: Hashable, task: Task) -> None:
+        future, fn = task
+        if future.set_running_or_notify_cancel():
+            try:
+                future.set_result(fn())
+            except BaseException as e:
+                future.set_exception(e)
+
+        with self.condition:
+            waiting = self.partitions[key]
+            if not waiting:
+                del self.partitions[key]
+                self.condition.notify_all()
+                return
+            next_task = waiting.popleft()
+
+        # back of the pool queue, so a busy partition does not starve others
+        self.executor.submit(self._run, key, next_task)
+
+    def shutdown(self) -> None:
+        """
+        Waits for every submitted task to finish.
+        """
+        with self.condition:
+            self.condition.wait_for(lambda: not self.partitions)
+        self.executor.shutdown()
@@ -0,0 +1,53 @@
+from threading import Barrier, Lock
+from time import sleep
+from typing import Dict, List
+
+from pocpoc.api.utils.partitioned_executor import PartitionedExecutor
+
+
+def test_tasks_of_a_partition_run_in_order() -> None:
+    lock = Lock()
+    running: Dict[str, int] = {}
+    handled: Dict[str, List[int]] = {"a": [], "b": [], "c": []}
+
+    def task(key: str, value: int) -> int:
+        with lock:
+            running[key] = running.get(key, 0) + 1
+            assert running[key] == 1
+        sleep(0.001)
+        handled[key].append(value)
+        with lock:
+            running[key] -= 1
+        return value
+
+    with PartitionedExecutor(4) as executor:
+        futures = [
+            executor.submit(key, task, key, value)
+            for value in range(20)
+            for key in handled
+        ]
+
+    assert [future.result() for future in futures[::3]] == list(range(20))
+    assert handled == {key: list(range(20)) for key in handled}
+    assert executor.partitions == {}
+
+
+def test_partitions_run_in_parallel() -> None:
+    barrier = Barrier(3, timeout=5)
+
+    with PartitionedExecutor(3) as executor:
+        futures = [executor.submit(key, barrier.wait) for key in ("a", "b", None)]
+
+    assert sorted(future.result() for future in futures) == [0, 1, 2]
+
+
+def test_failed_task_does_not_block_its_partition() -> None:
+    def fail() -> None:
+        raise ValueError()
+
+    with PartitionedExecutor(2) as executor:
+        failed = executor.submit("a", fail)
+        after = executor.submit("a", lambda: 1)
+
+    assert isinstance(failed.exception(), ValueError)
+    assert after.result() == 1